@@ -1,14 +1,26 @@
+import os
+import time
+from datetime import datetime, timedelta
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import openpyxl
-import requests
-from bs4 import BeautifulSoup
-import io
-import numpy as np
-import warnings
-from requests.adapters import HTTPAdapter # 👈 (เพิ่มใหม่)
-from urllib3.util.retry import Retry      # 👈 (เพิ่มใหม่)
+from marketplace_session import MarketPlaceSession
+from report_cache import ReportFrameCache
+from pending_pipeline import (
+    LOGIN_URL, USERNAME, PASSWORD, TIMEOUT_SEC, MAX_DOWNLOAD_WORKERS,
+    FetchLog, fetch_all_data
+)
+from refresh_scheduler import BackgroundRefresher
+from snapshot_store import SnapshotStore
+from pending_aggregates import (
+    TOP_ITEMS_N, PendingCube, build_cube, frames_fingerprint, top_items_by_store, top_items_from_frame
+)
+from shared_dataset import DatasetRegistry
+from dashboard_sections import render_export, render_order_explorer
+from change_feed import ChangeFeed
+from stage_timer import StageTimer, timed
+from store_config import STORES, VISIBLE_STORES, store_color_map
+from charts import SELLER_TOP_K, FigureCache, seller_stack_figure, store_bar_figure, store_pie_figure, trend_figure
 
 # ----------------------------------------------------------------------
 # 1. ตั้งค่าหน้า Dashboard
@@ -23,192 +35,395 @@ st.set_page_config(
 # 2. กำหนดค่าคงที่และฟังก์ชันโหลดข้อมูล (ปรับปรุงใหม่)
 # ----------------------------------------------------------------------
 
-# --- (สำคัญ!) ตั้งค่าการ Login และ URL (จาก VBA) ---
-LOGIN_URL = "https://10.12.173.84/MarketPlace/Home/Logon"
-DOWNLOAD_URL = "https://10.12.173.84/MarketPlace/PickingList/PrintReport"
-USERNAME = "30034388" 
-PASSWORD = "9"      
+# --- (สำคัญ!) ตั้งค่าการ Login, URL และ Report อยู่ใน pending_pipeline.py ---
+
+# ดึงข้อมูลอัตโนมัติทุก REFRESH_INTERVAL_SEC วินาที (± REFRESH_JITTER_SEC กันหลายเครื่องยิงพร้อมกัน)
+REFRESH_INTERVAL_SEC = int(os.environ.get("MKP_REFRESH_INTERVAL_SEC", 600))
+REFRESH_JITTER_SEC = int(os.environ.get("MKP_REFRESH_JITTER_SEC", 30))
+
+# แหล่งข้อมูลของแต่ละรอบ: 'fetch' = ดึงจาก MarketPlace เอง, 'snapshot' = อ่าน Snapshot ล่าสุดที่
+# pending_cli.py (cron / systemd timer) เขียนไว้ ไม่ต้อง Login หรือดาวน์โหลดใน Process ของ Dashboard
+REFRESH_MODE = os.environ.get("MKP_REFRESH_MODE", "fetch")
+
+# ยอดรวมที่ pending_cli.py เขียนไว้คู่กับ Snapshot (โหมด 'snapshot' ใช้แทนการสร้าง Cube / Top-N ใหม่)
+CLI_SUMMARY_NAMES = ('by_store', 'by_store_remark', 'by_store_seller_remark', 'top_cannotpick')
+
+# เวลารอสูงสุดตอนกด Refresh Now / เปิดหน้าครั้งแรก (วินาที)
+REFRESH_WAIT_SEC = 120
+
+# ความถี่ในการอัปเดต Progress ระหว่างรอ (วินาที)
+WAIT_PROGRESS_SEC = 0.5
+
+# ความถี่ที่แต่ละหน้าจอเช็คว่ามีข้อมูลรอบใหม่หรือยัง (วินาที)
+NEW_DATA_CHECK_SEC = 15
+
+# ช่วงเวลาของกราฟแนวโน้ม Pending
+TREND_RANGES = {
+    "6 ชั่วโมง": timedelta(hours=6),
+    "24 ชั่วโมง": timedelta(hours=24),
+    "7 วัน": timedelta(days=7),
+}
+
+# ช่วงเวลาของ "มีอะไรเปลี่ยนไปบ้าง" (รวม Delta ของทุกรอบในช่วงนี้)
+CHANGE_RANGES = {
+    "10 นาที": timedelta(minutes=10),
+    "1 ชั่วโมง": timedelta(hours=1),
+    "ทั้งหมดที่เก็บไว้": None,
+}
 
 # กำหนดสีตามโจทย์
 COLOR_MAP = {
     "Canpick": "#0066FF",
     "Cannotpick": "#FF9966",
 }
-STORE_COLOR_MAP = {
-    7888: "#009999",
-    7886: "#33CCCC"
-}
+STORE_COLOR_MAP = store_color_map(STORES)
 
 # ----------------------------------------------------------------------
-# 💥 (แก้ไข!) ฟังก์ชันดึงข้อมูล เพิ่มการแก้ Proxy และ Timeout
+# 💥 Background Refresh: ดึงข้อมูลรอบเดียว แชร์ให้ทุกหน้าจอ
 # ----------------------------------------------------------------------
-@st.cache_data(ttl=600)
-def fetch_all_data(_log_placeholder):
+@st.cache_resource
+def get_snapshot_store():
+    """
+    ที่เก็บ Snapshot ของแต่ละรอบ (ใช้เปิดหน้าได้ทันทีหลัง Restart และทำกราฟแนวโน้ม)
+    """
+    return SnapshotStore(source='auto')
+
+
+@st.cache_resource
+def get_stage_timer():
+    """
+    ตัวจับเวลาแต่ละขั้น (ดึงข้อมูล + วาดกราฟ) ใช้ร่วมกันทั้ง Process
+    ส่งออกอัตโนมัติถ้าตั้ง MKP_METRICS_JSONL / MKP_METRICS_PROM
     """
-    ฟังก์ชันนี้จำลองการทำงานของ VBA Modules 1-4... (อัปเดตแก้ Proxy/Timeout)
+    return StageTimer.from_env()
+
+
+@st.cache_resource
+def get_figure_cache():
+    """
+    Figure ที่สร้างแล้ว (key = fingerprint ของข้อมูล + พารามิเตอร์กราฟ) ใช้ซ้ำทุก Rerun / ทุกหน้าจอ
     """
+    return FigureCache()
 
-    # 1. สร้าง Session
-    s = requests.Session()
-    
-    # 🚨 FIX 1: ปิดการใช้ System Proxy (เพื่อให้วิ่งตรงหา IP 10.x.x.x ได้)
-    s.trust_env = False 
-    
-    # 🚨 FIX 2: ปิดการตรวจสอบ SSL
-    s.verify = False
-    
-    # 🚨 FIX 3: เพิ่มระบบ Retry (ลองใหม่ 3 ครั้งถ้าต่อไม่ติด)
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1, # รอ 1 วินาทีก่อนลองใหม่
-        status_forcelist=[500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS", "POST"]
+
+@st.cache_resource
+def get_dataset_registry():
+    """
+    ชุดข้อมูลที่ดึงได้ + Cube / Index / Top-N ถือไว้ครั้งเดียวทั้ง Process ทุกหน้าจอใช้ Object เดียวกัน
+    (ไม่ pickle สำเนาให้แต่ละ Session แบบ st.cache_data หน่วยความจำไม่โตตามจำนวนหน้าจอ)
+    """
+    return DatasetRegistry()
+
+
+@st.cache_resource
+def get_change_feed():
+    """
+    Delta ระหว่างรอบ (Order ใหม่ / หายไป / เปลี่ยนสถานะ) เก็บย้อนหลังจำนวนจำกัดในหน่วยความจำ
+    """
+    return ChangeFeed()
+
+
+@st.cache_resource
+def get_refresher():
+    """
+    Refresher 1 ตัวต่อ Process ถือ Session ที่ Login แล้วและ Cache ของ Report ไว้
+    ทุก Streamlit Session อ่านผลล่าสุดจากที่นี่ ไม่มีใครต้องดึงข้อมูลเอง
+    """
+    timer = get_stage_timer()
+    mp_session = MarketPlaceSession(
+        LOGIN_URL, USERNAME, PASSWORD,
+        timeout=TIMEOUT_SEC, pool_size=MAX_DOWNLOAD_WORKERS, timer=timer
+    )
+    report_cache = ReportFrameCache()
+    snapshot_store = get_snapshot_store()
+    registry = get_dataset_registry()
+
+    def fetch_and_snapshot(log):
+        with timed(timer, 'fetch.total') as fetch_fields:
+            df = fetch_all_data(
+                mp_session, report_cache, log, timer=timer, change_feed=get_change_feed(),
+                on_store_ready=log.store_ready
+            )
+            fetch_fields['rows'] = len(df)
+        if not df.empty:
+            try:
+                with timed(timer, 'snapshot.write'):
+                    # ชุดข้อมูลเดียวกับที่หน้าจอจะ publish: Cube สร้างครั้งเดียวใช้ทั้งประวัติยอดรวมและกราฟ
+                    snapshot_store.write(df, cube=registry.publish(df).cube)
+            except Exception as e:
+                log.warning(f"⚠️ บันทึก Snapshot ไม่สำเร็จ: {e}")
+        timer.write_prometheus()
+        return df
+
+    loaded = {'path': None, 'data': None}
+
+    def publish_cli_summaries(df, fetched_at, log):
+        # ใช้ยอดรวมที่ pending_cli.py คำนวณไว้ (เฉพาะรอบเดียวกับ Snapshot) ลงทะเบียนชุดข้อมูลไว้ก่อน
+        # หน้าจอที่ publish(df) ตัวเดียวกันจะได้ Cube / Top-N นี้โดยไม่ต้องสแกน df ใหม่
+        try:
+            with timed(timer, 'summary.load'):
+                summaries = {}
+                for name in CLI_SUMMARY_NAMES:
+                    summaries[name], summary_at = snapshot_store.load_summary(name)
+                    if summaries[name] is None or summary_at != fetched_at:
+                        return
+                cube = PendingCube.from_frames(
+                    summaries['by_store_seller_remark'], summaries['by_store_remark'], summaries['by_store']
+                )
+                top_cannotpick = summaries['top_cannotpick']
+                top_items = {}
+                if not top_cannotpick.empty:
+                    # Rank สูงสุดที่มีจริง: ทุก Store มีไม่เกินจำนวนนี้ ผลจึงตรงกับ Top-N ที่ N เท่านี้พอดี
+                    top_n = int(top_cannotpick['Rank'].max())
+                    top_items[(top_n, False, "Cannotpick")] = top_items_from_frame(top_cannotpick)
+            registry.publish(df, cube=cube, top_items=top_items)
+        except Exception as e:
+            log.warning(f"⚠️ อ่านยอดรวมของ pending_cli.py ไม่ได้ คำนวณจากข้อมูลเต็มแทน: {e}")
+
+    def load_cli_snapshot(log):
+        # อ่านไฟล์ใหม่เฉพาะเมื่อ pending_cli.py เขียน Snapshot ใหม่แล้ว (ไฟล์เดิมคืน DataFrame ตัวเดิม)
+        snapshot_path = snapshot_store.latest_path()
+        if snapshot_path is None:
+            log.error("❌ ยังไม่มี Snapshot จาก pending_cli.py")
+            return pd.DataFrame()
+        if snapshot_path != loaded['path']:
+            with timed(timer, 'snapshot.load'):
+                loaded['data'], fetched_at = SnapshotStore.load(snapshot_path)
+            loaded['path'] = snapshot_path
+            publish_cli_summaries(loaded['data'], fetched_at, log)
+            log.success(f"✅ โหลด Snapshot ที่ pending_cli.py บันทึกไว้ ณ {fetched_at:%d/%m/%Y %H:%M:%S}")
+        else:
+            log.info("📦 ยังไม่มี Snapshot ใหม่จาก pending_cli.py ใช้ข้อมูลเดิม")
+        return loaded['data']
+
+    refresher = BackgroundRefresher(
+        load_cli_snapshot if REFRESH_MODE == 'snapshot' else fetch_and_snapshot,
+        FetchLog,
+        interval_sec=REFRESH_INTERVAL_SEC,
+        jitter_sec=REFRESH_JITTER_SEC
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    s.mount("https://", adapter)
-    s.mount("http://", adapter)
-
-    # Header User-Agent
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36'
-    }
-    s.headers.update(headers)
-    
-    warnings.filterwarnings('ignore', 'Unverified HTTPS request')
-
-    # กำหนด Timeout (วินาที)
-    TIMEOUT_SEC = 15
-
-    # 2. GET หน้า Login เพื่อดึง Token
-    try:
-        # ใส่ timeout เพื่อไม่ให้ค้างยาว
-        login_page_response = s.get(LOGIN_URL, timeout=TIMEOUT_SEC)
-        login_page_response.raise_for_status()
-        soup = BeautifulSoup(login_page_response.text, 'html.parser')
-        
-        # ตรวจสอบว่ามี Token ไหม
-        token_input = soup.find('input', {'name': '__RequestVerificationToken'})
-        if not token_input:
-             _log_placeholder.error(f"❌ [Step 1 FAILED] ไม่พบ Token ในหน้า Login (อาจเข้าผิดหน้า หรือต้อง VPN)")
-             return pd.DataFrame()
-             
-        token = token_input['value']
-
-    except requests.exceptions.ConnectTimeout:
-        _log_placeholder.error(f"❌ [Step 1 FAILED] เชื่อมต่อ Server ไม่ได้ (Timeout) กรุณาตรวจสอบว่าต่อ VPN หรือสาย LAN บริษัทแล้วหรือยัง?")
-        return pd.DataFrame()
-    except Exception as e:
-        _log_placeholder.error(f"❌ [Step 1 FAILED] ไม่สามารถเชื่อมต่อหน้า Login ได้: {e}")
-        return pd.DataFrame()
-
-    # 3. POST ข้อมูล Login
-    login_data = {
-        '__RequestVerificationToken': token,
-        'LoginType': 'UserAuthentication',
-        'Username': USERNAME,
-        'Password': PASSWORD
-    }
-
-    post_headers = {
-        'Referer': LOGIN_URL
-    }
 
+    # เปิดหน้าได้ทันทีหลัง Restart: ใช้ Snapshot ล่าสุดระหว่างรอดึงรอบแรก
     try:
-        login_response = s.post(LOGIN_URL, data=login_data, headers=post_headers, timeout=TIMEOUT_SEC)
-        login_response.raise_for_status()
+        df_snapshot, snapshot_time = snapshot_store.load_latest()
+    except Exception:
+        df_snapshot, snapshot_time = None, None
+    if df_snapshot is not None:
+        seed_log = FetchLog()
+        seed_log.info("📦 แสดงข้อมูลจาก Snapshot ล่าสุด ระหว่างรอดึงข้อมูลรอบใหม่")
+        refresher.seed(df_snapshot, snapshot_time or datetime.now(), seed_log)
 
-        if "MarketPlace" not in login_response.url or "Logon" in login_response.url:
-             _log_placeholder.error(f"❌ [Step 2 FAILED] Login ไม่สำเร็จ! (Username/Password ผิด หรือ Server ปฏิเสธ)")
-             return pd.DataFrame()
+    return refresher.start()
 
-    except Exception as e:
-        _log_placeholder.error(f"❌ [Step 2 FAILED] การ Login ล้มเหลว: {e}")
-        return pd.DataFrame()
 
-    _log_placeholder.success("✅ [Step 1 & 2] Login สำเร็จ!")
+def render_stage_timings(timer):
+    """
+    ตารางเวลาแต่ละขั้น (Percentile จากค่าล่าสุด) พร้อมปุ่มดาวน์โหลด JSON lines / Prometheus
+    """
+    rows = timer.summary()
+    if not rows:
+        st.info("ยังไม่มีข้อมูลการจับเวลา")
+        return
+    st.dataframe(
+        pd.DataFrame(rows), use_container_width=True, hide_index=True,
+        column_config={
+            'last_s': st.column_config.NumberColumn("ล่าสุด (s)", format="%.3f"),
+            'p50_s': st.column_config.NumberColumn("p50 (s)", format="%.3f"),
+            'p90_s': st.column_config.NumberColumn("p90 (s)", format="%.3f"),
+            'p99_s': st.column_config.NumberColumn("p99 (s)", format="%.3f"),
+            'bytes': st.column_config.NumberColumn("bytes", format="%d"),
+        }
+    )
+    col_jsonl, col_prom = st.columns(2)
+    col_jsonl.download_button(
+        "⬇️ JSON lines", timer.jsonl_text(), file_name="stage_timings.jsonl",
+        mime="application/x-ndjson", use_container_width=True
+    )
+    col_prom.download_button(
+        "⬇️ Prometheus", timer.prometheus_text(), file_name="mkp_stage_timings.prom",
+        mime="text/plain", use_container_width=True
+    )
 
-    # 4. กำหนด Report 4 ตัว
-    reports_to_fetch = [
-        {'store': '7888', 'type': '1', 'remark': 'Canpick'},
-        {'store': '7888', 'type': '2', 'remark': 'Cannotpick'},
-        {'store': '7886', 'type': '1', 'remark': 'Canpick'},
-        {'store': '7886', 'type': '2', 'remark': 'Cannotpick'}
-    ]
 
-    all_dataframes = []
-    progress_bar = _log_placeholder.progress(0, "เริ่มต้นดาวน์โหลดข้อมูล...")
+def render_trend(snapshot_store, stores):
+    """
+    กราฟแนวโน้มจำนวน Order ที่ Pending ตามเวลา แยก Store / Remark (เฉพาะ Store ที่เลือก)
+    """
+    chart_started = time.perf_counter()
+    range_label = st.radio("ช่วงเวลา", list(TREND_RANGES), horizontal=True, label_visibility="collapsed")
+    if not stores:
+        st.info("เลือก Store ที่ต้องการดูด้านบน", icon="🏬")
+        return
+    history = snapshot_store.query_history(start=datetime.now() - TREND_RANGES[range_label], stores=stores)
+    if history.empty:
+        st.info("ยังไม่มีประวัติในช่วงเวลานี้")
+        return
+
+    fig_trend = get_figure_cache().get_or_build(
+        ('trend_line', frames_fingerprint(history)),
+        lambda: trend_figure(history, COLOR_MAP)
+    )
+    st.plotly_chart(fig_trend, use_container_width=True)
+    get_stage_timer().record('chart', time.perf_counter() - chart_started, {'chart': 'trend_line'}, rows=len(history))
 
-    # 5. วนลูปดึงข้อมูล
-    for i, report in enumerate(reports_to_fetch):
-        try:
-            msg = f"กำลังดาวน์โหลด: {report['remark']} Store {report['store']}..."
-            _log_placeholder.write(msg)
-            progress_bar.progress((i+1)/len(reports_to_fetch), msg)
 
-            params = {'typereport': report['type'], 'storeno': report['store']}
-            
-            # ใส่ timeout ตอนโหลดไฟล์ด้วย
-            download_response = s.get(DOWNLOAD_URL, params=params, timeout=TIMEOUT_SEC)
-            download_response.raise_for_status()
+def render_changes(change_feed, stores):
+    """
+    สรุปการเปลี่ยนแปลงในช่วงเวลาที่เลือก: จำนวน Order ใหม่ / หายไป / เปลี่ยนสถานะ, Remark ที่ย้าย และแยก Store / Seller
+    """
+    range_label = st.radio("ช่วงเวลา", list(CHANGE_RANGES), horizontal=True, key="change_range", label_visibility="collapsed")
+    window = CHANGE_RANGES[range_label]
+    counts, by_group, transitions = change_feed.summary(since=datetime.now() - window if window else None)
+    if not any(counts.values()):
+        st.info("ยังไม่มีการเปลี่ยนแปลงในช่วงเวลานี้ (ต้องดึงข้อมูลอย่างน้อย 2 รอบ)")
+        return
+
+    col_added, col_removed, col_changed = st.columns(3)
+    col_added.metric("🆕 Order ใหม่", f"{counts['Added']:,}")
+    col_removed.metric("✅ หายไป (เคลียร์แล้ว)", f"{counts['Removed']:,}")
+    col_changed.metric("🔀 เปลี่ยนสถานะ", f"{counts['Changed']:,}")
+
+    col_moves, col_groups = st.columns([1, 2])
+    with col_moves:
+        st.caption("Remark ที่เปลี่ยน")
+        st.dataframe(transitions, use_container_width=True, hide_index=True)
+    with col_groups:
+        st.caption("แยกตาม Store / Seller Center")
+        by_group = by_group[by_group['Store'].isin(stores)] if stores else by_group
+        st.dataframe(
+            by_group.sort_values(['Added', 'Removed', 'Changed'], ascending=False),
+            use_container_width=True, hide_index=True
+        )
 
-            df_temp = pd.read_excel(io.BytesIO(download_response.content), header=2)
-            df_temp = df_temp.iloc[:, 0:7]
-            df_temp.columns = ['ColA', 'ColB', 'ColC', 'ColD', 'ColE', 'ColF', 'ColG']
-            df_temp['Remark'] = report['remark']
-            df_temp['Store'] = int(report['store'])
 
-            all_dataframes.append(df_temp)
+def render_staleness(result, attempt):
+    """
+    แจ้งเมื่อข้อมูลที่แสดงไม่เป็นปัจจุบัน: รอบล่าสุดดึงไม่สำเร็จ หรือบาง Report ใช้ข้อมูลเดิม (last good)
+    """
+    if result is None:
+        return
+    if attempt is not None and not attempt.ok and attempt.run_id > result.run_id:
+        st.warning(
+            f"ดึงข้อมูลรอบล่าสุด ({attempt.fetched_at:%H:%M:%S}) ไม่สำเร็จ "
+            f"แสดงข้อมูล ณ {result.fetched_at:%d/%m/%Y %H:%M:%S} แทน (ดูสาเหตุที่ Section 4)",
+            icon="⚠️"
+        )
+    stale_reports = getattr(result.log, 'stale_reports', [])
+    if stale_reports:
+        st.warning(
+            "ข้อมูลบางส่วนไม่เป็นปัจจุบัน (ดาวน์โหลดไม่สำเร็จ ใช้ข้อมูลเดิม): " + ", ".join(
+                f"{stale['report']} ณ {stale['as_of']:%d/%m %H:%M:%S}" for stale in stale_reports
+            ),
+            icon="🕰️"
+        )
 
-        except Exception as e:
-            _log_placeholder.warning(f"⚠️ ดาวน์โหลด {report['remark']} {report['store']} ล้มเหลว: {e}")
 
-    progress_bar.empty()
-    if not all_dataframes:
-        _log_placeholder.error("❌ [Step 3 FAILED] ไม่สามารถดาวน์โหลดข้อมูลได้เลย")
-        return pd.DataFrame()
+@st.fragment(run_every=NEW_DATA_CHECK_SEC)
+def watch_refresher(shown_run_id):
+    """
+    เช็คเป็นระยะว่า Background Refresh ดึงรอบใหม่เสร็จหรือยัง ถ้าเสร็จแล้วให้วาดหน้าใหม่
+    """
+    refresher = get_refresher()
+    current_log = refresher.current_log()
+    if current_log is not None:
+        st.caption(f"🔄 กำลังดึงข้อมูลรอบใหม่... {current_log.progress_text or ''}")
 
-    _log_placeholder.success(f"✅ [Step 3] ดาวน์โหลดข้อมูลทั้ง {len(all_dataframes)} ส่วนสำเร็จ!")
+    attempt = refresher.last_attempt()
+    if attempt is not None and attempt.run_id != shown_run_id:
+        st.rerun()
 
-    # 6. รวม DataFrame
-    df_combined = pd.concat(all_dataframes, ignore_index=True)
 
-    # 7. ลบข้อมูลซ้ำ
-    df_combined = df_combined.drop_duplicates(subset=['ColB'], keep='first')
+def layout_store_slots(stores, bar_area, stack_area, top_area):
+    """
+    ที่ว่างของแต่ละ Store ใน Section 1, 2 (คอลัมน์ละ Store) และตาราง Top-N (แถวละ 2 Store)
+    คืน {Store: (bar, stack, top)} เติมทีละ Store ได้ตามลำดับที่ข้อมูลมาถึง และวาดทับได้เมื่อได้ผลเต็ม
+    """
+    with bar_area:
+        bar_cols = st.columns(max(len(stores), 1))
+    with stack_area:
+        stack_cols = st.columns(max(len(stores), 1))
+    top_cells = []
+    with top_area:
+        for row_start in range(0, len(stores), 2):
+            top_cells.extend(st.columns(2)[:len(stores[row_start:row_start + 2])])
+
+    slots = {}
+    for store, bar_col, stack_col, top_cell in zip(stores, bar_cols, stack_cols, top_cells):
+        with bar_col:
+            st.subheader(f"Store: {store}")
+            bar_slot = st.empty()
+        with stack_col:
+            st.subheader(f"Store: {store}")
+            stack_slot = st.empty()
+        with top_cell:
+            top_slot = st.empty()
+        slots[store] = (bar_slot, stack_slot, top_slot)
+    return slots
+
+
+def render_store(slots, store, cube, top_by_store, top_n, partial=False):
+    """
+    วาดกราฟ Section 1, 2 และตาราง Top-N ของ Store เดียวลงที่ว่างของ Store นั้น (ทับของเดิม)
+    partial = ข้อมูลเบื้องต้นระหว่างรอบ (key ของกราฟต่างจากผลเต็ม วาดทั้งสองแบบใน Rerun เดียวกันได้)
+    """
+    bar_slot, stack_slot, top_slot = slots[store]
+    figure_cache = get_figure_cache()
+    timer = get_stage_timer()
+    key_suffix = "_partial" if partial else ""
+
+    if store not in cube.stores:
+        bar_slot.info("ไม่มีรายการ Pending")
+        stack_slot.info("ไม่มีรายการ Pending")
+    else:
+        chart_started = time.perf_counter()
+        fig_bar = figure_cache.get_or_build(
+            ('store_bar', cube.fingerprint, store),
+            lambda: store_bar_figure(cube.store_remark(store), COLOR_MAP)
+        )
+        bar_slot.plotly_chart(fig_bar, use_container_width=True, key=f"store_bar_{store}{key_suffix}")
+        timer.record('chart', time.perf_counter() - chart_started, {'chart': 'store_bar'}, store=store, partial=partial)
+
+        chart_started = time.perf_counter()
+        # ยอดรวมเป็น text trace เดียว และรวม Seller ที่เกิน SELLER_TOP_K เป็น "Other"
+        fig_stack = figure_cache.get_or_build(
+            ('seller_bar', cube.fingerprint, store, SELLER_TOP_K),
+            lambda: seller_stack_figure(
+                cube.store_seller_remark(store)[['Seller Center', 'Remark', 'Orders']]
+                .rename(columns={'Orders': 'Order ID'}),
+                COLOR_MAP
+            )
+        )
+        stack_slot.plotly_chart(fig_stack, use_container_width=True, key=f"seller_bar_{store}{key_suffix}")
+        timer.record('chart', time.perf_counter() - chart_started, {'chart': 'seller_bar'}, store=store, partial=partial)
+
+    with top_slot.container():
+        st.subheader(f"Store {store} (Top {top_n} Cannotpick)")
+        top_data = top_by_store.get(store)
+        if top_data is None:
+            st.info(f"ไม่พบข้อมูล 'Cannotpick' สำหรับ Store {store}")
+        else:
+            st.dataframe(
+                top_data,
+                use_container_width=True,
+                column_config={"BoxesQty": st.column_config.NumberColumn("BoxesQty", format="%d")}
+            )
+    if partial:
+        top_slot.caption("⏳ ข้อมูลเบื้องต้น (รอรวมกับ Store อื่น)")
 
-    # 8. คำนวณ BoxesQty
-    col_f_num = pd.to_numeric(df_combined['ColF'], errors='coerce')
-    col_g_num = pd.to_numeric(df_combined['ColG'], errors='coerce')
-    col_f_safe = col_f_num.replace(0, np.nan)
-    ratio = col_g_num / col_f_safe
 
-    df_combined['ColJ_BoxesQty'] = np.where(
-        ratio < 1,
-        col_g_num,
-        ratio
-    )
-    df_combined['ColJ_BoxesQty'] = df_combined['ColJ_BoxesQty'].fillna(col_g_num)
-
-    # 9. เปลี่ยนชื่อคอลัมน์
-    df_final = df_combined.rename(columns={
-        'ColA': 'Seller Center', 
-        'ColB': 'Order ID',
-        'ColD': 'SKU (TPNB)',
-        'ColE': 'Description',
-        'Remark': 'Remark',
-        'Store': 'Store',
-        'ColJ_BoxesQty': 'BoxesQty'
-    })
-
-    # 10. เลือกเฉพาะคอลัมน์ที่ใช้
-    final_columns = [
-        'Seller Center', 'Order ID', 'SKU (TPNB)', 'Description',
-        'Remark', 'Store', 'BoxesQty'
-    ]
-    df_final = df_final[final_columns]
-    df_final['BoxesQty'] = pd.to_numeric(df_final['BoxesQty'], errors='coerce').fillna(0).astype(int)
-
-    _log_placeholder.success("✅ [Step 4] ประมวลผลข้อมูลและคำนวณ BoxesQty สำเร็จ!")
-    return df_final
+def render_partial_stores(slots, fetch_log, shown, top_n, by_seller):
+    """
+    วาด Store ที่ได้ Report ครบแล้วในรอบที่กำลังดึง (fetch_log.store_frames) ที่ยังไม่ได้วาด
+    """
+    for store, df_store in list(fetch_log.store_frames.items()):
+        if store in shown or store not in slots:
+            continue
+        render_store(
+            slots, store, build_cube(df_store),
+            top_items_by_store(df_store, n=top_n, remark="Cannotpick", by_seller=by_seller),
+            top_n, partial=True
+        )
+        shown.add(store)
 
 
 # ----------------------------------------------------------------------
@@ -225,170 +440,165 @@ def main():
         )
     with col_button_space:
         st.markdown("<br>", unsafe_allow_html=True)
-        fetch_button_clicked = st.button("🚀 Fetch Latest Data", use_container_width=True, help="กดเพื่อดึงข้อมูลล่าสุดจากเว็บ (แทนการรัน Macro)")
+        refresh_button_clicked = st.button(
+            "🔄 Refresh Now", use_container_width=True,
+            help=f"ระบบดึงข้อมูลให้อัตโนมัติทุก {REFRESH_INTERVAL_SEC // 60} นาที กดเพื่อดึงทันที (ถ้ากำลังดึงอยู่จะรอผลรอบเดียวกัน)"
+        )
+
+    # วาดกราฟเฉพาะ Store ที่เลือก (เพิ่ม Store แล้วเวลาวาด / ขนาดหน้าไม่โตตาม)
+    visible_stores = st.multiselect(
+        "🏬 Store ที่แสดง", STORES, default=STORES[:VISIBLE_STORES],
+        help="Pie Chart แสดงทุก Store ส่วนกราฟ Section 1-3 แสดงเฉพาะ Store ที่เลือก"
+    )
+
+    # แจ้งเตือนข้อมูลไม่เป็นปัจจุบัน (เติมหลังรู้ผลการดึงข้อมูล แต่แสดงเหนือกราฟ)
+    staleness_slot = st.container()
 
     df = pd.DataFrame()
+    refresher = get_refresher()
+    timer = get_stage_timer()
+    figure_cache = get_figure_cache()
 
     sec1_col_left, sec1_col_right = st.columns([1.5, 1])
     st.divider()
     sec2_col_left, sec2_col_right = st.columns([1.5, 1])
 
     st.divider()
+    explorer_expander = st.expander("🔎 รายละเอียด Order (Drill-down)")
+    export_expander = st.expander("⬇️ ส่งออกข้อมูล (CSV / Parquet / Excel)")
+    changes_expander = st.expander("🔁 มีอะไรเปลี่ยนไปบ้าง (เทียบกับรอบก่อน)")
+    with st.expander("📈 แนวโน้ม Pending ตามเวลา (จาก Snapshot)"):
+        render_trend(get_snapshot_store(), visible_stores)
+
     st.header("4. สถานะการดึงข้อมูล (Log)")
     log_container = st.container(border=True)
 
-    if not fetch_button_clicked:
-        log_container.info("กรุณากดปุ่ม 'Fetch Latest Data' เพื่อเริ่มแสดงผลแดชบอร์ด", icon="⬆️")
-
-    if fetch_button_clicked:
-        try:
-            st.cache_data.clear()
-            df = fetch_all_data(log_container)
-        except Exception as e:
-            log_container.error(f"เกิดข้อผิดพลาดร้ายแรงในการโหลดข้อมูล: {e}")
-            df = pd.DataFrame()
-
-    if not df.empty:
+    # กด Refresh Now หรือเปิดหน้าครั้งแรกโดยยังไม่มีข้อมูล (ไม่มี Snapshot): รอผลจาก Background Refresh
+    wait_for_refresh = refresh_button_clicked or (refresher.latest() is None and refresher.last_attempt() is None)
 
+    # โครง Section 1-3 ของ Store ที่เลือก: ระหว่างรอเติมทีละ Store ที่ได้ Report ครบ แล้ววาดทับด้วยผลเต็ม
+    store_slots = {}
+    has_layout = wait_for_refresh or refresher.latest() is not None
+    if has_layout:
         with sec1_col_left:
-            Stores = df['Store'].unique()
             st.header("1. Pending by Store")
-            bar_cols = st.columns(len(Stores))
-
-            for i, Store in enumerate(Stores):
-                with bar_cols[i]:
-                    st.subheader(f"Store: {Store}")
-                    Store_df = df[df['Store'] == Store]
-
-                    order_data = Store_df.groupby('Remark')['Order ID'].nunique().reset_index()
-                    order_data['Metric'] = 'Order Count'
-                    order_data = order_data.rename(columns={'Order ID': 'Value'})
-                    box_data = Store_df.groupby('Remark')['BoxesQty'].sum().reset_index()
-                    box_data['Metric'] = 'Boxes Qty'
-                    box_data = box_data.rename(columns={'BoxesQty': 'Value'})
-                    combined_data = pd.concat([order_data, box_data])
-                    total_order_count = combined_data[combined_data['Metric'] == 'Order Count']['Value'].sum()
-                    total_boxes_qty = combined_data[combined_data['Metric'] == 'Boxes Qty']['Value'].sum()
-
-                    fig_bar = px.bar(
-                        combined_data, x='Metric', y='Value', color='Remark',
-                        barmode='stack', color_discrete_map=COLOR_MAP,
-                        text='Value', category_orders={"Remark": ["Canpick", "Cannotpick"]}
-                    )
-                    fig_bar.update_traces(textposition='inside', textangle=0, textfont_size=11)
-                    # จัดรูปแบบตัวเลขให้มี comma
-                    text_labels = ['{:,.0f}'.format(val) for val in combined_data['Value']]
-                    fig_bar.update_traces(text=text_labels)
-
-                    fig_bar.add_annotation(
-                        x='Order Count', y=total_order_count * 1.05,
-                        text=f"Total Order : {total_order_count:,}",
-                        showarrow=False, font=dict(size=14, color="black", family="Arial Black")
-                    )
-                    fig_bar.add_annotation(
-                        x='Boxes Qty', y=total_boxes_qty * 1.1,
-                        text=f"Total Boxes : {total_boxes_qty:,}",
-                        showarrow=False, font=dict(size=14, color="black", family="Arial Black")
-                    )
-
-                    y_max = max(total_order_count, total_boxes_qty) * 1.2
-                    fig_bar.update_yaxes(range=[0, y_max])
-                    st.plotly_chart(fig_bar, use_container_width=True)
+            if not visible_stores:
+                st.info("เลือก Store ที่ต้องการดูด้านบน", icon="🏬")
+            bar_area = st.container()
+        with sec2_col_left:
+            st.header("2. Pending by Seller Center")
+            stack_area = st.container()
+        with sec2_col_right:
+            header_slot = st.empty()
+            col_top_n, col_by_seller = st.columns(2)
+            top_n = col_top_n.number_input("จำนวนอันดับ", min_value=1, max_value=100, value=TOP_ITEMS_N, step=5)
+            by_seller = col_by_seller.toggle("แยกตาม Seller Center", value=False)
+            top_scope = "Store และ Seller Center" if by_seller else "Store"
+            header_slot.header(f"3. Top {top_n} รายการ 'Cannotpick' (แยกตาม {top_scope})")
+            top_area = st.container()
+        store_slots = layout_store_slots(visible_stores, bar_area, stack_area, top_area)
+
+    if wait_for_refresh:
+        run_id = refresher.request_refresh() if refresh_button_clicked else 1
+        for bar_slot, _, _ in store_slots.values():
+            bar_slot.caption("⏳ กำลังดึงข้อมูล Store นี้...")
+        partial_stores = set()
+        with log_container:
+            wait_progress = st.progress(0.0, text="กำลังดึงข้อมูลล่าสุด...")
+            deadline = time.monotonic() + REFRESH_WAIT_SEC
+            # รอทีละช่วงสั้น ๆ เพื่ออัปเดต Progress (bytes ที่ดาวน์โหลดแล้ว) และวาด Store ที่ได้ข้อมูลครบแล้ว
+            while not refresher.wait_for(run_id, timeout=WAIT_PROGRESS_SEC) and time.monotonic() < deadline:
+                current_log = refresher.current_log()
+                if current_log is None:
+                    continue
+                if current_log.progress_text:
+                    wait_progress.progress(current_log.progress_value, text=current_log.progress_text)
+                render_partial_stores(store_slots, current_log, partial_stores, top_n, by_seller)
+            wait_progress.empty()
+
+    attempt = refresher.last_attempt()
+    result = refresher.latest()
+    if attempt is not None:
+        attempt.log.replay(log_container)
+    elif result is not None:
+        result.log.replay(log_container)
+    if result is not None:
+        df = result.data
+        next_run = f" | รอบถัดไป {refresher.next_run_at:%H:%M:%S}" if refresher.next_run_at else ""
+        source_note = "จาก Snapshot" if result.run_id == 0 else f"ใช้เวลาดึง {result.duration:.1f} วินาที"
+        log_container.caption(
+            f"🕒 ข้อมูล ณ เวลา {result.fetched_at:%d/%m/%Y %H:%M:%S} "
+            f"({source_note}){next_run}"
+        )
+    elif attempt is None:
+        log_container.info("กำลังดึงข้อมูลครั้งแรก กรุณารอสักครู่", icon="⏳")
+
+    with staleness_slot:
+        render_staleness(result, attempt)
+
+    # เติมหลังรอผลการดึงข้อมูล ให้รวม Delta ของรอบที่เพิ่งกด Refresh ด้วย
+    with changes_expander:
+        render_changes(get_change_feed(), visible_stores)
+
+    with log_container:
+        watch_refresher(attempt.run_id if attempt is not None else 0)
+
+    # เติมตารางเวลาตอนท้ายสุด ให้รวมเวลาวาดกราฟของรอบนี้ด้วย
+    timing_expander = st.expander("⏱️ เวลาแต่ละขั้นตอน (ดึงข้อมูล / Parse / วาดกราฟ)")
+
+    if df.empty or not has_layout:
+        # ดึงไม่สำเร็จ: ล้างข้อความรอ / ข้อมูลเบื้องต้นที่ค้างอยู่
+        # (ข้อมูลที่เพิ่งมาถึงหลังวางโครงหน้า watch_refresher จะ Rerun ให้เอง)
+        for slots in store_slots.values():
+            for slot in slots:
+                slot.empty()
+    else:
+        # ชุดข้อมูลเดียวของ Process (รอบเดิมได้ Cube / Index / Top-N ตัวเดิม ไม่ต้อง Hash หรือคัดลอก df)
+        dataset = get_dataset_registry().publish(df)
+        cube = dataset.cube
+
+        # คำนวณ Top-N ของทุก Store ในรอบเดียว (จำผลไว้ในชุดข้อมูลตาม N / การแยก Seller)
+        chart_started = time.perf_counter()
+        top_by_store = dataset.top_items(top_n, by_seller)
+        timer.record('chart', time.perf_counter() - chart_started, {'chart': 'top_table'}, n=top_n)
+
+        # ผลเต็มวาดทับข้อมูลเบื้องต้นของทุก Store
+        for store in visible_stores:
+            render_store(store_slots, store, cube, top_by_store, top_n)
 
         with sec1_col_right:
             st.markdown("<br>", unsafe_allow_html=True)
             st.markdown("<br>", unsafe_allow_html=True) 
             
-            pie_data = df.groupby('Store')['Order ID'].nunique().reset_index()
-            pie_data = pie_data.rename(columns={'Order ID': 'Total Order Count'})
-
-            fig_pie = px.pie(
-                pie_data,
-                values='Total Order Count',
-                names='Store',
-                hole=.3,
-                color='Store',
-                color_discrete_map=STORE_COLOR_MAP
-            )
-            fig_pie.update_traces(
-                textposition='inside',
-                textinfo='percent+value',
-                texttemplate="%{value:,}<br>(%{percent})",
-                hoverinfo='label+percent+value',
-                textfont_size=18,
-                rotation=360,
-                sort=False
-            )
-            fig_pie.update_layout(
-                margin=dict(t=0, b=0, l=0, r=0),
-                showlegend=True,
-                legend=dict(orientation="v", yanchor="top", y=0.5, xanchor="right", x=-0.2)
+            chart_started = time.perf_counter()
+            fig_pie = figure_cache.get_or_build(
+                ('store_pie', cube.fingerprint),
+                lambda: store_pie_figure(
+                    cube.orders_by_store().rename(columns={'Orders': 'Total Order Count'}), STORE_COLOR_MAP
+                )
             )
             st.plotly_chart(fig_pie, use_container_width=True)
-
-        with sec2_col_left:
-            Stores = df['Store'].unique()
-            st.header("2. Pending by Seller Center")
-            stack_cols = st.columns(len(Stores))
-
-            for i, Store in enumerate(Stores):
-                with stack_cols[i]:
-                    st.subheader(f"Store: {Store}")
-                    Store_df = df[df['Store'] == Store]
-
-                    stack_data = Store_df.groupby(['Seller Center', 'Remark'])['Order ID'].nunique().reset_index()
-                    total_order_by_seller = stack_data.groupby('Seller Center')['Order ID'].sum().reset_index()
-
-                    fig_stack = px.bar(
-                        stack_data, x='Seller Center', y='Order ID', color='Remark',
-                        barmode='stack', color_discrete_map=COLOR_MAP,
-                        text='Order ID', category_orders={"Remark": ["Canpick", "Cannotpick"]}
-                    )
-                    
-                    text_labels_stack = ['{:,.0f}'.format(val) for val in stack_data['Order ID']]
-                    fig_stack.update_traces(text=text_labels_stack, textposition='inside', textangle=0, textfont_size=11)
-
-                    y_max_store = 0
-                    for _, row in total_order_by_seller.iterrows():
-                        seller = row['Seller Center']
-                        total_count = row['Order ID']
-                        fig_stack.add_annotation(
-                            x=seller, y=total_count * 1.1,
-                            text=f"Total Order : {total_count:,}",
-                            showarrow=False, font=dict(size=14, color="black", family="Arial Black")
-                        )
-                        if total_count > y_max_store:
-                            y_max_store = total_count
-
-                    fig_stack.update_yaxes(range=[0, y_max_store * 1.2])
-                    st.plotly_chart(fig_stack, use_container_width=True)
-
-        with sec2_col_right:
-            
-            def display_top_10(df_all, store_id, title_col):
-                cant_pick_store_df = df_all[
-                    (df_all['Remark'] == "Cannotpick") & 
-                    (df_all['Store'].astype(str) == str(store_id))
-                ]
-                with title_col:
-                    st.subheader(f"Store {store_id} (Top 10 Cannotpick)")
-                    if cant_pick_store_df.empty:
-                        st.info(f"ไม่พบข้อมูล 'Cannotpick' สำหรับ Store {store_id}")
-                        return
-                    top_data = cant_pick_store_df.groupby(['SKU (TPNB)', 'Description'])['BoxesQty'].sum().reset_index()
-                    top_data = top_data.sort_values(by='BoxesQty', ascending=False).head(10).reset_index(drop=True)
-                    top_data.index = top_data.index + 1
-                    top_data = top_data.rename_axis('Rank')
-                    st.dataframe(
-                        top_data,
-                        use_container_width=True,
-                        column_config={"BoxesQty": st.column_config.NumberColumn("BoxesQty", format="%d")}
-                    )
-
-            st.header("3. Top 10 รายการ 'Cannotpick' (แยกตาม Store)")
-            col_7888, col_7886 = st.columns(2)
-            display_top_10(df, 7888, col_7888)
-            display_top_10(df, 7886, col_7886)
+            timer.record('chart', time.perf_counter() - chart_started, {'chart': 'store_pie'})
+
+        with explorer_expander:
+            with timed(timer, 'order_index'):
+                order_index = dataset.order_index
+            render_order_explorer(order_index)
+        with export_expander:
+            render_export(order_index, f"pending_{result.fetched_at:%Y%m%d_%H%M}", timer=timer)
+
+    with timing_expander:
+        render_stage_timings(timer)
+        cache_stats = figure_cache.stats()
+        st.caption(
+            f"🖼️ Figure Cache: {cache_stats['entries']:,} รูป | "
+            f"ใช้ซ้ำ {cache_stats['hits']:,} / สร้างใหม่ {cache_stats['misses']:,}"
+        )
+        dataset_stats = get_dataset_registry().stats()
+        st.caption(
+            f"📚 ชุดข้อมูลที่ใช้ร่วมกันทุกหน้าจอ: รุ่นที่ {dataset_stats['version']:,} | "
+            f"ถือไว้ {dataset_stats['entries']:,} รุ่น {dataset_stats['mb']:,.1f} MB"
+        )
 
 if __name__ == '__main__':
     main()
@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import openpyxl  # Pandas ต้องใช้ openpyxl ในการอ่านไฟล์ .xlsm
+from upload_batch import UploadFrameCache, load_uploads, new_upload_pool  # Parse หลายไฟล์พร้อมกัน (calamine / openpyxl แบบ Stream)
+from pending_aggregates import TOP_ITEMS_N
+from pending_schema import memory_mb
+from shared_dataset import DatasetRegistry
+from dashboard_sections import render_export, render_order_explorer
+from snapshot_store import SnapshotStore
+from watch_folder import WATCH_DIR, FolderWatcher
+from store_config import STORES, VISIBLE_STORES, store_color_map
+from charts import SELLER_TOP_K, FigureCache, seller_stack_figure, store_bar_figure, store_pie_figure
 
 # ----------------------------------------------------------------------
 # 1. ตั้งค่าหน้า Dashboard
@@ -19,46 +27,116 @@ st.set_page_config(
 # --- (สำคัญ!) ตั้งชื่อชีตของคุณที่นี่ ---
 SHEET_NAME = "MarketplaceData"
 
+# ความถี่ที่แต่ละหน้าจอเช็คว่า Watch Folder มีข้อมูลรุ่นใหม่หรือยัง (วินาที)
+WATCH_CHECK_SEC = 10
+
 # กำหนดสีตามโจทย์
 COLOR_MAP = {
     "Canpick": "#0066FF",    # สีสำหรับ Canpick
     "Cannotpick": "#FF9966",   # สีสำหรับ Cannotpick
 }
 
-# กำหนดสีสำหรับ Store โดยเฉพาะตามโจทย์
-STORE_COLOR_MAP = {
-    7888: "#009999", # สีเขียว (ตามโค้ดเดิม)
-    7886: "#33CCCC"  # สีเขียวอ่อน (ตามโค้ดเดิม)
-}
+# กำหนดสีสำหรับ Store โดยเฉพาะตามโจทย์ (7888 สีเขียว, 7886 สีเขียวอ่อน ตามโค้ดเดิม Store อื่นตาม store_config)
+STORE_COLOR_MAP = store_color_map(STORES)
+
+@st.cache_resource
+def get_snapshot_store():
+    """
+    ที่เก็บ Snapshot ของไฟล์ที่อัปโหลด (เปิดหน้าใหม่ก็เห็นข้อมูลล่าสุดได้ทันที)
+    """
+    return SnapshotStore(source='upload')
+
+@st.cache_resource
+def get_figure_cache():
+    """
+    Figure ที่สร้างแล้ว (key = fingerprint ของข้อมูล + พารามิเตอร์กราฟ) ไม่ต้องสร้างใหม่ทุก Rerun
+    """
+    return FigureCache()
+
+@st.cache_resource
+def get_dataset_registry():
+    """
+    ชุดข้อมูลที่โหลดแล้ว + Cube / Index / Top-N ถือไว้ครั้งเดียวทั้ง Process ทุก Session ใช้ Object เดียวกัน
+    """
+    return DatasetRegistry()
+
+@st.cache_resource(max_entries=4)  # อ่าน Snapshot ครั้งเดียวต่อไฟล์ ทุก Session ใช้ DataFrame ตัวเดียวกัน
+def load_snapshot(snapshot_path):
+    return SnapshotStore.load(snapshot_path)
+
+@st.cache_resource
+def get_upload_cache():
+    """
+    DataFrame ที่ Parse แล้วของแต่ละไฟล์ (key = Hash ของไฟล์) อัปโหลดไฟล์เดิมซ้ำไม่ต้อง Parse ใหม่
+    """
+    return UploadFrameCache()
+
+@st.cache_resource
+def get_upload_pool():
+    """
+    Process Pool สำหรับ Parse หลายไฟล์พร้อมกัน (สร้างครั้งเดียวใช้ทุก Session)
+    """
+    return new_upload_pool()
+
+@st.cache_resource
+def get_folder_watcher():
+    """
+    เฝ้า MKP_WATCH_DIR ใน Background Thread เดียวของ Process (None ถ้าไม่ได้ตั้ง)
+    ไฟล์ใหม่ / ที่เปลี่ยน Parse เฉพาะชีต SHEET_NAME แล้วทุกหน้าจอได้ข้อมูลชุดเดียวกันโดยไม่ต้องอัปโหลด
+    """
+    if not WATCH_DIR:
+        return None
+    snapshot_store = get_snapshot_store()
+    registry = get_dataset_registry()
 
-@st.cache_data  # Cache ข้อมูลไว้ ไม่ต้องโหลดใหม่ทุกครั้งที่ทำอะไร
-def load_data(uploaded_file, sheet_name):
+    def write_snapshot(result):
+        try:
+            snapshot_store.write(result.data, result.updated_at, cube=registry.publish(result.data).cube)
+        except Exception:
+            pass  # Snapshot เป็นแค่ตัวช่วยตอนเปิดหน้า ไม่ต้องหยุด Watch Folder
+
+    return FolderWatcher(WATCH_DIR, SHEET_NAME, pool=get_upload_pool(), on_publish=write_snapshot).start()
+
+@st.fragment(run_every=WATCH_CHECK_SEC)
+def watch_folder_updates(watcher, shown_version):
+    """
+    เช็คเป็นระยะว่า Watch Folder รวมข้อมูลรุ่นใหม่เสร็จหรือยัง ถ้าเสร็จแล้วให้วาดหน้าใหม่
+    """
+    if watcher.last_error:
+        st.warning(f"เฝ้าโฟลเดอร์ {WATCH_DIR} ไม่สำเร็จ: {watcher.last_error}", icon="📂")
+    result = watcher.latest()
+    if result is not None and result.version != shown_version:
+        st.rerun()
+
+@st.cache_resource(max_entries=4)  # ไฟล์ชุดเดิมได้ DataFrame ตัวเดิม (ไม่ pickle สำเนาให้แต่ละ Session)
+def load_data(uploaded_files, sheet_name):
     """
-    โหลดข้อมูลจากไฟล์ Excel ที่อัปโหลด โดยใช้ตำแหน่งคอลัมน์
+    โหลดข้อมูลจากไฟล์ Excel ที่อัปโหลด (หลายไฟล์ได้) รวมเป็นชุดเดียวพร้อมคอลัมน์ Source File
     """
     try:
-        # **ใช้ตำแหน่งคอลัมน์ (Index) แทนชื่อคอลัมน์ Excel (A=0, B=1, D=3, E=4, H=7, I=8, J=9)**
-        use_cols_indices = [0, 1, 3, 4, 7, 8, 9] 
-        
-        # **กำหนดชื่อคอลัมน์ใหม่ตามลำดับ Index**
-        new_column_names = [
-            'Seller Center', 'Order ID', 'SKU (TPNB)', 'Description',
-            'Remark', 'Store', 'BoxesQty'
-        ]
-        
-        df = pd.read_excel(
-            uploaded_file,
-            sheet_name=sheet_name,
-            engine='openpyxl',
-            usecols=use_cols_indices, # ใช้ตำแหน่งคอลัมน์
-            header=0 # กำหนดว่า Row แรกเป็น Header
+        # Parse ไฟล์ใหม่พร้อมกันใน Process Pool ไฟล์ที่เคยอัปโหลดแล้วใช้ผลเดิมจาก Cache
+        df, file_results = load_uploads(
+            [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files],
+            sheet_name, get_upload_cache(), get_upload_pool()
+        )
+
+        for result in file_results:
+            if result['error']:
+                st.error(f"เกิดข้อผิดพลาดในการโหลดไฟล์ {result['file']}: {result['error']}")
+        if df.empty:
+            return df
+
+        loaded = [result for result in file_results if not result['error']]
+        st.caption(
+            f"💾 {len(loaded)} ไฟล์ (ใช้ผลเดิม {sum(result['cached'] for result in loaded)} ไฟล์) | "
+            f"{len(df):,} แถว | หน่วยความจำ {memory_mb(df):.1f} MB"
         )
-        
-        # **กำหนดชื่อคอลัมน์ใหม่โดยตรง**
-        df.columns = new_column_names
-        
-        # แปลง BoxesQty เป็นตัวเลข (เผื่อมีค่าที่ไม่ใช่ตัวเลข)
-        df['BoxesQty'] = pd.to_numeric(df['BoxesQty'], errors='coerce').fillna(0).astype(int)
+
+        # บันทึก Snapshot ไว้ให้เปิดครั้งต่อไปได้ทันที
+        try:
+            get_snapshot_store().write(df, cube=get_dataset_registry().publish(df).cube)
+        except Exception as e:
+            st.warning(f"บันทึก Snapshot ไม่สำเร็จ: {e}")
 
         return df
     except Exception as e:
@@ -76,70 +154,65 @@ def main():
     # ให้คอลัมน์ซ้าย (Charts) กว้างกว่าคอลัมน์ขวา (Tables/Uploader)
     left_main_col, right_main_col = st.columns([1.5, 1])
 
-    uploaded_file = None
+    uploaded_files = []
     df = pd.DataFrame() # กำหนด df เป็น DataFrame ว่างเปล่าล่วงหน้า
+    figure_cache = get_figure_cache()
+    watcher = get_folder_watcher()
+    watch_result = watcher.latest() if watcher is not None else None
 
     # ------------------------------------------------------------------
     # 💥 คอลัมน์ขวา (Header, Uploader, Pie Chart, Section 3)
     # ------------------------------------------------------------------
     with right_main_col:
         st.markdown("<br>", unsafe_allow_html=True) 
-        uploaded_file = st.file_uploader("", type=["xlsx", "xlsm"])
+        uploaded_files = st.file_uploader("", type=["xlsx", "xlsm"], accept_multiple_files=True)
+
+        # โหลดข้อมูลทันทีเมื่อมีการอัปโหลดไฟล์ (หลายไฟล์ เช่น Export ของแต่ละกะ รวมเป็นชุดเดียว)
+        if uploaded_files:
+            df = load_data(uploaded_files, SHEET_NAME)
+        elif watch_result is not None and not watch_result.data.empty:
+            # Watch Folder: ข้อมูลจากไฟล์ในโฟลเดอร์ (Parse ใน Background แล้ว ไม่ต้องอัปโหลด)
+            df = watch_result.data
+            failed = [file for file in watch_result.files if file['error']]
+            for file in failed:
+                st.error(f"เกิดข้อผิดพลาดในการโหลดไฟล์ {file['file']}: {file['error']}")
+            st.caption(
+                f"📂 {len(watch_result.files) - len(failed)} ไฟล์จาก {WATCH_DIR} | {len(df):,} แถว | "
+                f"อัปเดต ณ {watch_result.updated_at:%d/%m/%Y %H:%M:%S}"
+            )
+        else:
+            # ยังไม่ได้อัปโหลด: แสดงข้อมูลจากไฟล์ล่าสุดที่เคยอัปโหลด (ถ้ามี)
+            snapshot_path = get_snapshot_store().latest_path()
+            if snapshot_path is not None:
+                df, snapshot_time = load_snapshot(snapshot_path)
+                if snapshot_time is not None:
+                    st.caption(f"📦 แสดงข้อมูลจากไฟล์ที่อัปโหลดล่าสุด ณ {snapshot_time:%d/%m/%Y %H:%M:%S}")
 
-        # โหลดข้อมูลทันทีเมื่อมีการอัปโหลดไฟล์
-        if uploaded_file is not None:
-            df = load_data(uploaded_file, SHEET_NAME)
+        if watcher is not None:
+            watch_folder_updates(watcher, watch_result.version if watch_result is not None else 0)
 
-        # Pie Chart: ยอดรวม Order ID (ไม่ซ้ำ) แยกตาม Store
         if not df.empty:
-            st.markdown("<br>", unsafe_allow_html=True) 
-
-            # 1. เตรียมข้อมูลสำหรับ Pie Chart
-            pie_data = df.groupby('Store')['Order ID'].nunique().reset_index()
-            pie_data = pie_data.rename(columns={'Order ID': 'Total Order Count'})
-            
-            # 2. สร้าง Pie Chart
-            fig_pie = px.pie(
-                pie_data,
-                values='Total Order Count',
-                names='Store',
-                hole=.3, 
-                color='Store', 
-                color_discrete_map=STORE_COLOR_MAP
+            # ยอดรวม / Index / Top-N ของไฟล์ชุดนี้ สร้างครั้งเดียวใช้ร่วมกันทุก Session
+            dataset = get_dataset_registry().publish(df)
+            cube = dataset.cube
+
+            # วาดกราฟเฉพาะ Store ที่เลือก (ไฟล์ที่มีหลาย Store ไม่ต้องสร้างกราฟทุก Store ทุกครั้ง)
+            visible_stores = st.multiselect(
+                "🏬 Store ที่แสดง", cube.stores, default=cube.stores[:VISIBLE_STORES],
+                help="Pie Chart แสดงทุก Store ส่วนกราฟ Section 1-3 แสดงเฉพาะ Store ที่เลือก"
             )
 
-            # ตั้งค่า rotation และ sort
-            fig_pie.update_traces(
-                textposition='inside', 
-                textinfo='text',
-                texttemplate="%{value:,}<br>(%{percent})", 
-                hoverinfo='label+percent+value',
-                textfont_size=16,
-                rotation=360, 
-                sort=False 
-            )
+        # Pie Chart: ยอดรวม Order ID (ไม่ซ้ำ) แยกตาม Store
+        if not df.empty:
+            st.markdown("<br>", unsafe_allow_html=True) 
 
-            # ย้าย Legend
-            fig_pie.update_layout(
-                margin=dict(t=0, b=0, l=0, r=0), 
-                showlegend=True,
-                legend=dict(
-                    orientation="v", 
-                    yanchor="top",
-                    y=0.5, 
-                    xanchor="right",
-                    x=-0.2 
+            # เตรียมข้อมูลและสร้าง Pie Chart (ใช้ Figure เดิมถ้าข้อมูลไม่เปลี่ยน)
+            fig_pie = figure_cache.get_or_build(
+                ('store_pie', cube.fingerprint),
+                lambda: store_pie_figure(
+                    cube.orders_by_store().rename(columns={'Orders': 'Total Order Count'}), STORE_COLOR_MAP
                 )
             )
-            
-            # ปรับรูปแบบ Label (โค้ดซ้ำซ้อนจาก `update_traces` ด้านบน แต่คงไว้ตามไฟล์เดิม)
-            fig_pie.update_traces(
-                textposition='inside', 
-                textinfo='percent+value',
-                texttemplate="%{value:,}<br>(%{percent})",
-                hoverinfo='label+percent+value',
-                textfont_size=18
-            )
 
             # แสดงผล Pie Chart
             st.plotly_chart(fig_pie, use_container_width=True)
@@ -150,43 +223,40 @@ def main():
             st.markdown("<br>", unsafe_allow_html=True) 
 
         # ------------------------------------------------------------------
-        # 💥 Section 3: Top 10 (ย้ายมาไว้คอลัมน์ขวา)
+        # 💥 Section 3: Top-N (ย้ายมาไว้คอลัมน์ขวา)
         # ------------------------------------------------------------------
         if not df.empty:
             st.divider()
 
-            # ฟังก์ชัน Top 10 รายการ Cannotpick (ต้องกำหนดไว้ก่อนใช้)
-            def display_top_10(df_all, store_id, title_col):
-                # (โค้ดฟังก์ชัน display_top_10 เหมือนเดิม)
-                cant_pick_store_df = df_all[
-                    (df_all['Remark'] == "Cannotpick") & 
-                    (df_all['Store'].astype(str) == str(store_id))
-                ]
+            # ฟังก์ชันแสดงตาราง Top-N รายการ Cannotpick ของ 1 Store (ต้องกำหนดไว้ก่อนใช้)
+            def display_top_n(top_by_store, store_id, title_col):
                 with title_col:
-                    st.subheader(f"Store {store_id} (Top 10 Cannotpick)")
-                    if cant_pick_store_df.empty:
+                    st.subheader(f"Store {store_id} (Top {top_n} Cannotpick)")
+                    top_data = top_by_store.get(store_id)
+                    if top_data is None:
                         st.info(f"ไม่พบข้อมูล 'Cannotpick' สำหรับ Store {store_id}")
                         return
-                    top_data = cant_pick_store_df.groupby(['SKU (TPNB)', 'Description'])['BoxesQty'].sum().reset_index()
-                    top_data = top_data.sort_values(by='BoxesQty', ascending=False).head(10).reset_index(drop=True)
-                    top_data.index = top_data.index + 1
-                    top_data = top_data.rename_axis('Rank')
                     st.dataframe(
                         top_data, 
                         use_container_width=True,
                         column_config={"BoxesQty": st.column_config.NumberColumn("BoxesQty", format="%d")}
                     )
 
-            st.header("3. Top 10 รายการ 'Cannotpick' (แยกตาม Store)")
+            header_slot = st.empty()
+            col_top_n, col_by_seller = st.columns(2)
+            top_n = col_top_n.number_input("จำนวนอันดับ", min_value=1, max_value=100, value=TOP_ITEMS_N, step=5)
+            by_seller = col_by_seller.toggle("แยกตาม Seller Center", value=False)
+            top_scope = "Store และ Seller Center" if by_seller else "Store"
+            header_slot.header(f"3. Top {top_n} รายการ 'Cannotpick' (แยกตาม {top_scope})")
+
+            # คำนวณ Top-N ของทุก Store ในรอบเดียว (จำผลไว้ในชุดข้อมูลตาม N / การแยก Seller)
+            top_by_store = dataset.top_items(top_n, by_seller)
                 
-            # สร้างคอลัมน์สำหรับตาราง (ซ้อนภายในคอลัมน์ขวาหลัก)
-            col_7888, col_7886 = st.columns(2)
-            
-            # สร้างตารางสำหรับ Store 7888
-            display_top_10(df, 7888, col_7888)
-            
-            # สร้างตารางสำหรับ Store 7886
-            display_top_10(df, 7886, col_7886)
+            # สร้างคอลัมน์สำหรับตาราง (ซ้อนภายในคอลัมน์ขวาหลัก) แถวละ 2 Store
+            for row_start in range(0, len(visible_stores), 2):
+                top_cols = st.columns(2)
+                for store_id, title_col in zip(visible_stores[row_start:row_start + 2], top_cols):
+                    display_top_n(top_by_store, store_id, title_col)
 
 
     # ------------------------------------------------------------------
@@ -200,56 +270,28 @@ def main():
         )
         if not df.empty:
             
-            # ดึงรายชื่อ Store ที่ไม่ซ้ำกัน
-            Stores = df['Store'].unique()
+            # Store ที่เลือกไว้ (จากคอลัมน์ขวา)
+            Stores = visible_stores
 
             # ------------------------------------------------------------------
             # Section 1: Pending by Store (ย้ายมาไว้คอลัมน์ซ้าย)
             # ------------------------------------------------------------------
             st.header("1. Pending by Store")
 
-            # สร้างคอลัมน์ใน Streamlit ให้เท่ากับจำนวน Store
-            bar_cols = st.columns(len(Stores))
+            # สร้างคอลัมน์ใน Streamlit ให้เท่ากับจำนวน Store ที่เลือก
+            if not Stores:
+                st.info("เลือก Store ที่ต้องการดูทางขวา", icon="🏬")
+            bar_cols = st.columns(max(len(Stores), 1))
 
             for i, Store in enumerate(Stores):
                 with bar_cols[i]:
                     st.subheader(f"Store: {Store}")
-                    Store_df = df[df['Store'] == Store]
-                    
-                    # (โค้ดเตรียมข้อมูล Bar Chart เหมือนเดิม)
-                    order_data = Store_df.groupby('Remark')['Order ID'].nunique().reset_index()
-                    order_data['Metric'] = 'Order Count'
-                    order_data = order_data.rename(columns={'Order ID': 'Value'})
-                    box_data = Store_df.groupby('Remark')['BoxesQty'].sum().reset_index()
-                    box_data['Metric'] = 'Boxes Qty'
-                    box_data = box_data.rename(columns={'BoxesQty': 'Value'})
-                    combined_data = pd.concat([order_data, box_data])
-                    total_order_count = combined_data[combined_data['Metric'] == 'Order Count']['Value'].sum()
-                    total_boxes_qty = combined_data[combined_data['Metric'] == 'Boxes Qty']['Value'].sum()
-
-                    # สร้าง Stacked Bar Chart
-                    fig_bar = px.bar(
-                        combined_data, x='Metric', y='Value', color='Remark',
-                        barmode='stack', color_discrete_map=COLOR_MAP,
-                        text='Value', category_orders={"Remark": ["Canpick", "Cannotpick"]}
-                    )
-                    fig_bar.update_traces(textposition='inside', textangle=0, textfont_size=11)
-                    
-                    # Annotation (ยอดรวม)
-                    fig_bar.add_annotation(
-                        x='Order Count', y=total_order_count * 1.05, 
-                        text=f"Total Order : {total_order_count:,}", 
-                        showarrow=False, font=dict(size=14, color="black", family="Arial Black")
+                    # สร้าง Stacked Bar Chart จาก Cube (พร้อม Annotation ยอดรวม)
+                    fig_bar = figure_cache.get_or_build(
+                        ('store_bar', cube.fingerprint, Store),
+                        lambda: store_bar_figure(cube.store_remark(Store), COLOR_MAP)
                     )
-                    fig_bar.add_annotation(
-                        x='Boxes Qty', y=total_boxes_qty * 1.1, 
-                        text=f"Total Boxes : {total_boxes_qty:,}", 
-                        showarrow=False, font=dict(size=14, color="black", family="Arial Black")
-                    )
-                    
-                    y_max = max(total_order_count, total_boxes_qty) * 1.2 
-                    fig_bar.update_yaxes(range=[0, y_max])
-                    st.plotly_chart(fig_bar, use_container_width=True)
+                    st.plotly_chart(fig_bar, use_container_width=True, key=f"store_bar_{Store}")
 
             st.divider()
 
@@ -258,45 +300,35 @@ def main():
             # ------------------------------------------------------------------
             st.header("2. Pending by Seller Center")
 
-            stack_cols = st.columns(len(Stores))
+            stack_cols = st.columns(max(len(Stores), 1))
 
             for i, Store in enumerate(Stores):
                 with stack_cols[i]:
                     st.subheader(f"Store: {Store}")
-                    Store_df = df[df['Store'] == Store]
-                    
-                    # (โค้ดเตรียมข้อมูล Stack Chart เหมือนเดิม)
-                    stack_data = Store_df.groupby(['Seller Center', 'Remark'])['Order ID'].nunique().reset_index()
-                    total_order_by_seller = stack_data.groupby('Seller Center')['Order ID'].sum().reset_index()
-                    
-                    # สร้าง Stacked Chart
-                    fig_stack = px.bar(
-                        stack_data, x='Seller Center', y='Order ID', color='Remark',
-                        barmode='stack', color_discrete_map=COLOR_MAP,
-                        text='Order ID', category_orders={"Remark": ["Canpick", "Cannotpick"]}
-                    )
-                    fig_stack.update_traces(textposition='inside', textangle=0, textfont_size=11)
-                    
-                    # Annotation (ยอดรวม)
-                    y_max_store = 0
-                    for _, row in total_order_by_seller.iterrows():
-                        seller = row['Seller Center']
-                        total_count = row['Order ID']
-                        fig_stack.add_annotation(
-                            x=seller, y=total_count * 1.1, 
-                            text=f"Total Order : {total_count:,}",
-                            showarrow=False, font=dict(size=14, color="black", family="Arial Black")
+                    # สร้าง Stacked Chart จาก Cube (ยอดรวมเป็น text trace เดียว, Seller ที่เกิน SELLER_TOP_K รวมเป็น "Other")
+                    fig_stack = figure_cache.get_or_build(
+                        ('seller_bar', cube.fingerprint, Store, SELLER_TOP_K),
+                        lambda: seller_stack_figure(
+                            cube.store_seller_remark(Store)[['Seller Center', 'Remark', 'Orders']]
+                            .rename(columns={'Orders': 'Order ID'}),
+                            COLOR_MAP
                         )
-                        if total_count > y_max_store:
-                            y_max_store = total_count
-
-                    fig_stack.update_yaxes(range=[0, y_max_store * 1.2])
-                    st.plotly_chart(fig_stack, use_container_width=True)
+                    )
+                    st.plotly_chart(fig_stack, use_container_width=True, key=f"seller_bar_{Store}")
         
         else:
             # คอลัมน์ซ้ายจะว่างเปล่าหากยังไม่อัปโหลดไฟล์
             pass
 
+    # ------------------------------------------------------------------
+    # 💥 รายละเอียด Order (เต็มความกว้าง ใต้ทั้ง 2 คอลัมน์)
+    # ------------------------------------------------------------------
+    if not df.empty:
+        with st.expander("🔎 รายละเอียด Order (Drill-down)"):
+            render_order_explorer(dataset.order_index)
+        with st.expander("⬇️ ส่งออกข้อมูล (CSV / Parquet / Excel)"):
+            render_export(dataset.order_index, "pending_upload")
+
 
 if __name__ == '__main__':
     main()
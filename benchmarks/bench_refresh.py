@@ -0,0 +1,208 @@
+"""
+จับเวลาการดึงข้อมูลทั้งรอบ (fetch_all_data) แยกตามขั้นตอน โดยใช้ Stub Server ในเครื่อง
+
+    python benchmarks/bench_refresh.py
+    python benchmarks/bench_refresh.py --rows 5000 50000 --repeat 5 --latency 0.05
+    python benchmarks/bench_refresh.py --save-baseline      # บันทึกผลเป็น baselines.json
+    python benchmarks/bench_refresh.py --check              # exit 1 ถ้าขั้นไหนช้ากว่า baseline เกิน --tolerance
+
+ขั้นตอนที่จับเวลา (ค่ากลางจาก --repeat รอบ)
+    login      Login ใหม่ (GET หน้า Logon + POST)
+    download   ดาวน์โหลดทุก Report ใน REPORTS_TO_FETCH ต่อกัน (Stream ลง Buffer)
+    parse      read_xlsx ทุกไฟล์
+    dedupe     concat + drop_duplicates Order ID
+    boxes      คำนวณ BoxesQty
+    normalize  เปลี่ยนชื่อคอลัมน์ + normalize_pending
+    aggregate  build_cube (ยอดรวมที่ทุกกราฟใช้)
+    cold       fetch_all_data ทั้งรอบ (Cache ว่าง)
+    warm       fetch_all_data รอบถัดไป (ไฟล์ไม่เปลี่ยน ได้ 304)
+    first      fetch_all_data รอบแรกอีกครั้ง จนถึง Store แรกที่ได้ข้อมูลเบื้องต้น (on_store_ready)
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd  # noqa: E402
+
+import pending_pipeline  # noqa: E402
+from marketplace_session import MarketPlaceSession, read_body  # noqa: E402
+from marketplace_stub import MarketPlaceStub  # noqa: E402
+from pending_aggregates import build_cube  # noqa: E402
+from pending_schema import normalize_pending  # noqa: E402
+from report_cache import ReportFrameCache  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+STAGES = ['login', 'download', 'parse', 'dedupe', 'boxes', 'normalize', 'aggregate', 'cold', 'warm', 'first']
+
+
+def _use_stub(stub):
+    # Port ของ Stub สุ่มตอนเริ่ม จึงตั้ง URL ของ pipeline ตรง ๆ แทน MKP_BASE_URL
+    pending_pipeline.BASE_URL = stub.base_url
+    pending_pipeline.LOGIN_URL = f"{stub.base_url}/Home/Logon"
+    pending_pipeline.DOWNLOAD_URL = f"{stub.base_url}/PickingList/PrintReport"
+
+
+def _new_session():
+    return MarketPlaceSession(
+        pending_pipeline.LOGIN_URL, pending_pipeline.USERNAME, pending_pipeline.PASSWORD,
+        timeout=pending_pipeline.TIMEOUT_SEC
+    )
+
+
+def _timed(timings, stage, fn, *args):
+    started = time.perf_counter()
+    value = fn(*args)
+    timings[stage].append(time.perf_counter() - started)
+    return value
+
+
+def _download_all(mp_session):
+    contents = []
+    for report in pending_pipeline.REPORTS_TO_FETCH:
+        params = {'typereport': report['type'], 'storeno': report['store']}
+        response = mp_session.get(pending_pipeline.DOWNLOAD_URL, params=params, timeout=pending_pipeline.TIMEOUT_SEC, stream=True)
+        try:
+            response.raise_for_status()
+            contents.append(read_body(response, pending_pipeline.MAX_REPORT_BYTES))
+        finally:
+            response.close()
+    return contents
+
+
+def _dedupe(frames):
+    return pending_pipeline.drop_duplicate_orders(pd.concat(frames, ignore_index=True))
+
+
+def _normalize(df_combined):
+    return normalize_pending(pending_pipeline.to_pending_columns(df_combined))[0]
+
+
+def run_scenario(stub, repeat):
+    """
+    คืน (dict stage -> list ของเวลา, จำนวนแถวหลัง dedupe, ขนาดไฟล์รวม bytes)
+    """
+    _use_stub(stub)
+    timings = {stage: [] for stage in STAGES}
+    rows = nbytes = 0
+
+    for _ in range(repeat):
+        mp_session = _new_session()
+        _timed(timings, 'login', mp_session.ensure_login)
+        contents = _timed(timings, 'download', _download_all, mp_session)
+        frames = _timed(timings, 'parse', lambda: [
+            pending_pipeline.parse_report(content, report)
+            for content, report in zip(contents, pending_pipeline.REPORTS_TO_FETCH)
+        ])
+        df_combined = _timed(timings, 'dedupe', _dedupe, frames)
+        df_combined = _timed(timings, 'boxes', pending_pipeline.add_boxes_qty, df_combined)
+        df_final = _timed(timings, 'normalize', _normalize, df_combined)
+        _timed(timings, 'aggregate', build_cube, df_final)
+
+        # ทั้งรอบผ่าน fetch_all_data จริง (Session + Cache ใหม่ = รอบแรกของ Process)
+        mp_session = _new_session()
+        report_cache = ReportFrameCache()
+        log = pending_pipeline.FetchLog()
+        df_cold = _timed(timings, 'cold', pending_pipeline.fetch_all_data, mp_session, report_cache, log)
+        _timed(timings, 'warm', pending_pipeline.fetch_all_data,
+               mp_session, report_cache, pending_pipeline.FetchLog())
+        if df_cold.empty:
+            errors = [message for level, message in log.entries if level == 'error']
+            raise RuntimeError(f"fetch_all_data คืนข้อมูลว่าง: {errors}")
+
+        # เวลาถึงกราฟแรก: รอบแรกอีกครั้ง (แยกจาก cold เพื่อไม่ให้ข้อมูลเบื้องต้นรวมในเวลาเดิม)
+        first_ready = []
+        started = time.perf_counter()
+        pending_pipeline.fetch_all_data(
+            _new_session(), ReportFrameCache(), pending_pipeline.FetchLog(),
+            on_store_ready=lambda store, df_store: first_ready.append(time.perf_counter() - started)
+        )
+        timings['first'].append(first_ready[0] if first_ready else time.perf_counter() - started)
+
+        rows = len(df_final)
+        nbytes = sum(len(content) for content in contents)
+    return timings, rows, nbytes
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[5_000, 50_000], help="จำนวนแถวต่อไฟล์ Report")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help="เวลาหน่วงของ Stub ต่อ Request (วินาที)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help="exit 1 ถ้าช้ากว่า baseline เกิน tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="สัดส่วนที่ยอมให้ช้าลง (0.25 = 25%%)")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="ไม่นับเป็น Regression ถ้าช้าลงน้อยกว่านี้ (วินาที) กันขั้นที่ใช้เวลาระดับ ms แกว่ง")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baseline)
+    regressions = []
+    measured = {}
+
+    for rows in args.rows:
+        scenario = f"rows={rows},latency={args.latency:g}"
+        with MarketPlaceStub(rows=rows, latency_sec=args.latency) as stub:
+            for report in pending_pipeline.REPORTS_TO_FETCH:
+                stub.report(report['store'], report['type'])  # สร้างไฟล์ก่อน ไม่นับรวมในเวลา
+            timings, final_rows, nbytes = run_scenario(stub, args.repeat)
+
+        medians = {stage: statistics.median(values) for stage, values in timings.items()}
+        measured[scenario] = {stage: round(value, 4) for stage, value in medians.items()}
+        baseline = baselines.get('scenarios', {}).get(scenario, {})
+
+        print(f"\n{scenario}  ({final_rows:,} rows after dedupe, {nbytes / 1024 / 1024:.1f} MB downloaded)")
+        print(f"  {'stage':<10} {'median s':>9} {'min s':>8} {'baseline s':>11} {'change':>8}")
+        for stage in STAGES:
+            median = medians[stage]
+            reference = baseline.get(stage)
+            if reference:
+                change = (median - reference) / reference
+                regressed = change > args.tolerance and median - reference > args.min_delta
+                flag = "  REGRESSION" if regressed else ""
+                if flag:
+                    regressions.append((scenario, stage, reference, median))
+                print(f"  {stage:<10} {median:>9.3f} {min(timings[stage]):>8.3f} {reference:>11.3f} {change:>+8.0%}{flag}")
+            else:
+                print(f"  {stage:<10} {median:>9.3f} {min(timings[stage]):>8.3f} {'-':>11} {'-':>8}")
+
+    if args.save_baseline:
+        baselines.setdefault('scenarios', {}).update(measured)
+        baselines['environment'] = {
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nบันทึก baseline ที่ {args.baseline}")
+
+    if regressions:
+        print(f"\n⚠️ ช้ากว่า baseline เกิน {args.tolerance:.0%}:")
+        for scenario, stage, reference, median in regressions:
+            print(f"  {scenario} {stage}: {reference:.3f}s -> {median:.3f}s")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
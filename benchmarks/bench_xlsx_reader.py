@@ -0,0 +1,69 @@
+"""
+เปรียบเทียบความเร็วของแต่ละ Engine ใน xlsx_reader กับไฟล์ทดสอบขนาด 10k / 100k / 500k แถว
+
+    python benchmarks/bench_xlsx_reader.py
+    python benchmarks/bench_xlsx_reader.py --rows 10000 100000 --repeat 3 --engines calamine openpyxl-stream
+
+ไฟล์ทดสอบจะถูกสร้างครั้งแรกแล้วเก็บไว้ที่ --data-dir (ครั้งต่อไปใช้ซ้ำ)
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xlsx_reader  # noqa: E402
+from synthetic_reports import NAMES, SHEET_NAME, USE_COLS, write_marketplace_workbook  # noqa: E402
+
+
+def workbook_path(data_dir, rows):
+    path = os.path.join(data_dir, f"bench_marketplace_{rows}.xlsx")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        write_marketplace_workbook(path, rows)
+        print(f"  generated {path} in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def bench(path, engine, repeat):
+    timings = []
+    frame = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        frame = xlsx_reader.read_xlsx(path, USE_COLS, NAMES, header_row=0, sheet_name=SHEET_NAME, engine=engine)
+        timings.append(time.perf_counter() - started)
+    return timings, frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--engines', nargs='+', default=xlsx_reader.available_engines(),
+                        choices=sorted(xlsx_reader.READERS))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'mkp_bench'))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(f"{'rows':>9}  {'engine':<16} {'median s':>9} {'min s':>8} {'rows/s':>11}  same-as-openpyxl")
+    for rows in args.rows:
+        path = workbook_path(args.data_dir, rows)
+        reference = None
+        results = []
+        for engine in args.engines:
+            timings, frame = bench(path, engine, args.repeat)
+            if engine == 'openpyxl':
+                reference = frame
+            results.append((engine, timings, frame))
+
+        for engine, timings, frame in results:
+            median = statistics.median(timings)
+            same = '-' if reference is None else ('yes' if frame.equals(reference) else 'NO')
+            print(f"{rows:>9,}  {engine:<16} {median:>9.2f} {min(timings):>8.2f} {len(frame) / median:>11,.0f}  {same}")
+
+
+if __name__ == '__main__':
+    main()
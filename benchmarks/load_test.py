@@ -0,0 +1,447 @@
+"""
+จำลองหลายหน้าจอ (Viewer) เปิด Dashboard พร้อมกันบน Streamlit Server เดียว ด้วย AppTest
+
+    python benchmarks/load_test.py                                   # Pending_auto_dashboard, 1 / 4 / 16 Viewer
+    python benchmarks/load_test.py --viewers 1 8 32 --duration 120 --rows 20000 --latency 0.05
+    python benchmarks/load_test.py --app upload --viewers 1 4 --files 2
+    python benchmarks/load_test.py --json load_test.json             # บันทึกผลทุก Scenario เป็น JSON
+
+แต่ละ Scenario (จำนวน Viewer) รันใน Process ใหม่ มี Stub Server (marketplace_stub) และโฟลเดอร์ Snapshot ของตัวเอง
+ทุก Viewer อยู่ใน Process เดียวกันเหมือน Session บน Server จริง st.cache_data / st.cache_resource จึงใช้ร่วมกัน
+
+แต่ละ Viewer เปิดหน้า (open) แล้วสุ่มทำทีละอย่างจนครบ --duration วินาที (เว้น --think วินาทีโดยเฉลี่ย)
+    rerun     Rerun ทั้งหน้า (เหมือนหน้าจอที่เปิดค้างไว้ได้ข้อมูลรอบใหม่)
+    filter    เปลี่ยน Store ที่แสดง
+    explore   กรอง Remark ในส่วนรายละเอียด Order
+    refresh   กด Refresh Now (auto เท่านั้น โอกาส --refresh-ratio) รอผลการดึงข้อมูลจาก Stub
+    upload    อัปโหลดไฟล์ (upload เท่านั้น ตอนเปิดหน้า)
+Stub เปลี่ยนข้อมูลทุก --rotate-sec วินาที และ Background Refresh ดึงทุก --refresh-interval วินาที
+
+ผลที่รายงาน
+    latency   p50 / p90 / p99 / max ของเวลา Rerun แยกตาม action (ms)
+    rss       RSS ก่อนเปิด Session, สูงสุดระหว่างทดสอบ และ (สูงสุด - ก่อนเปิด) / Viewer
+              ถ้ามี Scenario 1 Viewer จะคำนวณส่วนเพิ่มต่อ Viewer (marginal) เทียบกับ Scenario นั้นด้วย
+    cache     hit rate ของแต่ละฟังก์ชัน st.cache_data / st.cache_resource, FigureCache, DatasetRegistry และ 304 ของ Report
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+APPS = {
+    'auto': 'Pending_auto_dashboard',
+    'upload': 'Pending_dashboard',
+}
+STORE_FILTER_LABEL = "🏬 Store ที่แสดง"
+ACTIONS = ['open', 'upload', 'rerun', 'filter', 'explore', 'refresh']
+
+_ENTRY_SCRIPT = """\
+import sys
+sys.path.insert(0, {repo_dir!r})
+import {module}
+{module}.main()
+"""
+
+# AppTest ยังสั่ง st.file_uploader ไม่ได้: ให้ file_uploader คืนไฟล์ที่ Viewer ตั้งไว้ใน session_state แทน
+_UPLOAD_ENTRY_SCRIPT = """\
+import io
+import sys
+sys.path.insert(0, {repo_dir!r})
+import streamlit as st
+import {module}
+
+
+class _UploadedFile(io.BytesIO):
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+
+
+def _file_uploader(*args, **kwargs):
+    files = [_UploadedFile(name, content) for name, content in st.session_state.get('load_test_upload', [])]
+    return files if kwargs.get('accept_multiple_files') else (files[0] if files else None)
+
+
+st.file_uploader = _file_uploader
+{module}.main()
+"""
+
+
+# ----------------------------------------------------------------------
+# หน่วยความจำของ Process
+# ----------------------------------------------------------------------
+def current_rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """
+    อ่าน RSS ทุก interval_sec ใน Thread แยก เก็บค่าสูงสุด (psutil / /proc ไม่มีจะได้ None)
+    """
+
+    def __init__(self, interval_sec=0.1):
+        self.interval_sec = interval_sec
+        self.peak_mb = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            rss = current_rss_mb()
+            if rss is not None:
+                self.peak_mb = max(self.peak_mb or 0, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+# ----------------------------------------------------------------------
+# นับ hit / miss ของ st.cache_data / st.cache_resource
+# ----------------------------------------------------------------------
+def instrument_caches(module):
+    """
+    ครอบทุกฟังก์ชัน Cache ใน module: นับจำนวนครั้งที่เรียก และจำนวนครั้งที่ฟังก์ชันจริงทำงาน (miss)
+    ใช้ภายในของ CachedFunc (_get_or_create_cached_value / _info.func) ถ้า Streamlit เปลี่ยนจะข้ามฟังก์ชันนั้นไป
+    """
+    from streamlit.runtime.caching.cache_utils import CachedFunc
+
+    lock = threading.Lock()
+    counters = {}
+    for name, cached in vars(module).items():
+        if not isinstance(cached, CachedFunc):
+            continue
+        if not hasattr(cached, '_get_or_create_cached_value') or not hasattr(getattr(cached, '_info', None), 'func'):
+            continue
+        stats = counters[name] = {'calls': 0, 'misses': 0}
+
+        def count(field, fn, _stats=stats):
+            @functools.wraps(fn)
+            def counted(*args, **kwargs):
+                with lock:
+                    _stats[field] += 1
+                return fn(*args, **kwargs)
+            return counted
+
+        cached._get_or_create_cached_value = count('calls', cached._get_or_create_cached_value)
+        cached._info.func = count('misses', cached._info.func)
+    return counters
+
+
+def cache_report(counters):
+    report = {}
+    for name, stats in counters.items():
+        calls, misses = stats['calls'], stats['misses']
+        report[name] = {
+            'calls': calls,
+            'misses': misses,
+            'hit_rate': round((calls - misses) / calls, 4) if calls else None,
+        }
+    return report
+
+
+# ----------------------------------------------------------------------
+# Viewer
+# ----------------------------------------------------------------------
+class Viewer:
+    """
+    Session เดียวของ Dashboard (AppTest 1 ตัว) บันทึกเวลาแต่ละ action ลง samples
+    """
+
+    def __init__(self, viewer_id, script_path, args, upload_file=None):
+        from streamlit.testing.v1 import AppTest
+
+        self.viewer_id = viewer_id
+        self.args = args
+        self.upload_file = upload_file
+        self.random = random.Random(viewer_id)
+        self.at = AppTest.from_file(script_path, default_timeout=args.timeout)
+        self.samples = []   # (action, seconds, error)
+
+    def _timed(self, action, fn):
+        started = time.perf_counter()
+        error = None
+        try:
+            fn()
+            if len(self.at.exception):
+                error = self.at.exception[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.samples.append((action, time.perf_counter() - started, error))
+
+    def _widget(self, kind, label=None, key=None):
+        try:
+            if key is not None:
+                return getattr(self.at, kind)(key=key)
+            return next(widget for widget in getattr(self.at, kind) if widget.label.startswith(label))
+        except (KeyError, StopIteration):
+            return None
+
+    def open(self):
+        self._timed('open', self.at.run)
+        if self.upload_file is not None:
+            self.at.session_state['load_test_upload'] = [self.upload_file]
+            self._timed('upload', self.at.run)
+
+    def step(self):
+        choices = ['rerun', 'filter', 'explore']
+        action = self.random.choice(choices)
+        if self.upload_file is None and self.random.random() < self.args.refresh_ratio:
+            action = 'refresh'
+
+        if action == 'filter':
+            stores = self._widget('multiselect', label=STORE_FILTER_LABEL)
+            if stores is not None and stores.options:
+                picked = self.random.sample(list(stores.options), self.random.randint(1, len(stores.options)))
+                self._timed(action, lambda: stores.set_value(picked).run())
+                return
+        elif action == 'explore':
+            remarks = self._widget('multiselect', key='explorer_remark')
+            if remarks is not None and remarks.options:
+                picked = self.random.sample(list(remarks.options), self.random.randint(0, len(remarks.options)))
+                self._timed(action, lambda: remarks.set_value(picked).run())
+                return
+        elif action == 'refresh':
+            button = self._widget('button', label="🔄")
+            if button is not None:
+                self._timed(action, lambda: button.click().run())
+                return
+        self._timed('rerun', self.at.run)
+
+    def run(self, deadline):
+        self.open()
+        while time.monotonic() < deadline:
+            time.sleep(self.random.uniform(0, 2 * self.args.think))
+            if time.monotonic() >= deadline:
+                break
+            self.step()
+
+
+def latency_report(samples):
+    report = {}
+    for action in ACTIONS + ['all']:
+        seconds = [value for name, value, _ in samples if action in ('all', name)]
+        if not seconds:
+            continue
+        errors = sum(1 for name, _, error in samples if action in ('all', name) and error)
+        p50, p90, p99 = np.percentile(seconds, [50, 90, 99])
+        report[action] = {
+            'count': len(seconds),
+            'errors': errors,
+            'p50_ms': round(p50 * 1000, 1),
+            'p90_ms': round(p90 * 1000, 1),
+            'p99_ms': round(p99 * 1000, 1),
+            'max_ms': round(max(seconds) * 1000, 1),
+        }
+    return report
+
+
+# ----------------------------------------------------------------------
+# Scenario (รันใน Process ลูก)
+# ----------------------------------------------------------------------
+def run_scenario(args):
+    """
+    N Viewer พร้อมกันใน Process นี้ คืน dict ผลลัพธ์ (พิมพ์เป็น JSON ให้ Process แม่)
+    """
+    from marketplace_stub import MarketPlaceStub
+    from synthetic_reports import write_marketplace_workbook
+
+    work_dir = tempfile.mkdtemp(prefix="mkp-load-")
+    stub = MarketPlaceStub(rows=args.rows, latency_sec=args.latency).start()
+    # ตั้งก่อน import Dashboard (ค่าคงที่อ่านจาก Environment ตอน import)
+    os.environ['MKP_BASE_URL'] = stub.base_url
+    os.environ['MKP_SNAPSHOT_DIR'] = os.path.join(work_dir, 'snapshots')
+    os.environ['MKP_REFRESH_INTERVAL_SEC'] = str(args.refresh_interval)
+    os.environ['MKP_REFRESH_JITTER_SEC'] = '0'
+
+    module_name = APPS[args.app]
+    script_path = os.path.join(work_dir, f"{module_name}_entry.py")
+    with open(script_path, 'w', encoding='utf-8') as f:
+        entry = _UPLOAD_ENTRY_SCRIPT if args.app == 'upload' else _ENTRY_SCRIPT
+        f.write(entry.format(repo_dir=REPO_DIR, module=module_name))
+
+    upload_files = []
+    if args.app == 'upload':
+        for i in range(args.files):
+            path = os.path.join(work_dir, f"pending_{i}.xlsx")
+            write_marketplace_workbook(path, args.rows, seed=i)
+            with open(path, 'rb') as f:
+                upload_files.append((os.path.basename(path), f.read()))
+
+    # import ก่อนเปิด Session: RSS ก่อนเปิดรวม Library แล้ว และครอบฟังก์ชัน Cache ได้ก่อนใช้
+    module = __import__(module_name)
+    counters = instrument_caches(module)
+    baseline_mb = current_rss_mb()
+
+    viewers = [
+        Viewer(i, script_path, args, upload_file=upload_files[i % len(upload_files)] if upload_files else None)
+        for i in range(args.viewers)
+    ]
+
+    def rotate_stub(stop):
+        while not stop.wait(args.rotate_sec):
+            stub.rotate()
+
+    stop_rotate = threading.Event()
+    rotator = threading.Thread(target=rotate_stub, args=(stop_rotate,), name="stub-rotate", daemon=True)
+    started = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    with RssSampler() as rss:
+        rotator.start()
+        threads = [
+            threading.Thread(target=viewer.run, args=(deadline,), name=f"viewer-{viewer.viewer_id}", daemon=True)
+            for viewer in viewers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop_rotate.set()
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for viewer in viewers for sample in viewer.samples]
+    caches = cache_report(counters)
+    figure_stats = module.get_figure_cache().stats()
+    caches['FigureCache'] = {
+        'calls': figure_stats['hits'] + figure_stats['misses'],
+        'misses': figure_stats['misses'],
+        'hit_rate': round(figure_stats['hits'] / max(1, figure_stats['hits'] + figure_stats['misses']), 4),
+    }
+    dataset_stats = module.get_dataset_registry().stats()
+    caches['DatasetRegistry'] = {
+        'calls': dataset_stats['hits'] + dataset_stats['misses'],
+        'misses': dataset_stats['misses'],
+        'hit_rate': round(dataset_stats['hits'] / max(1, dataset_stats['hits'] + dataset_stats['misses']), 4),
+    }
+    stub.stop()
+
+    peak_mb = rss.peak_mb
+    return {
+        'app': args.app,
+        'viewers': args.viewers,
+        'seconds': round(elapsed, 2),
+        'reruns_per_sec': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency': latency_report(samples),
+        'rss': {
+            'baseline_mb': round(baseline_mb, 1) if baseline_mb is not None else None,
+            'peak_mb': round(peak_mb, 1) if peak_mb is not None else None,
+            'per_viewer_mb': (
+                round((peak_mb - baseline_mb) / args.viewers, 1)
+                if peak_mb is not None and baseline_mb is not None else None
+            ),
+        },
+        'caches': caches,
+        'stub': dict(stub.counters),
+    }
+
+
+# ----------------------------------------------------------------------
+# Process แม่: รันทุก Scenario แล้วสรุป
+# ----------------------------------------------------------------------
+def _scenario_argv(args, viewers):
+    return [
+        sys.executable, os.path.abspath(__file__), '--worker',
+        '--app', args.app, '--viewers', str(viewers), '--duration', str(args.duration),
+        '--think', str(args.think), '--refresh-ratio', str(args.refresh_ratio),
+        '--rows', str(args.rows), '--latency', str(args.latency), '--files', str(args.files),
+        '--rotate-sec', str(args.rotate_sec), '--refresh-interval', str(args.refresh_interval),
+        '--timeout', str(args.timeout),
+    ]
+
+
+def print_result(result, single_viewer=None):
+    rss = result['rss']
+    print(f"\napp={result['app']} viewers={result['viewers']}  "
+          f"({result['seconds']:.0f}s, {result['reruns_per_sec']} reruns/s)")
+    print(f"  {'action':<8} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for action, row in result['latency'].items():
+        print(f"  {action:<8} {row['count']:>6} {row['errors']:>6} {row['p50_ms']:>8.0f} "
+              f"{row['p90_ms']:>8.0f} {row['p99_ms']:>8.0f} {row['max_ms']:>8.0f}")
+
+    def mb(value):
+        return f"{value:,.1f} MB" if value is not None else "-"
+
+    print(f"  RSS ก่อนเปิด {mb(rss['baseline_mb'])} | สูงสุด {mb(rss['peak_mb'])} | ต่อ Viewer {mb(rss['per_viewer_mb'])}", end="")
+    if single_viewer is not None and result['viewers'] > 1 and rss['peak_mb'] and single_viewer['rss']['peak_mb']:
+        marginal = (rss['peak_mb'] - single_viewer['rss']['peak_mb']) / (result['viewers'] - 1)
+        print(f" | ส่วนเพิ่มต่อ Viewer {mb(marginal)}", end="")
+    print()
+
+    print(f"  {'cache':<22} {'calls':>7} {'misses':>7} {'hit rate':>9}")
+    for name, row in result['caches'].items():
+        hit_rate = f"{row['hit_rate']:.1%}" if row['hit_rate'] is not None else "-"
+        print(f"  {name:<22} {row['calls']:>7} {row['misses']:>7} {hit_rate:>9}")
+    stub = result['stub']
+    print(f"  Stub: login {stub['logins']} | report 200 {stub['reports']} | 304 {stub['not_modified']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', choices=sorted(APPS), default='auto')
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 4, 16], help="จำนวน Viewer ของแต่ละ Scenario")
+    parser.add_argument('--duration', type=float, default=60, help="เวลาทดสอบต่อ Scenario (วินาที)")
+    parser.add_argument('--think', type=float, default=1.0, help="เวลาเฉลี่ยระหว่าง action ของแต่ละ Viewer (วินาที)")
+    parser.add_argument('--refresh-ratio', type=float, default=0.05, help="โอกาสที่ action เป็นการกด Refresh Now")
+    parser.add_argument('--rows', type=int, default=5_000, help="จำนวนแถวต่อไฟล์ Report / ไฟล์ที่อัปโหลด")
+    parser.add_argument('--latency', type=float, default=0.0, help="เวลาหน่วงของ Stub ต่อ Request (วินาที)")
+    parser.add_argument('--files', type=int, default=1, help="จำนวนไฟล์ต่างกันที่ Viewer อัปโหลด (--app upload)")
+    parser.add_argument('--rotate-sec', type=float, default=30, help="Stub เปลี่ยนข้อมูลทุกกี่วินาที")
+    parser.add_argument('--refresh-interval', type=int, default=20, help="MKP_REFRESH_INTERVAL_SEC ระหว่างทดสอบ")
+    parser.add_argument('--timeout', type=float, default=180, help="เวลารอสูงสุดต่อ 1 Rerun (วินาที)")
+    parser.add_argument('--json', help="บันทึกผลทุก Scenario เป็นไฟล์ JSON")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        args.viewers = args.viewers[0]
+        print(json.dumps(run_scenario(args), ensure_ascii=False))
+        return 0
+
+    results = []
+    for viewers in args.viewers:
+        completed = subprocess.run(_scenario_argv(args, viewers), stdout=subprocess.PIPE, text=True, encoding='utf-8')
+        if completed.returncode != 0:
+            print(f"viewers={viewers}: Scenario ล้มเหลว (exit {completed.returncode})", file=sys.stderr)
+            return 1
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        single_viewer = next((r for r in results if r['viewers'] == 1), None)
+        print_result(result, single_viewer)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nบันทึกผลที่ {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Stub Server จำลอง MarketPlace สำหรับทดสอบ / Benchmark fetch_all_data โดยไม่ต้องต่อ Server จริง
+
+    python benchmarks/marketplace_stub.py --port 8765 --rows 50000 --latency 0.2 --failure-rate 0.05
+    MKP_BASE_URL=http://127.0.0.1:8765/MarketPlace streamlit run Pending_auto_dashboard.py
+
+- GET  /MarketPlace/Home/Logon                 หน้า Login ที่มี __RequestVerificationToken
+- POST /MarketPlace/Home/Logon                 ตรวจ Token แล้ว Redirect ไป /MarketPlace/Home/Index พร้อม Cookie
+- GET  /MarketPlace/PickingList/PrintReport    ไฟล์ xlsx (ไม่มี Cookie จะ Redirect กลับหน้า Logon เหมือนของจริง)
+                                               รองรับ If-None-Match (ETag) ตอบ 304 ถ้าไฟล์ไม่เปลี่ยน
+"""
+import argparse
+import hashlib
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_reports import print_report_bytes  # noqa: E402
+
+LOGON_PATH = "/MarketPlace/Home/Logon"
+INDEX_PATH = "/MarketPlace/Home/Index"
+REPORT_PATH = "/MarketPlace/PickingList/PrintReport"
+
+_LOGON_PAGE = (
+    '<html><body><form method="post" action="{path}">'
+    '<input name="__RequestVerificationToken" type="hidden" value="{token}" />'
+    '<input name="Username" /><input name="Password" type="password" />'
+    '</form></body></html>'
+)
+
+
+class MarketPlaceStub:
+    """
+    rows           จำนวนแถวต่อไฟล์ Report (int หรือ dict {(store, type): rows})
+    latency_sec    เวลาหน่วงก่อนตอบทุก Request
+    failure_rate   โอกาสที่ PrintReport ตอบ 500 (0-1)
+    bandwidth_mbps จำกัดความเร็วส่งไฟล์ (None = ไม่จำกัด) ใช้ดู Progress ระหว่างดาวน์โหลด
+    use_etag       ส่ง ETag และตอบ 304 เมื่อ If-None-Match ตรง
+
+    ไฟล์แต่ละ (store, type) สร้างครั้งเดียวแล้วใช้ซ้ำ จนกว่าจะเรียก rotate()
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rows=2000, latency_sec=0.0, failure_rate=0.0,
+                 bandwidth_mbps=None, use_etag=True, seed=0):
+        self.rows = rows
+        self.latency_sec = latency_sec
+        self.failure_rate = failure_rate
+        self.bandwidth_mbps = bandwidth_mbps
+        self.use_etag = use_etag
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self._reports = {}
+        self._version = 0
+        self._cookies = set()
+        self._token = secrets.token_hex(16)
+        self._random = random.Random(seed)
+        self.counters = {'logon_pages': 0, 'logins': 0, 'reports': 0, 'not_modified': 0,
+                         'failures': 0, 'redirects': 0, 'bytes_sent': 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/MarketPlace"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mkp-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def rotate(self):
+        """
+        เปลี่ยนข้อมูลทุก Report (รอบถัดไปจะได้ไฟล์ใหม่ ETag ใหม่)
+        """
+        with self._lock:
+            self._version += 1
+            self._reports.clear()
+
+    def expire_sessions(self):
+        """
+        ทำให้ Cookie ที่ Login ไว้ใช้ไม่ได้ (จำลอง Session หมดอายุ)
+        """
+        with self._lock:
+            self._cookies.clear()
+
+    def report(self, store, report_type):
+        """
+        คืน (content, etag) ของ Report
+        """
+        key = (store, report_type)
+        with self._lock:
+            cached = self._reports.get(key)
+            version = self._version
+        if cached is not None:
+            return cached
+
+        rows = self.rows.get(key, 0) if isinstance(self.rows, dict) else self.rows
+        content = print_report_bytes(store, report_type, rows, seed=f"{self.seed}-{version}")
+        etag = '"' + hashlib.blake2b(content, digest_size=8).hexdigest() + '"'
+        with self._lock:
+            return self._reports.setdefault(key, (content, etag))
+
+    # ------------------------------------------------------------------
+    def _count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def _should_fail(self):
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def _has_session(self, cookie_header):
+        cookies = dict(
+            part.strip().split('=', 1) for part in (cookie_header or '').split(';') if '=' in part
+        )
+        with self._lock:
+            return cookies.get('MKPSESSION') in self._cookies
+
+    def _new_session(self):
+        cookie = secrets.token_hex(16)
+        with self._lock:
+            self._cookies.add(cookie)
+        return cookie
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self._write_body(body)
+
+            def _write_body(self, body):
+                if not stub.bandwidth_mbps:
+                    self.wfile.write(body)
+                else:
+                    chunk = 64 * 1024
+                    delay = chunk / (stub.bandwidth_mbps * 1024 * 1024 / 8)
+                    for start in range(0, len(body), chunk):
+                        self.wfile.write(body[start:start + chunk])
+                        time.sleep(delay)
+                stub._count('bytes_sent', len(body))
+
+            def _redirect(self, location, headers=()):
+                self._send(302, headers=[('Location', location), *headers])
+
+            def do_GET(self):
+                if stub.latency_sec:
+                    time.sleep(stub.latency_sec)
+                url = urlparse(self.path)
+
+                if url.path == LOGON_PATH:
+                    stub._count('logon_pages')
+                    page = _LOGON_PAGE.format(path=LOGON_PATH, token=stub._token).encode()
+                    self._send(200, page, [('Content-Type', 'text/html; charset=utf-8')])
+                elif url.path == INDEX_PATH:
+                    self._send(200, b'<html><body>MarketPlace</body></html>', [('Content-Type', 'text/html')])
+                elif url.path == REPORT_PATH:
+                    self._print_report(parse_qs(url.query))
+                else:
+                    self._send(404)
+
+            def _print_report(self, query):
+                if not stub._has_session(self.headers.get('Cookie')):
+                    stub._count('redirects')
+                    self._redirect(f"{LOGON_PATH}?ReturnUrl=%2FMarketPlace%2FPickingList%2FPrintReport")
+                    return
+                if stub._should_fail():
+                    stub._count('failures')
+                    self._send(500, b'Internal Server Error')
+                    return
+
+                store = query.get('storeno', [''])[0]
+                report_type = query.get('typereport', [''])[0]
+                content, etag = stub.report(store, report_type)
+                if stub.use_etag and self.headers.get('If-None-Match') == etag:
+                    stub._count('not_modified')
+                    self._send(304, headers=[('ETag', etag)])
+                    return
+
+                stub._count('reports')
+                headers = [('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')]
+                if stub.use_etag:
+                    headers.append(('ETag', etag))
+                self._send(200, content, headers)
+
+            def do_POST(self):
+                if stub.latency_sec:
+                    time.sleep(stub.latency_sec)
+                length = int(self.headers.get('Content-Length') or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if urlparse(self.path).path != LOGON_PATH:
+                    self._send(404)
+                    return
+                if form.get('__RequestVerificationToken', [''])[0] != stub._token or not form.get('Username'):
+                    self._redirect(LOGON_PATH)
+                    return
+                stub._count('logins')
+                cookie = stub._new_session()
+                self._redirect(INDEX_PATH, [('Set-Cookie', f"MKPSESSION={cookie}; Path=/MarketPlace; HttpOnly")])
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows', type=int, default=2000, help="จำนวนแถวต่อไฟล์ Report")
+    parser.add_argument('--latency', type=float, default=0.0, help="เวลาหน่วงต่อ Request (วินาที)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="โอกาสที่ PrintReport ตอบ 500 (0-1)")
+    parser.add_argument('--bandwidth-mbps', type=float, default=None)
+    parser.add_argument('--no-etag', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stub = MarketPlaceStub(
+        args.host, args.port, rows=args.rows, latency_sec=args.latency, failure_rate=args.failure_rate,
+        bandwidth_mbps=args.bandwidth_mbps, use_etag=not args.no_etag, seed=args.seed
+    )
+    print(f"MarketPlace stub: MKP_BASE_URL={stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
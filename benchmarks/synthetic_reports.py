@@ -0,0 +1,84 @@
+"""
+สร้างไฟล์ Excel ทดสอบที่มีรูปแบบเหมือนของจริง สำหรับ Benchmark และ Stub Server
+
+- print_report_bytes()        ไฟล์ PrintReport จาก MarketPlace (หัวตาราง 2 แถว, Header แถวที่ 3, ใช้ 7 คอลัมน์แรก)
+- write_marketplace_workbook() ชีต MarketplaceData ที่อัปโหลดใน Pending_dashboard (12 คอลัมน์)
+"""
+import io
+import random
+
+import openpyxl
+
+# ----------------------------------------------------------------------
+# PrintReport (pending_pipeline._download_report อ่านด้วย header_row=2, usecols=range(7))
+# ----------------------------------------------------------------------
+REPORT_HEADER = ['Seller Center', 'Order ID', 'Order Date', 'SKU (TPNB)', 'Description',
+                 'Pack Size', 'Qty', 'Customer', 'Slot']
+
+# ----------------------------------------------------------------------
+# MarketplaceData (Pending_dashboard อ่านคอลัมน์ A,B,D,E,H,I,J จาก 12 คอลัมน์)
+# ----------------------------------------------------------------------
+SHEET_NAME = "MarketplaceData"
+USE_COLS = [0, 1, 3, 4, 7, 8, 9]
+NAMES = ['Seller Center', 'Order ID', 'SKU (TPNB)', 'Description', 'Remark', 'Store', 'BoxesQty']
+HEADER = ['Seller Center', 'Order ID', 'Order Date', 'SKU (TPNB)', 'Description', 'Pack Size',
+          'Qty', 'Remark', 'Store', 'BoxesQty', 'Picker', 'Note']
+
+SELLER_COUNT = 40
+SKU_COUNT = 5000
+
+
+def _catalog():
+    sellers = [f"Seller Center {i:02d}" for i in range(SELLER_COUNT)]
+    skus = [(50000000 + i, f"Product description {i:05d}") for i in range(SKU_COUNT)]
+    return sellers, skus
+
+
+def print_report_bytes(store, report_type, rows, seed=0, duplicate_ratio=0.1):
+    """
+    คืน bytes ของไฟล์ PrintReport 1 ไฟล์
+
+    Order ID ไม่ซ้ำกันระหว่าง Store / Type ยกเว้นสัดส่วน duplicate_ratio ที่ใช้ Order ID ชุดกลาง
+    ร่วมกันทุกไฟล์ (ให้ขั้น drop_duplicates มีงานทำเหมือนข้อมูลจริง)
+    """
+    rnd = random.Random(f"{seed}-{store}-{report_type}")
+    sellers, skus = _catalog()
+    shared_orders = max(1, int(rows * duplicate_ratio))
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Report")
+    ws.append([f"Picking List Report Store {store}"])
+    ws.append([f"Type {report_type}"])
+    ws.append(REPORT_HEADER)
+    for i in range(rows):
+        if rnd.random() < duplicate_ratio:
+            order_id = f"MKP{rnd.randrange(shared_orders):09d}"
+        else:
+            order_id = f"MKP{store}{report_type}{i // 2:08d}"
+        sku, description = rnd.choice(skus)
+        pack_size = rnd.choice((1, 6, 12, 24, 0))
+        ws.append([
+            rnd.choice(sellers), order_id, "2024-01-01", sku, description,
+            pack_size, rnd.randint(1, 48), "customer", None,
+        ])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def write_marketplace_workbook(path, rows, seed=0):
+    rnd = random.Random(seed)
+    sellers, skus = _catalog()
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    ws.append(HEADER)
+    for i in range(rows):
+        sku, description = rnd.choice(skus)
+        qty = rnd.randint(1, 48)
+        ws.append([
+            rnd.choice(sellers), f"MKP{i // 2:09d}", "2024-01-01", sku, description, 6, qty,
+            rnd.choice(("Canpick", "Cannotpick")), rnd.choice((7888, 7886)), max(1, qty // 6),
+            "picker", None,
+        ])
+    wb.save(path)
@@ -0,0 +1,160 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# Change Feed: เทียบข้อมูลแต่ละรอบกับรอบก่อนตาม Order ID (ข้อมูลหลัง drop_duplicates จึงมี 1 แถวต่อ Order)
+# เก็บไว้แค่ Hash ของ Order ID + สถานะของรอบล่าสุด และ Delta ย้อนหลังจำนวนจำกัด ไม่เก็บข้อมูลเต็มทุกรอบ
+# ----------------------------------------------------------------------
+
+# จำนวน Delta ที่เก็บย้อนหลัง (รอบละ 1 Delta, ค่าเริ่มต้น ~1 วันที่รอบละ 10 นาที)
+CHANGE_FEED_MAX_DELTAS = int(os.environ.get("MKP_CHANGE_FEED_DELTAS", 144))
+
+# จำนวน Order ID สูงสุดที่เก็บเป็นตัวอย่างต่อประเภทต่อ Delta
+CHANGE_FEED_SAMPLE_ORDERS = 200
+
+STATE_COLUMNS = ['Store', 'Seller Center', 'Remark', 'BoxesQty']
+GROUP_COLUMNS = ['Store', 'Seller Center']
+COUNT_COLUMNS = ['Added', 'Removed', 'Changed']
+
+
+class OrderKeys:
+    """
+    สถานะแบบกะทัดรัดของ 1 รอบ: Hash ของ Order ID (เรียงแล้ว) + Hash ของสถานะ (Store/Seller/Remark/BoxesQty)
+    พร้อม Store / Seller Center / Remark ของแต่ละ Order ไว้นับ Delta ของ Order ที่หายไป
+    """
+
+    def __init__(self, df):
+        keys = pd.util.hash_pandas_object(df['Order ID'], index=False).to_numpy()
+        state = pd.util.hash_pandas_object(df[STATE_COLUMNS], index=False).to_numpy()
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.state = state[order]
+        self.order_ids = df['Order ID'].to_numpy()[order]
+        self.store = df['Store'].to_numpy()[order]
+        self.seller = pd.Categorical(df['Seller Center'])[order]
+        self.remark = pd.Categorical(df['Remark'])[order]
+
+    def groups(self, positions):
+        return pd.DataFrame({
+            'Store': self.store[positions],
+            'Seller Center': np.asarray(self.seller[positions], dtype=object),
+        })
+
+
+class OrderDelta:
+    """
+    การเปลี่ยนแปลงระหว่าง 2 รอบ
+
+    counts       = {'Added', 'Removed', 'Changed'} จำนวน Order
+    by_group     = DataFrame Store, Seller Center, Added, Removed, Changed
+    transitions  = DataFrame From, To, Orders ของ Order ที่ Remark เปลี่ยน (เช่น Canpick -> Cannotpick)
+    samples      = {'Added'/'Removed'/'Changed': list ของ Order ID (ไม่เกิน CHANGE_FEED_SAMPLE_ORDERS)}
+    """
+
+    def __init__(self, fetched_at, previous_at, by_group, transitions, samples):
+        self.fetched_at = fetched_at
+        self.previous_at = previous_at
+        self.by_group = by_group
+        self.transitions = transitions
+        self.samples = samples
+        self.counts = {column: int(by_group[column].sum()) for column in COUNT_COLUMNS}
+
+
+def diff_orders(previous, current, fetched_at=None, previous_at=None):
+    """
+    เทียบ OrderKeys 2 รอบ คืน OrderDelta (ใช้ Hash ที่เรียงไว้แล้ว ไม่ merge DataFrame)
+    """
+    in_previous = np.isin(current.keys, previous.keys, assume_unique=True)
+    in_current = np.isin(previous.keys, current.keys, assume_unique=True)
+    added = np.flatnonzero(~in_previous)
+    removed = np.flatnonzero(~in_current)
+
+    # Order ที่มีทั้ง 2 รอบ: keys เรียงแล้วทั้งคู่ จึงจับคู่ตามลำดับได้เลย
+    common_current = np.flatnonzero(in_previous)
+    common_previous = np.flatnonzero(in_current)
+    changed_mask = current.state[common_current] != previous.state[common_previous]
+    changed = common_current[changed_mask]
+    changed_previous = common_previous[changed_mask]
+
+    parts = []
+    for column, keys, positions in (('Added', current, added), ('Removed', previous, removed), ('Changed', current, changed)):
+        if len(positions):
+            parts.append(keys.groups(positions).assign(**{column: 1}))
+    if parts:
+        by_group = (
+            pd.concat(parts, ignore_index=True)
+            .groupby(GROUP_COLUMNS, dropna=False, sort=True)[COUNT_COLUMNS].sum()
+            .astype('int64').reset_index()
+        )
+    else:
+        by_group = pd.DataFrame(columns=GROUP_COLUMNS + COUNT_COLUMNS)
+
+    remark_from = np.asarray(previous.remark[changed_previous], dtype=object)
+    remark_to = np.asarray(current.remark[changed], dtype=object)
+    moved = remark_from != remark_to
+    transitions = (
+        pd.DataFrame({'From': remark_from[moved], 'To': remark_to[moved]})
+        .value_counts().rename('Orders').reset_index()
+    )
+
+    samples = {
+        'Added': list(current.order_ids[added[:CHANGE_FEED_SAMPLE_ORDERS]]),
+        'Removed': list(previous.order_ids[removed[:CHANGE_FEED_SAMPLE_ORDERS]]),
+        'Changed': list(current.order_ids[changed[:CHANGE_FEED_SAMPLE_ORDERS]]),
+    }
+    return OrderDelta(fetched_at or datetime.now(), previous_at, by_group, transitions, samples)
+
+
+class ChangeFeed:
+    """
+    update(df)   เทียบกับรอบก่อนแล้วเก็บ Delta (รอบแรกยังไม่มีอะไรให้เทียบ คืน None)
+    deltas()     Delta ที่เก็บไว้ (ใหม่สุดอยู่ท้าย) ไม่เกิน max_deltas
+    summary()    รวม Delta ตั้งแต่เวลา since เป็น (counts, by_group, transitions)
+    """
+
+    def __init__(self, max_deltas=CHANGE_FEED_MAX_DELTAS):
+        self._lock = threading.Lock()
+        self._previous = None
+        self._previous_at = None
+        self._previous_frame = None
+        self._deltas = deque(maxlen=max_deltas)
+
+    def update(self, df, fetched_at=None):
+        fetched_at = fetched_at or datetime.now()
+        with self._lock:
+            # fetch_all_data คืน DataFrame ตัวเดิมเมื่อไม่มี Report ไหนเปลี่ยน ไม่ต้องเทียบซ้ำ
+            if df is self._previous_frame:
+                return None
+            current = OrderKeys(df)
+            delta = None
+            if self._previous is not None:
+                delta = diff_orders(self._previous, current, fetched_at, self._previous_at)
+                self._deltas.append(delta)
+            self._previous, self._previous_at, self._previous_frame = current, fetched_at, df
+            return delta
+
+    def deltas(self):
+        with self._lock:
+            return list(self._deltas)
+
+    def summary(self, since=None):
+        deltas = [delta for delta in self.deltas() if since is None or delta.fetched_at >= since]
+        if not deltas:
+            empty_group = pd.DataFrame(columns=GROUP_COLUMNS + COUNT_COLUMNS)
+            return {column: 0 for column in COUNT_COLUMNS}, empty_group, pd.DataFrame(columns=['From', 'To', 'Orders'])
+
+        by_group = (
+            pd.concat([delta.by_group for delta in deltas], ignore_index=True)
+            .groupby(GROUP_COLUMNS, dropna=False, sort=True)[COUNT_COLUMNS].sum()
+            .reset_index()
+        )
+        transitions = pd.concat([delta.transitions for delta in deltas], ignore_index=True)
+        if not transitions.empty:
+            transitions = transitions.groupby(['From', 'To'], sort=False)['Orders'].sum().reset_index()
+        counts = {column: sum(delta.counts[column] for delta in deltas) for column in COUNT_COLUMNS}
+        return counts, by_group, transitions
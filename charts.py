@@ -0,0 +1,186 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from pending_schema import REMARK_ORDER
+
+# ----------------------------------------------------------------------
+# สร้าง Plotly Figure ที่ใช้ร่วมกันทั้ง Pending_auto_dashboard และ Pending_dashboard
+# ----------------------------------------------------------------------
+
+# จำนวน Seller Center สูงสุดต่อกราฟ Section 2 ที่เหลือรวมเป็นแท่ง "Other" (0 = แสดงทุก Seller)
+SELLER_TOP_K = int(os.environ.get("MKP_SELLER_TOP_K", 20))
+OTHER_LABEL = "Other"
+
+# จำนวน Figure สูงสุดที่เก็บใน FigureCache (เกินแล้วทิ้งตัวที่ไม่ได้ใช้นานที่สุด)
+FIGURE_CACHE_SIZE = int(os.environ.get("MKP_FIGURE_CACHE_SIZE", 256))
+
+TOTAL_FONT = dict(size=14, color="black", family="Arial Black")
+
+
+class FigureCache:
+    """
+    LRU ของ Figure ที่สร้างแล้ว ใช้ร่วมกันทุก Rerun และทุก Session (ถือไว้ใน st.cache_resource)
+
+    key = (ชื่อกราฟ, fingerprint ของข้อมูล, พารามิเตอร์อื่น ๆ) ข้อมูลชุดเดิมจึงไม่ต้องสร้าง px ใหม่
+    Figure ที่คืนไปใช้ร่วมกัน ห้ามแก้ไข (st.plotly_chart แปลงเป็น JSON โดยไม่แก้ตัว Figure)
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._figures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build_fn):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+
+        # สร้างนอก Lock (Session อื่นไม่ต้องรอ) ถ้าสร้างซ้ำพร้อมกันก็แค่ทับด้วยผลเดียวกัน
+        figure = build_fn()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._figures), 'hits': self.hits, 'misses': self.misses}
+
+
+def store_bar_figure(store_totals, color_map):
+    """
+    Section 1: กราฟแท่งซ้อน Order Count / Boxes Qty ของ 1 Store แยก Remark พร้อมยอดรวม
+    store_totals ต้องมีคอลัมน์ Remark, Orders, Boxes
+    """
+    order_data = store_totals[['Remark', 'Orders']].rename(columns={'Orders': 'Value'})
+    order_data['Metric'] = 'Order Count'
+    box_data = store_totals[['Remark', 'Boxes']].rename(columns={'Boxes': 'Value'})
+    box_data['Metric'] = 'Boxes Qty'
+    combined_data = pd.concat([order_data, box_data])
+    total_order_count = store_totals['Orders'].sum()
+    total_boxes_qty = store_totals['Boxes'].sum()
+
+    fig_bar = px.bar(
+        combined_data, x='Metric', y='Value', color='Remark',
+        barmode='stack', color_discrete_map=color_map,
+        text='Value', category_orders={"Remark": REMARK_ORDER}
+    )
+    # จัดรูปแบบตัวเลขให้มี comma
+    fig_bar.update_traces(texttemplate='%{text:,.0f}', textposition='inside', textangle=0, textfont_size=11)
+
+    fig_bar.add_annotation(
+        x='Order Count', y=total_order_count * 1.05,
+        text=f"Total Order : {total_order_count:,}",
+        showarrow=False, font=TOTAL_FONT
+    )
+    fig_bar.add_annotation(
+        x='Boxes Qty', y=total_boxes_qty * 1.1,
+        text=f"Total Boxes : {total_boxes_qty:,}",
+        showarrow=False, font=TOTAL_FONT
+    )
+
+    y_max = max(total_order_count, total_boxes_qty) * 1.2
+    fig_bar.update_yaxes(range=[0, y_max])
+    return fig_bar
+
+
+def store_pie_figure(pie_data, store_color_map):
+    """
+    Pie Chart จำนวน Order (ไม่ซ้ำ) ของแต่ละ Store pie_data ต้องมีคอลัมน์ Store, Total Order Count
+    """
+    fig_pie = px.pie(
+        pie_data,
+        values='Total Order Count',
+        names='Store',
+        hole=.3,
+        color='Store',
+        color_discrete_map=store_color_map
+    )
+    fig_pie.update_traces(
+        textposition='inside',
+        textinfo='percent+value',
+        texttemplate="%{value:,}<br>(%{percent})",
+        hoverinfo='label+percent+value',
+        textfont_size=18,
+        rotation=360,
+        sort=False
+    )
+    fig_pie.update_layout(
+        margin=dict(t=0, b=0, l=0, r=0),
+        showlegend=True,
+        legend=dict(orientation="v", yanchor="top", y=0.5, xanchor="right", x=-0.2)
+    )
+    return fig_pie
+
+
+def trend_figure(history, color_map):
+    """
+    กราฟแนวโน้ม Order ตามเวลา จาก SnapshotStore.query_history()
+    """
+    history = history.assign(Store=history['Store'].astype(str))
+    return px.line(
+        history, x='fetched_at', y='Orders', color='Remark', line_dash='Store',
+        color_discrete_map=color_map, markers=True,
+        category_orders={"Remark": REMARK_ORDER},
+        labels={'fetched_at': 'เวลา', 'Orders': 'Order Count'}
+    )
+
+
+def bucket_top_sellers(stack_data, top_k=SELLER_TOP_K):
+    """
+    เก็บ top_k Seller Center ที่มี Order มากที่สุด (คงลำดับเดิม) ที่เหลือรวมเป็น "Other (N Seller)" ต่อ Remark
+    stack_data ต้องมีคอลัมน์ Seller Center, Remark, Order ID
+    """
+    stack_data = stack_data.astype({'Seller Center': str, 'Remark': str})
+    totals = stack_data.groupby('Seller Center', sort=False)['Order ID'].sum()
+    if not top_k or len(totals) <= top_k:
+        return stack_data
+
+    keep = totals.nlargest(top_k).index
+    is_kept = stack_data['Seller Center'].isin(keep)
+    other = stack_data[~is_kept].groupby('Remark', sort=False)['Order ID'].sum().reset_index()
+    other.insert(0, 'Seller Center', f"{OTHER_LABEL} ({len(totals) - top_k} Seller)")
+    return pd.concat([stack_data[is_kept], other], ignore_index=True)
+
+
+def seller_stack_figure(stack_data, color_map, top_k=SELLER_TOP_K):
+    """
+    กราฟแท่งซ้อน Order ต่อ Seller Center แยก Remark พร้อมยอดรวมเหนือแท่ง
+
+    ยอดรวมวาดเป็น Scatter แบบ text 1 trace (ไม่ใช่ annotation ทีละ Seller)
+    และจำนวนแท่งไม่เกิน top_k + 1 ขนาด Figure จึงคงที่ไม่ว่าจะมีกี่ Seller
+    """
+    stack_data = bucket_top_sellers(stack_data, top_k)
+    totals = stack_data.groupby('Seller Center', sort=False)['Order ID'].sum()
+
+    fig_stack = px.bar(
+        stack_data, x='Seller Center', y='Order ID', color='Remark',
+        barmode='stack', color_discrete_map=color_map,
+        text='Order ID',
+        category_orders={"Remark": REMARK_ORDER, "Seller Center": list(totals.index)}
+    )
+    fig_stack.update_traces(texttemplate='%{text:,.0f}', textposition='inside', textangle=0, textfont_size=11)
+
+    fig_stack.add_trace(go.Scatter(
+        x=totals.index, y=totals.to_numpy() * 1.1,
+        text=[f"Total Order : {total:,}" for total in totals.to_numpy()],
+        mode='text', textfont=TOTAL_FONT,
+        showlegend=False, hoverinfo='skip'
+    ))
+
+    y_max_store = totals.max() if len(totals) else 0
+    fig_stack.update_yaxes(range=[0, y_max_store * 1.2])
+    return fig_stack
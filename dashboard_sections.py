@@ -0,0 +1,85 @@
+import streamlit as st
+
+from order_index import PAGE_SIZES, page_count
+from pending_export import EXPORT_FORMATS, XLSX_MAX_ROWS, export_bytes, export_file_name
+from stage_timer import timed
+
+# ----------------------------------------------------------------------
+# ส่วนของหน้าจอ (Streamlit) ที่ใช้ร่วมกันทั้ง Pending_auto_dashboard และ Pending_dashboard
+# ----------------------------------------------------------------------
+
+
+@st.fragment
+def render_order_explorer(order_index):
+    """
+    ค้นหา Order ตาม Store / Remark / Seller Center / SKU แล้วแสดงทีละหน้า
+    กดกรอง / เปลี่ยนหน้าจะ Rerun เฉพาะส่วนนี้ และส่งไปหน้าเว็บเฉพาะแถวของหน้าที่แสดง
+    """
+    col_store, col_remark, col_seller = st.columns(3)
+    stores = col_store.multiselect("Store", order_index.values('Store'), key="explorer_store")
+    remarks = col_remark.multiselect("Remark", order_index.values('Remark'), key="explorer_remark")
+    # ตัวเลือก Seller Center เฉพาะที่มีใน Store / Remark ที่เลือก (เรียงตามจำนวนแถว)
+    seller_options = order_index.options('Seller Center', order_index.select({'Store': stores, 'Remark': remarks}))
+    sellers = col_seller.multiselect("Seller Center", list(seller_options['value']), key="explorer_seller")
+    sku_text = st.text_input("SKU (TPNB)", key="explorer_sku", placeholder="ใส่ได้หลาย SKU คั่นด้วย ,")
+
+    rows = order_index.select({
+        'Store': stores,
+        'Remark': remarks,
+        'Seller Center': sellers,
+        'SKU (TPNB)': [sku.strip() for sku in sku_text.split(",") if sku.strip()],
+    })
+
+    col_size, col_page, col_count = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("แถวต่อหน้า", PAGE_SIZES, key="explorer_page_size")
+    pages = page_count(len(rows), page_size)
+    # ผลการกรองเหลือน้อยลง: เลื่อนกลับมาหน้าสุดท้ายที่มีอยู่จริง
+    if st.session_state.get("explorer_page", 1) > pages:
+        st.session_state["explorer_page"] = pages
+    page = col_page.number_input("หน้า", min_value=1, max_value=pages, step=1, key="explorer_page")
+    first_row = (page - 1) * page_size
+    col_count.caption(
+        f"พบ {len(rows):,} จาก {len(order_index):,} รายการ | "
+        f"แสดง {min(first_row + 1, len(rows)):,}-{min(first_row + page_size, len(rows)):,}"
+    )
+    st.dataframe(
+        order_index.page(rows, page, page_size), use_container_width=True, hide_index=True,
+        column_config={"BoxesQty": st.column_config.NumberColumn("BoxesQty", format="%d")}
+    )
+
+
+@st.fragment
+def render_export(order_index, file_stem, timer=None):
+    """
+    ส่งออกข้อมูลที่รวม / ตัดซ้ำแล้ว (กรอง Store / Remark / Seller Center ได้) เป็น CSV / Parquet / XLSX
+    ไฟล์สร้างตอนกดดาวน์โหลดใน Thread แยก (data เป็น callable) หน้าจอไม่ค้างระหว่างสร้างไฟล์
+    timer = StageTimer ที่จับเวลาการสร้างไฟล์ (None = ไม่จับเวลา)
+    """
+    col_store, col_remark, col_seller = st.columns(3)
+    stores = col_store.multiselect("Store", order_index.values('Store'), key="export_store")
+    remarks = col_remark.multiselect("Remark", order_index.values('Remark'), key="export_remark")
+    sellers = col_seller.multiselect("Seller Center", order_index.values('Seller Center'), key="export_seller")
+    rows = order_index.select({'Store': stores, 'Remark': remarks, 'Seller Center': sellers})
+
+    col_format, col_button = st.columns([2, 1])
+    export_format = col_format.radio("รูปแบบไฟล์", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    too_many_rows = export_format == 'XLSX' and len(rows) > XLSX_MAX_ROWS
+    if too_many_rows:
+        col_format.warning(f"XLSX รับได้ไม่เกิน {XLSX_MAX_ROWS:,} แถว ใช้ CSV หรือ Parquet แทน")
+    else:
+        col_format.caption(f"{len(rows):,} จาก {len(order_index):,} รายการ")
+
+    # ไม่กรองเลย: ส่งออกทุกแถวตามลำดับเดิม ไม่ต้องใช้ตำแหน่งแถว
+    export_rows = None if len(rows) == len(order_index) else rows
+
+    def build_file():
+        with timed(timer, 'export', {'format': export_format}, rows=len(rows)) as fields:
+            content = export_bytes(order_index.df, export_rows, export_format)
+            fields['bytes'] = len(content)
+        return content
+
+    col_button.download_button(
+        f"⬇️ ดาวน์โหลด {export_format}", build_file,
+        file_name=export_file_name(file_stem, export_format), mime=EXPORT_FORMATS[export_format][1],
+        on_click="ignore", disabled=too_many_rows or not len(rows), use_container_width=True
+    )
@@ -0,0 +1,378 @@
+import os
+import threading
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from stage_timer import timed
+
+# ----------------------------------------------------------------------
+# Session ของ MarketPlace ที่ Login ค้างไว้ ใช้ซ้ำข้ามการ Refresh
+# ----------------------------------------------------------------------
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36'
+
+# ขนาดที่อ่านจาก Socket ต่อครั้งตอนดาวน์โหลดแบบ Stream
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+
+# Circuit Breaker: ล้มเหลวติดกัน BREAKER_FAILURES ครั้ง หยุดเรียก Server BREAKER_RESET_SEC วินาที
+BREAKER_FAILURES = int(os.environ.get("MKP_BREAKER_FAILURES", 3))
+BREAKER_RESET_SEC = float(os.environ.get("MKP_BREAKER_RESET_SEC", 60))
+
+# ลองใหม่เมื่อต่อไม่ติด / Timeout / 5xx: สูงสุด RETRY_TOTAL ครั้ง รอ 1, 2, 4 วินาที (RETRY_BACKOFF_SEC * 2^ครั้งที่)
+RETRY_TOTAL = 3
+RETRY_BACKOFF_SEC = 1
+RETRY_STATUSES = frozenset([500, 502, 503, 504])
+
+
+class MarketPlaceLoginError(Exception):
+    """
+    Login ไม่สำเร็จ (step=1 คือ GET หน้า Login / Token, step=2 คือ POST Username/Password)
+    """
+
+    def __init__(self, step, message):
+        super().__init__(message)
+        self.step = step
+
+
+class ReportTooLargeError(Exception):
+    """
+    ไฟล์ที่ดาวน์โหลดใหญ่เกิน max_bytes
+    """
+
+
+class TruncatedDownloadError(Exception):
+    """
+    Server ส่งข้อมูลมาไม่ครบตาม Content-Length (การเชื่อมต่อหลุดกลางทาง)
+    """
+
+    def __init__(self, received, expected):
+        expected_text = f"{expected:,}" if expected is not None else "?"
+        super().__init__(f"ได้รับข้อมูลไม่ครบ {received:,} จาก {expected_text} bytes (การเชื่อมต่อหลุดกลางทาง)")
+        self.received = received
+        self.expected = expected
+
+
+class CircuitOpenError(Exception):
+    """
+    Server ล้มเหลวติดกันหลายครั้ง หยุดเรียกชั่วคราวจนถึง retry_at (datetime)
+    """
+
+    def __init__(self, failures, retry_at):
+        super().__init__(f"Server ล้มเหลวติดกัน {failures} ครั้ง หยุดเรียกชั่วคราวถึง {retry_at:%H:%M:%S}")
+        self.failures = failures
+        self.retry_at = retry_at
+
+
+class DeadlineExceededError(Exception):
+    """
+    หมดเวลาของรอบการดึงข้อมูลแล้ว ไม่เริ่ม Request ใหม่
+    """
+
+
+class CircuitBreaker:
+    """
+    นับความล้มเหลวติดกันของ Server (เชื่อมต่อไม่ได้ / Timeout / 5xx)
+    ครบ failure_threshold ครั้งจะ "เปิด" ทุก Request ได้ CircuitOpenError ทันทีโดยไม่ต่อ Server
+    ครบ reset_after_sec ให้ลองได้อีก (half-open) ถ้าสำเร็จจะกลับเป็นปกติ ถ้าล้มเหลวจะเปิดใหม่ทันที
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_after_sec=BREAKER_RESET_SEC):
+        self.failure_threshold = failure_threshold
+        self.reset_after_sec = reset_after_sec
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self.rejected = 0
+
+    def before_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_after_sec - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self._failures, datetime.now() + timedelta(seconds=remaining))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def state(self):
+        """
+        'closed' (ปกติ), 'open' (หยุดเรียก) หรือ 'half-open' (ครบเวลาแล้ว รอผล Request ถัดไป)
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_after_sec:
+                return 'open'
+            return 'half-open'
+
+
+def _content_length(response):
+    """
+    ขนาด Body จาก Content-Length (None ถ้าไม่ระบุ หรือถูกบีบอัดทำให้ขนาดจริงไม่ตรง)
+    """
+    if response.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def read_body(response, max_bytes, on_progress=None, chunk_size=DOWNLOAD_CHUNK_BYTES):
+    """
+    อ่าน Body ของ Response ที่เปิดด้วย stream=True ลง Buffer เดียวที่จองไว้ตาม Content-Length
+    คืน memoryview ของข้อมูล (ไม่คัดลอกซ้ำ) ส่งต่อให้ตัวอ่าน Excel ได้ทันที
+
+    on_progress(received, expected) ถูกเรียกทุก chunk (expected = None ถ้าไม่รู้ขนาด)
+    """
+    expected = _content_length(response)
+    if expected is not None and expected > max_bytes:
+        raise ReportTooLargeError(f"ไฟล์ขนาด {expected:,} bytes เกินกำหนด {max_bytes:,} bytes")
+
+    buffer = bytearray(expected if expected is not None else chunk_size)
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size):
+            end = received + len(chunk)
+            if end > max_bytes:
+                raise ReportTooLargeError(f"ไฟล์ใหญ่เกินกำหนด {max_bytes:,} bytes")
+            if end > len(buffer):
+                # ไม่รู้ขนาดล่วงหน้า: ขยาย Buffer ทีละเท่าตัว
+                buffer.extend(bytes(max(end - len(buffer), len(buffer))))
+            buffer[received:end] = chunk
+            received = end
+            if on_progress is not None:
+                on_progress(received, expected)
+    except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+        raise TruncatedDownloadError(received, expected) from e
+
+    if expected is not None and received != expected:
+        raise TruncatedDownloadError(received, expected)
+    return memoryview(buffer)[:received]
+
+
+def build_session(pool_size=10):
+    """
+    สร้าง requests.Session ที่ตั้งค่า Proxy/SSL/Retry/User-Agent ไว้แล้ว
+    """
+    s = requests.Session()
+
+    # 🚨 FIX 1: ปิดการใช้ System Proxy (เพื่อให้วิ่งตรงหา IP 10.x.x.x ได้)
+    s.trust_env = False
+
+    # 🚨 FIX 2: ปิดการตรวจสอบ SSL
+    s.verify = False
+
+    # 🚨 FIX 3: ระบบ Retry (ลองใหม่ 3 ครั้งถ้าต่อไม่ติด) ย้ายไปทำใน MarketPlaceSession._request
+    # Adapter จึงไม่ลองใหม่เอง (Retry ของ Adapter ไม่รู้ deadline ของรอบ ลองใหม่เกินเวลาได้)
+    # pool_maxsize ต้องไม่น้อยกว่าจำนวน Thread ที่ดาวน์โหลดพร้อมกัน
+    adapter = HTTPAdapter(max_retries=0, pool_connections=1, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+
+    s.headers.update({'User-Agent': USER_AGENT})
+    return s
+
+
+def is_logon_redirect(response):
+    """
+    True ถ้า Request ถูก Redirect กลับไปหน้า Logon (Session หมดอายุ)
+    """
+    return bool(response.history) and "Logon" in response.url
+
+
+class MarketPlaceSession:
+    """
+    ถือ requests.Session (พร้อม HTTPAdapter/Retry Pool) ไว้ตลอดอายุ Process
+    จะ Login ใหม่ก็ต่อเมื่อยังไม่เคย Login หรือถูก Redirect กลับไปหน้า Logon เท่านั้น
+
+    login_hits   = จำนวนครั้งที่ใช้ Session เดิมได้เลย (ไม่ต้อง Login)
+    login_misses = จำนวนครั้งที่ต้อง Login ใหม่
+    timer        = StageTimer สำหรับจับเวลา login.get / login.post (None = ไม่จับเวลา)
+    breaker      = CircuitBreaker ที่ทุก Request (รวม Login) ผ่าน
+    """
+
+    def __init__(self, login_url, username, password, timeout=15, pool_size=10, timer=None, breaker=None):
+        self.login_url = login_url
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.timer = timer
+        self.breaker = breaker or CircuitBreaker()
+
+        warnings.filterwarnings('ignore', 'Unverified HTTPS request')
+        self.session = build_session(pool_size)
+
+        self._lock = threading.Lock()
+        self._logged_in = False
+        # เพิ่มขึ้นทุกครั้งที่ Login สำเร็จ ใช้กันหลาย Thread Login ซ้ำพร้อมกัน
+        self._generation = 0
+        self.login_hits = 0
+        self.login_misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'logged_in': self._logged_in,
+                'login_hits': self.login_hits,
+                'login_misses': self.login_misses,
+                'breaker': self.breaker.state(),
+            }
+
+    def _request(self, method, url, deadline=None, **kwargs):
+        """
+        ส่ง Request ผ่าน Circuit Breaker ต่อไม่ติด / Timeout / 5xx จะลองใหม่ตาม RETRY_TOTAL
+        deadline (time.monotonic()) จำกัด timeout ของแต่ละครั้งไม่ให้เกินเวลาที่เหลือของรอบ
+        และไม่ลองใหม่ถ้ารอ backoff แล้วจะเกินเวลา (คืนผล / Exception ของครั้งล่าสุด)
+        Circuit Breaker นับ 1 ครั้งต่อการเรียก ไม่ใช่ต่อการลองใหม่
+        """
+        timeout = kwargs.pop('timeout', None) or self.timeout
+        self.breaker.before_request()
+        attempt = 0
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceededError("หมดเวลาของรอบการดึงข้อมูลแล้ว")
+                kwargs['timeout'] = min(timeout, remaining)
+            else:
+                kwargs['timeout'] = timeout
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if self._wait_before_retry(attempt, deadline):
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+            except requests.exceptions.RequestException:
+                self.breaker.record_failure()
+                raise
+            if response.status_code in RETRY_STATUSES and self._wait_before_retry(attempt, deadline):
+                response.close()
+                attempt += 1
+                continue
+            break
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    @staticmethod
+    def _wait_before_retry(attempt, deadline):
+        """
+        รอ backoff ก่อนลองครั้งถัดไป คืน False (ไม่รอ) ถ้าครบ RETRY_TOTAL แล้ว หรือรอแล้วจะเกิน deadline
+        """
+        if attempt >= RETRY_TOTAL:
+            return False
+        delay = RETRY_BACKOFF_SEC * 2 ** attempt
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def ensure_login(self, deadline=None):
+        """
+        คืนค่า True ถ้าเพิ่ง Login ใหม่, False ถ้าใช้ Session เดิม
+        """
+        with self._lock:
+            if self._logged_in:
+                self.login_hits += 1
+                return False
+            self._login(deadline)
+            return True
+
+    def invalidate(self):
+        with self._lock:
+            self._logged_in = False
+
+    def get(self, url, deadline=None, **kwargs):
+        """
+        GET ด้วย Session ที่ Login แล้ว ถ้าถูก Redirect กลับไปหน้า Logon จะ Login ใหม่แล้วลองอีก 1 ครั้ง
+        deadline (time.monotonic()) = เวลาสิ้นสุดของรอบ ไม่ให้ Request นี้รอเกินนั้น
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            if not self._logged_in:
+                self._login(deadline)
+            generation = self._generation
+        response = self._request('GET', url, deadline, **kwargs)
+        if not is_logon_redirect(response):
+            return response
+
+        response.close()
+        self._relogin(generation, deadline)
+        response = self._request('GET', url, deadline, **kwargs)
+        if is_logon_redirect(response):
+            raise MarketPlaceLoginError(2, "Session ถูก Redirect กลับหน้า Logon แม้ Login ใหม่แล้ว")
+        return response
+
+    def _relogin(self, seen_generation, deadline=None):
+        with self._lock:
+            # Thread อื่น Login ใหม่ไปแล้ว ไม่ต้องทำซ้ำ
+            if self._logged_in and self._generation != seen_generation:
+                return
+            self._logged_in = False
+            self._login(deadline)
+
+    def _login(self, deadline=None):
+        # (เรียกภายใต้ self._lock เท่านั้น)
+        self.login_misses += 1
+
+        # 1. GET หน้า Login เพื่อดึง Token
+        try:
+            with timed(self.timer, 'login.get'):
+                login_page_response = self._request('GET', self.login_url, deadline, timeout=self.timeout)
+                login_page_response.raise_for_status()
+        except (requests.exceptions.ConnectTimeout, CircuitOpenError, DeadlineExceededError):
+            raise
+        except Exception as e:
+            raise MarketPlaceLoginError(1, f"ไม่สามารถเชื่อมต่อหน้า Login ได้: {e}") from e
+
+        soup = BeautifulSoup(login_page_response.text, 'html.parser')
+        token_input = soup.find('input', {'name': '__RequestVerificationToken'})
+        if not token_input:
+            raise MarketPlaceLoginError(1, "ไม่พบ Token ในหน้า Login (อาจเข้าผิดหน้า หรือต้อง VPN)")
+        token = token_input['value']
+
+        # 2. POST ข้อมูล Login
+        login_data = {
+            '__RequestVerificationToken': token,
+            'LoginType': 'UserAuthentication',
+            'Username': self.username,
+            'Password': self.password
+        }
+        post_headers = {
+            'Referer': self.login_url
+        }
+        try:
+            with timed(self.timer, 'login.post'):
+                login_response = self._request('POST', self.login_url, deadline, data=login_data, headers=post_headers, timeout=self.timeout)
+                login_response.raise_for_status()
+        except (CircuitOpenError, DeadlineExceededError):
+            raise
+        except Exception as e:
+            raise MarketPlaceLoginError(2, f"การ Login ล้มเหลว: {e}") from e
+
+        if "MarketPlace" not in login_response.url or "Logon" in login_response.url:
+            raise MarketPlaceLoginError(2, "Login ไม่สำเร็จ! (Username/Password ผิด หรือ Server ปฏิเสธ)")
+
+        self._logged_in = True
+        self._generation += 1
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# Index ระดับ Order สำหรับ Drill-down: สร้างครั้งเดียวต่อชุดข้อมูล
+# แต่ละคอลัมน์ที่กรองได้เก็บตำแหน่งแถว (position array) ของแต่ละค่า การกรองจึงไม่ต้องสแกน df ใหม่
+# ----------------------------------------------------------------------
+
+FILTER_COLUMNS = ['Store', 'Remark', 'Seller Center', 'SKU (TPNB)']
+
+PAGE_SIZES = [50, 100, 500]
+
+
+class _ColumnIndex:
+    """
+    ตำแหน่งแถวของแต่ละค่าในคอลัมน์เดียว: positions[starts[k]:starts[k + 1]] คือแถวที่มีค่า values[k]
+    (ตำแหน่งในแต่ละกลุ่มเรียงจากน้อยไปมาก)
+    """
+
+    def __init__(self, series):
+        codes, values = pd.factorize(series, sort=True)
+        self.codes = codes
+        self.values = list(values)
+        self.positions = np.argsort(codes, kind='stable').astype(np.int64)
+        # ค่าว่าง (code = -1) อยู่หน้าสุดหลัง argsort ข้ามไป
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        self.starts = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+        # Index ใช้ร่วมกันทุก Session และ rows_for คืน slice ของ positions: ห้ามใครเขียนทับ
+        for array in (self.codes, self.positions, self.starts):
+            array.flags.writeable = False
+        self._code_of = {value: code for code, value in enumerate(self.values)}
+        self._code_of_text = {str(value): code for code, value in enumerate(self.values)}
+
+    def code_of(self, value):
+        code = self._code_of.get(value)
+        if code is None:
+            code = self._code_of_text.get(str(value).strip())
+        return code
+
+    def rows_for(self, codes):
+        """
+        ตำแหน่งแถว (เรียงแล้ว) ของทุกค่าใน codes
+        """
+        parts = [self.positions[self.starts[code]:self.starts[code + 1]] for code in codes]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+
+class OrderIndex:
+    """
+    index.select({'Store': [7888], 'Remark': ['Cannotpick']})  -> ตำแหน่งแถวที่ตรงทุกเงื่อนไข
+    index.options('Seller Center', rows)                         -> ค่าและจำนวนแถวภายในผลการกรอง
+    index.page(rows, page, page_size)                            -> DataFrame เฉพาะหน้านั้น
+
+    df ต้องไม่ถูกแก้ไขหลังสร้าง Index (ตำแหน่งแถวอ้างอิง df ตัวเดิม)
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.df = df
+        self.columns = [column for column in columns if column in df.columns]
+        self._indexes = {column: _ColumnIndex(df[column]) for column in self.columns}
+
+    def __len__(self):
+        return len(self.df)
+
+    def values(self, column):
+        return self._indexes[column].values
+
+    def select(self, filters):
+        """
+        filters = {คอลัมน์: list ของค่า} (list ว่าง = ไม่กรองคอลัมน์นั้น)
+        คืนตำแหน่งแถวที่ตรง (เรียงตามลำดับเดิมใน df) ค่าที่ไม่มีในข้อมูลจะถูกข้าม
+        """
+        selected = None
+        # กรองคอลัมน์ที่ได้ผลน้อยที่สุดก่อน การ intersect ถัดไปจะเล็กลงเรื่อย ๆ
+        candidates = []
+        for column, values in filters.items():
+            if not values:
+                continue
+            index = self._indexes[column]
+            codes = [code for code in map(index.code_of, values) if code is not None]
+            candidates.append(index.rows_for(codes))
+        for rows in sorted(candidates, key=len):
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+            if not len(selected):
+                break
+        if selected is None:
+            return np.arange(len(self.df), dtype=np.int64)
+        return selected
+
+    def options(self, column, rows=None):
+        """
+        DataFrame คอลัมน์ value, rows ของค่าที่มีในผลการกรอง rows (None = ทั้งหมด) เรียงตามจำนวนแถว
+        """
+        index = self._indexes[column]
+        codes = index.codes if rows is None else index.codes[rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(index.values))
+        present = np.flatnonzero(counts)
+        options = pd.DataFrame({'value': [index.values[code] for code in present], 'rows': counts[present]})
+        return options.sort_values('rows', ascending=False, kind='stable').reset_index(drop=True)
+
+    def page(self, rows, page, page_size):
+        """
+        แถวของหน้าที่ page (เริ่มที่ 1) จากผลการกรอง rows ส่งเฉพาะหน้านี้ไปแสดงผล
+        """
+        start = (page - 1) * page_size
+        return self.df.iloc[rows[start:start + page_size]]
+
+
+def page_count(total_rows, page_size):
+    return max(1, -(-total_rows // page_size))
+
+
+def build_order_index(df):
+    return OrderIndex(df)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# ยอดรวม (Aggregate Cube) ของข้อมูล Pending สำหรับทุกกราฟ คำนวณครั้งเดียวต่อชุดข้อมูล
+# ----------------------------------------------------------------------
+
+CUBE_KEYS = ['Store', 'Seller Center', 'Remark']
+TOP_ITEM_KEYS = ['SKU (TPNB)', 'Description']
+
+# จำนวนอันดับเริ่มต้นของตาราง Top-N Cannotpick (Section 3)
+TOP_ITEMS_N = int(os.environ.get("MKP_TOP_N", 10))
+
+
+class PendingCube:
+    """
+    ยอดรวมตาม (Store, Seller Center, Remark) พร้อมยอดระดับ (Store, Remark) และ Store
+
+    Orders = จำนวน Order ID ที่ไม่ซ้ำ, Boxes = ผลรวม BoxesQty
+    Order ที่มีหลายบรรทัดคนละ Remark/Seller Center นับเป็น 1 Order ในแต่ละระดับอย่างถูกต้อง
+    (นับ distinct ใหม่จากคู่ Key + Order ID ไม่ได้เอายอดระดับล่างมาบวกกัน)
+    """
+
+    def __init__(self, df):
+        # 1. สแกน df ครั้งเดียว: ยุบเหลือ 1 แถวต่อ (Store, Seller Center, Remark, Order ID)
+        order_lines = (
+            df.groupby(CUBE_KEYS + ['Order ID'], dropna=False, sort=False, observed=True)['BoxesQty']
+            .sum()
+            .reset_index()
+        )
+
+        # 2. Cube ระดับละเอียดสุด (ไม่รวม Seller Center / Remark ที่ว่าง เหมือน groupby เดิม)
+        self.by_store_seller_remark = (
+            order_lines.groupby(CUBE_KEYS, sort=False, observed=True)
+            .agg(Orders=('Order ID', 'nunique'), Boxes=('BoxesQty', 'sum'))
+            .reset_index()
+        )
+
+        # 3. ระดับ (Store, Remark) และ Store นับ distinct จาก order_lines ที่เล็กกว่า df มาก
+        self.by_store_remark = (
+            order_lines.groupby(['Store', 'Remark'], sort=False, observed=True)
+            .agg(Orders=('Order ID', 'nunique'), Boxes=('BoxesQty', 'sum'))
+            .reset_index()
+        )
+        self.by_store = (
+            order_lines.groupby('Store', sort=False, observed=True)
+            .agg(Orders=('Order ID', 'nunique'), Boxes=('BoxesQty', 'sum'))
+            .reset_index()
+        )
+        self._index_frames()
+
+    @classmethod
+    def from_frames(cls, by_store_seller_remark, by_store_remark, by_store):
+        """
+        Cube จากยอดรวมที่คำนวณไว้แล้ว (เช่น summary ที่ pending_cli.py เขียนไว้) ไม่ต้องสแกน df ใหม่
+        """
+        cube = cls.__new__(cls)
+        cube.by_store_seller_remark = by_store_seller_remark
+        cube.by_store_remark = by_store_remark
+        cube.by_store = by_store
+        cube._index_frames()
+        return cube
+
+    def _index_frames(self):
+        # เรียง Store ตามลำดับที่พบในข้อมูล (เหมือน df['Store'].unique())
+        self.stores = list(self.by_store['Store'])
+        self._store_remark = dict(tuple(self.by_store_remark.groupby('Store', sort=False, observed=True)))
+        self._store_seller_remark = dict(tuple(self.by_store_seller_remark.groupby('Store', sort=False, observed=True)))
+
+        # Fingerprint ของยอดรวม (ทุกกราฟสร้างจากยอดเหล่านี้) ใช้เป็น Key ของ Figure Cache
+        self.fingerprint = frames_fingerprint(self.by_store_seller_remark, self.by_store_remark, self.by_store)
+
+    def store_remark(self, store):
+        """
+        คอลัมน์ Remark, Orders, Boxes ของ Store นี้
+        """
+        frame = self._store_remark.get(store)
+        if frame is None:
+            return pd.DataFrame(columns=['Remark', 'Orders', 'Boxes'])
+        return frame[['Remark', 'Orders', 'Boxes']].reset_index(drop=True)
+
+    def store_seller_remark(self, store):
+        """
+        คอลัมน์ Seller Center, Remark, Orders, Boxes ของ Store นี้
+        """
+        frame = self._store_seller_remark.get(store)
+        if frame is None:
+            return pd.DataFrame(columns=['Seller Center', 'Remark', 'Orders', 'Boxes'])
+        return frame[['Seller Center', 'Remark', 'Orders', 'Boxes']].reset_index(drop=True)
+
+    def orders_by_store(self):
+        """
+        คอลัมน์ Store, Orders (จำนวน Order ไม่ซ้ำทั้ง Store) สำหรับ Pie Chart
+        """
+        return self.by_store[['Store', 'Orders']]
+
+
+def top_items_by_store(df, n=TOP_ITEMS_N, remark="Cannotpick", by_seller=False):
+    """
+    Top-N รายการ (SKU (TPNB), Description) ตามผลรวม BoxesQty ของทุก Store ในการสแกนครั้งเดียว
+
+    - กรอง Remark ครั้งเดียว แล้ว groupby (Store, [Seller Center], SKU, Description) ครั้งเดียว
+    - แต่ละ Store เลือกแค่ n อันดับแรกด้วย nlargest (ไม่เรียงทั้งหมด)
+    - by_seller=True จะจัดอันดับแยกกันในแต่ละ Seller Center ของ Store (ได้ไม่เกิน n รายการต่อ Seller Center)
+
+    คืน dict {Store: DataFrame} index เป็น Rank (1..n เริ่มใหม่ทุก Seller Center เมื่อ by_seller=True)
+    Store ที่ไม่มีรายการจะไม่อยู่ใน dict
+    """
+    group_keys = ['Store'] + (['Seller Center'] if by_seller else [])
+    selected = df.loc[df['Remark'] == remark, group_keys + TOP_ITEM_KEYS + ['BoxesQty']]
+    totals = selected.groupby(group_keys + TOP_ITEM_KEYS, observed=True)['BoxesQty'].sum()
+    if totals.empty:
+        return {}
+    top = totals.groupby(level=group_keys, sort=False, group_keys=False).nlargest(n).reset_index()
+
+    result = {}
+    for store, frame in top.groupby('Store', sort=False, observed=True):
+        frame = frame.drop(columns='Store').reset_index(drop=True)
+        if by_seller:
+            frame.index = frame.groupby('Seller Center', sort=False, observed=True).cumcount() + 1
+        else:
+            frame.index = frame.index + 1
+        result[store] = frame.rename_axis('Rank')
+    return result
+
+
+def top_items_from_frame(frame):
+    """
+    แปลงตาราง Top-N ที่รวมทุก Store (คอลัมน์ Rank, Store, ...) กลับเป็น {Store: DataFrame} แบบ top_items_by_store
+    """
+    result = {}
+    for store, store_frame in frame.groupby('Store', sort=False, observed=True):
+        result[store] = store_frame.drop(columns='Store').set_index('Rank')
+    return result
+
+
+def frames_fingerprint(*frames):
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        digest.update(",".join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def build_cube(df):
+    return PendingCube(df)
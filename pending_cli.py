@@ -0,0 +1,160 @@
+"""
+ดึงข้อมูล Pending จาก MarketPlace แบบไม่ต้องเปิด Streamlit (สำหรับ cron / systemd timer)
+
+    python pending_cli.py                          # ดึง 1 รอบ เขียน Snapshot + ยอดรวมลง MKP_SNAPSHOT_DIR
+    python pending_cli.py --output-dir /data/mkp --json
+    MKP_REFRESH_MODE=snapshot streamlit run Pending_auto_dashboard.py   # Dashboard อ่านผลจากไฟล์อย่างเดียว
+
+สิ่งที่เขียน (โครงสร้างเดียวกับ SnapshotStore ของ Dashboard)
+    <output-dir>/<source>/pending-*.arrow          ข้อมูลเต็ม (Arrow IPC lz4)
+    <output-dir>/<source>/history/part-*.parquet   ยอดรวม (Store, Remark) สำหรับกราฟแนวโน้ม
+    <output-dir>/<source>/summary/*.parquet        ยอดรวม by_store / by_store_remark / by_store_seller_remark
+                                                   และ top_cannotpick
+
+Exit code
+    0  สำเร็จ
+    1  ดึงข้อมูลไม่ได้เลย (Login ไม่ผ่าน / ทุก Report ล้มเหลว) ไม่เขียนอะไร
+    2  ได้ข้อมูลบางส่วน (มี Report ที่ล้มเหลว) เขียนผลที่ได้แล้ว
+    3  เขียนไฟล์ไม่สำเร็จ
+
+ข้อจำกัด: ทุกครั้งที่รันเป็น Process ใหม่ Cache ของ Report (ReportFrameCache) เริ่มว่างทุกรอบ
+    Report ที่ล้มเหลวจึงไม่มีข้อมูลเดิม (last good) ให้ใช้แทนเหมือน Dashboard ที่รันค้างไว้
+    Snapshot ของรอบนั้นจะไม่รวม Report ที่ล้มเหลว (exit 2) และไม่ได้ใช้ Conditional Request (ETag) ข้ามรอบ
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from marketplace_session import MarketPlaceSession
+from pending_aggregates import TOP_ITEMS_N, build_cube, top_items_by_store
+from pending_pipeline import (
+    LOGIN_URL, USERNAME, PASSWORD, TIMEOUT_SEC, MAX_DOWNLOAD_WORKERS,
+    FetchLog, fetch_all_data
+)
+from report_cache import ReportFrameCache
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+from stage_timer import StageTimer, timed
+
+EXIT_OK = 0
+EXIT_FETCH_FAILED = 1
+EXIT_PARTIAL = 2
+EXIT_WRITE_FAILED = 3
+
+
+class ConsoleLog(FetchLog):
+    """
+    FetchLog ที่พิมพ์แต่ละข้อความออก stderr ทันที (Progress ไม่พิมพ์ กัน Log ของ cron รก)
+    """
+
+    def __init__(self, stream=sys.stderr, quiet=False):
+        super().__init__()
+        self._stream = stream
+        self._quiet = quiet
+
+    def _add(self, level, message):
+        super()._add(level, message)
+        if self._quiet and level not in ('warning', 'error'):
+            return
+        print(f"{datetime.now():%H:%M:%S} {level:<7} {message}", file=self._stream, flush=True)
+
+
+def build_summaries(df, cube, top_n=TOP_ITEMS_N):
+    """
+    ยอดรวมที่ Dashboard ใช้ {ชื่อ: DataFrame} พร้อมเขียนเป็น Parquet (cube = build_cube(df))
+    """
+    top_by_store = top_items_by_store(df, n=top_n, remark="Cannotpick")
+    if top_by_store:
+        top_cannotpick = pd.concat(
+            [frame.reset_index().assign(Store=store) for store, frame in top_by_store.items()],
+            ignore_index=True
+        )
+    else:
+        top_cannotpick = pd.DataFrame(columns=['Rank', 'SKU (TPNB)', 'Description', 'BoxesQty', 'Store'])
+    return {
+        'by_store': cube.by_store,
+        'by_store_remark': cube.by_store_remark,
+        'by_store_seller_remark': cube.by_store_seller_remark,
+        'top_cannotpick': top_cannotpick,
+    }
+
+
+def run_once(snapshot_store, timer, log, top_n=TOP_ITEMS_N):
+    """
+    ดึงข้อมูล 1 รอบ แล้วเขียน Snapshot + ยอดรวม คืน (exit code, จำนวนแถว)
+    EXIT_PARTIAL เมื่อมี Report ที่ใช้ข้อมูลเดิม (log.stale_reports) หรือไม่ได้ข้อมูลเลย (log.missing_reports)
+    """
+    mp_session = MarketPlaceSession(
+        LOGIN_URL, USERNAME, PASSWORD,
+        timeout=TIMEOUT_SEC, pool_size=MAX_DOWNLOAD_WORKERS, timer=timer
+    )
+    with timed(timer, 'fetch.total') as fetch_fields:
+        df = fetch_all_data(mp_session, ReportFrameCache(), log, timer=timer)
+        fetch_fields['rows'] = len(df)
+    if df.empty:
+        return EXIT_FETCH_FAILED, 0
+
+    fetched_at = datetime.now()
+    try:
+        with timed(timer, 'summary.cube'):
+            cube = build_cube(df)
+        with timed(timer, 'snapshot.write'):
+            snapshot_path = snapshot_store.write(df, fetched_at, cube=cube)
+        with timed(timer, 'summary.build'):
+            summaries = build_summaries(df, cube, top_n)
+        with timed(timer, 'summary.write'):
+            snapshot_store.write_summaries(summaries, fetched_at)
+    except Exception as e:
+        log.error(f"❌ บันทึกไฟล์ไม่สำเร็จ: {e}")
+        return EXIT_WRITE_FAILED, len(df)
+    log.success(f"💾 บันทึก {len(df):,} แถวที่ {snapshot_path or snapshot_store.directory}")
+
+    failed_reports = len(log.stale_reports) + len(log.missing_reports)
+    return (EXIT_PARTIAL if failed_reports else EXIT_OK), len(df)
+
+
+def print_timings(timer, stream=sys.stdout):
+    rows = timer.summary()
+    print(f"{'stage':<20} {'labels':<24} {'count':>5} {'seconds':>9} {'MB':>8}", file=stream)
+    for row in rows:
+        print(
+            f"{row['stage']:<20} {row['labels']:<24} {row['count']:>5} "
+            f"{row['last_s']:>9.3f} {row['bytes'] / 1024 / 1024:>8.1f}",
+            file=stream
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output-dir', default=SNAPSHOT_DIR, help="โฟลเดอร์ Snapshot (ค่าเริ่มต้น MKP_SNAPSHOT_DIR)")
+    parser.add_argument('--source', default='auto', help="โฟลเดอร์ย่อย (Pending_auto_dashboard อ่านจาก 'auto')")
+    parser.add_argument('--top-n', type=int, default=TOP_ITEMS_N, help="จำนวนอันดับใน top_cannotpick")
+    parser.add_argument('--json', action='store_true', help="พิมพ์ผลและเวลาแต่ละขั้นเป็น JSON 1 บรรทัด")
+    parser.add_argument('--quiet', action='store_true', help="พิมพ์ Log เฉพาะ warning / error")
+    args = parser.parse_args(argv)
+
+    timer = StageTimer.from_env()
+    log = ConsoleLog(quiet=args.quiet)
+    started = time.perf_counter()
+    exit_code, rows = run_once(SnapshotStore(root=args.output_dir, source=args.source), timer, log, args.top_n)
+    elapsed = time.perf_counter() - started
+    timer.write_prometheus()
+
+    if args.json:
+        print(json.dumps({
+            'exit_code': exit_code,
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'stages': timer.summary(),
+        }, ensure_ascii=False, default=str))
+    else:
+        print_timings(timer)
+        print(f"exit={exit_code} rows={rows:,} total={elapsed:.2f}s")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import io
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+# ----------------------------------------------------------------------
+# ส่งออกข้อมูล Pending (ที่รวมและตัดซ้ำแล้ว) เป็น CSV / Parquet / XLSX ให้ทีมหยิบสินค้า
+# แปลงทีละก้อนจากตำแหน่งแถวที่กรองแล้ว ไม่สร้าง DataFrame ที่กรองแล้วทั้งก้อน
+# ไฟล์เขียนลงไฟล์ชั่วคราวบนดิสก์ระหว่างสร้าง ในหน่วยความจำมีแค่ bytes ชุดเดียวที่ส่งให้ st.download_button
+# ----------------------------------------------------------------------
+
+# จำนวนแถวที่แปลงต่อก้อน (CSV / Parquet row group / XLSX)
+EXPORT_CHUNK_ROWS = int(os.environ.get("MKP_EXPORT_CHUNK_ROWS", 50_000))
+
+# Excel รับได้ไม่เกิน 1,048,576 แถวต่อชีต (รวมหัวตาราง)
+XLSX_MAX_ROWS = 1_048_575
+
+# ชื่อรูปแบบ -> (นามสกุลไฟล์, MIME)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def _chunks(df, rows, chunk_rows):
+    """
+    DataFrame ทีละก้อนจากตำแหน่งแถว rows (None = ทุกแถว) แต่ละก้อนมีไม่เกิน chunk_rows แถว
+    """
+    total = len(df) if rows is None else len(rows)
+    for start in range(0, total, chunk_rows):
+        if rows is None:
+            yield df.iloc[start:start + chunk_rows]
+        else:
+            yield df.iloc[rows[start:start + chunk_rows]]
+
+
+def write_csv(df, rows, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    CSV (UTF-8 มี BOM ให้ Excel อ่านภาษาไทยได้) เขียนลง stream แบบ binary ทีละก้อน
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    df.iloc[:0].to_csv(text, index=False)
+    for chunk in _chunks(df, rows, chunk_rows):
+        chunk.to_csv(text, index=False, header=False)
+    text.flush()
+    text.detach()
+
+
+def write_parquet(df, rows, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Parquet (zstd) 1 row group ต่อก้อน คอลัมน์ category เขียนเป็น dictionary ตามเดิม
+    """
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(stream, schema, compression='zstd') as writer:
+        for chunk in _chunks(df, rows, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_xlsx(df, rows, stream, chunk_rows=EXPORT_CHUNK_ROWS, sheet_name='Pending'):
+    """
+    XLSX ด้วย xlsxwriter แบบ constant_memory (เขียนทีละแถวลงไฟล์ชั่วคราว ไม่ถือทั้งชีตไว้ในหน่วยความจำ)
+    """
+    total = len(df) if rows is None else len(rows)
+    if total > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX รับได้ไม่เกิน {XLSX_MAX_ROWS:,} แถว (ข้อมูลมี {total:,} แถว) ใช้ CSV หรือ Parquet แทน")
+
+    workbook = xlsxwriter.Workbook(stream, {
+        'constant_memory': True,
+        # ข้อความที่ขึ้นต้นด้วย = หรือเป็น URL ให้เป็นข้อความธรรมดา
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, [str(column) for column in df.columns], workbook.add_format({'bold': True}))
+        worksheet.freeze_panes(1, 0)
+        row_number = 1
+        for chunk in _chunks(df, rows, chunk_rows):
+            # category -> object ของก้อนนี้เท่านั้น ค่าว่างเขียนเป็นช่องว่าง
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                worksheet.write_row(row_number, 0, row)
+                row_number += 1
+    finally:
+        workbook.close()
+
+
+WRITERS = {
+    'CSV': write_csv,
+    'Parquet': write_parquet,
+    'XLSX': write_xlsx,
+}
+
+
+def export_bytes(df, rows, export_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    ไฟล์ที่ส่งออกเป็น bytes (ใช้กับ st.download_button) rows = ตำแหน่งแถวที่กรองแล้ว (None = ทุกแถว)
+    เขียนทีละก้อนลงไฟล์ชั่วคราว แล้วอ่านกลับครั้งเดียว (ไม่มี Buffer ที่โตตามไฟล์ + สำเนาตอน getvalue())
+    หน่วยความจำสูงสุดประมาณขนาดไฟล์ 1 ชุด + 1 ก้อนของ DataFrame ไฟล์ชั่วคราวถูกลบเมื่อปิด
+    """
+    with tempfile.TemporaryFile() as stream:
+        WRITERS[export_format](df, rows, stream, chunk_rows)
+        stream.seek(0)
+        return stream.read()
+
+
+def export_file_name(stem, export_format):
+    return f"{stem}.{EXPORT_FORMATS[export_format][0]}"
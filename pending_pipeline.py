@@ -0,0 +1,508 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import requests
+
+from marketplace_session import CircuitOpenError, DeadlineExceededError, MarketPlaceLoginError, read_body
+from pending_schema import normalize_pending
+from report_cache import content_digest
+from stage_timer import timed
+from store_config import REPORT_TYPES, STORES, build_report_matrix
+from xlsx_reader import read_xlsx
+
+# ----------------------------------------------------------------------
+# ขั้นตอนดึงข้อมูล Pending จาก MarketPlace (ไม่ขึ้นกับ Streamlit ใช้ได้จาก Background Thread)
+# ----------------------------------------------------------------------
+
+# --- (สำคัญ!) ตั้งค่าการ Login และ URL (จาก VBA) ---
+# เปลี่ยน Server ได้ด้วย MKP_BASE_URL (เช่น Stub Server ใน benchmarks/marketplace_stub.py)
+BASE_URL = os.environ.get("MKP_BASE_URL", "https://10.12.173.84/MarketPlace").rstrip("/")
+LOGIN_URL = f"{BASE_URL}/Home/Logon"
+DOWNLOAD_URL = f"{BASE_URL}/PickingList/PrintReport"
+USERNAME = "30034388" 
+PASSWORD = "9"      
+
+# กำหนด Timeout (วินาที)
+TIMEOUT_SEC = 15
+
+# เวลาสูงสุดของการดึงข้อมูล 1 รอบ (Login + ดาวน์โหลดทุก Report) ครบแล้ว Report ที่ยังไม่เสร็จใช้ข้อมูลเดิม
+FETCH_DEADLINE_SEC = float(os.environ.get("MKP_FETCH_DEADLINE_SEC", 90))
+
+# จำนวน Report ที่ดาวน์โหลดพร้อมกันได้สูงสุด (Thread Pool) ไม่ว่าจะมีกี่ Store
+MAX_DOWNLOAD_WORKERS = int(os.environ.get("MKP_DOWNLOAD_WORKERS", 4))
+
+# ขนาดไฟล์ Report สูงสุดที่ยอมรับ (bytes)
+MAX_REPORT_BYTES = 200 * 1024 * 1024
+
+# ความถี่ในการอัปเดต Progress ระหว่างดาวน์โหลด (วินาที)
+PROGRESS_INTERVAL_SEC = 0.25
+
+# Report ที่ต้องดึง: ทุก Store x ทุกประเภท (ตั้งค่าใน store_config.py / MKP_STORES / MKP_REPORT_TYPES)
+REPORTS_TO_FETCH = build_report_matrix(STORES, REPORT_TYPES)
+
+
+class _FetchProgress:
+    def __init__(self, fetch_log, value, text):
+        self._fetch_log = fetch_log
+        self.progress(value, text)
+
+    def progress(self, value, text=None):
+        self._fetch_log.progress_value = value
+        self._fetch_log.progress_text = text
+
+    def empty(self):
+        self._fetch_log.progress_value = None
+        self._fetch_log.progress_text = None
+
+
+class _DownloadProgress:
+    """
+    นับจำนวน bytes ที่ได้รับของแต่ละ Report (Worker Thread อัปเดต, Thread หลักอ่านไปแสดงผล)
+    """
+
+    def __init__(self, report_count):
+        self._lock = threading.Lock()
+        self._report_count = report_count
+        self._received = {}
+        self._expected = {}
+        self._finished = set()
+
+    def update(self, index, received, expected):
+        with self._lock:
+            self._received[index] = received
+            self._expected[index] = expected
+
+    def finish(self, index):
+        with self._lock:
+            self._finished.add(index)
+
+    def snapshot(self):
+        """
+        คืน (สัดส่วนความคืบหน้า 0-1, bytes ที่ได้รับรวม, bytes ที่คาดว่าจะได้รับรวมจาก Content-Length)
+        """
+        with self._lock:
+            done = 0.0
+            for index in range(self._report_count):
+                if index in self._finished:
+                    done += 1
+                elif self._expected.get(index):
+                    done += min(self._received[index] / self._expected[index], 1.0)
+            received = sum(self._received.values())
+            expected = sum(value for value in self._expected.values() if value)
+        return done / self._report_count, received, expected
+
+
+class FetchLog:
+    """
+    เก็บ Log ของการดึงข้อมูลไว้ (แทน Streamlit container) เพื่อนำไปแสดงผลภายหลัง
+    ใช้เมื่อ fetch_all_data รันนอก Streamlit Script Thread เช่น Background Refresh
+
+    entries = list ของ (level, message) โดย level คือชื่อ method ของ Streamlit (success/warning/error/info/write)
+    stale_reports = Report ที่ดาวน์โหลดไม่สำเร็จในรอบนี้ และใช้ข้อมูลเดิม (dict: report, as_of, reason)
+    missing_reports = Report ที่ดาวน์โหลดไม่สำเร็จและไม่มีข้อมูลเดิม ยอดรวมไม่รวม Report เหล่านี้ (dict: report, reason)
+    store_frames = {Store: DataFrame} ข้อมูลเบื้องต้นของ Store ที่ได้ Report ครบแล้วระหว่างรอบ (ส่ง store_ready
+                   เป็น on_store_ready ของ fetch_all_data) หน้าจอแสดงได้ก่อนรอบจะเสร็จทั้งหมด
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.stale_reports = []
+        self.missing_reports = []
+        self.store_frames = {}
+        self.progress_value = None
+        self.progress_text = None
+
+    def store_ready(self, store, df_store):
+        self.store_frames[store] = df_store
+
+    def mark_stale(self, report, as_of, reason):
+        self.stale_reports.append({
+            'report': f"{report['remark']} Store {report['store']}",
+            'as_of': as_of,
+            'reason': reason,
+        })
+
+    def mark_missing(self, report, reason):
+        self.missing_reports.append({
+            'report': f"{report['remark']} Store {report['store']}",
+            'reason': reason,
+        })
+
+    def _add(self, level, message):
+        self.entries.append((level, message))
+
+    def success(self, message):
+        self._add('success', message)
+
+    def info(self, message):
+        self._add('info', message)
+
+    def warning(self, message):
+        self._add('warning', message)
+
+    def error(self, message):
+        self._add('error', message)
+
+    def write(self, message):
+        self._add('write', message)
+
+    def progress(self, value, text=None):
+        return _FetchProgress(self, value, text)
+
+    def replay(self, container):
+        """
+        แสดง Log ทั้งหมดลงใน Streamlit container
+        """
+        for level, message in self.entries:
+            getattr(container, level)(message)
+
+
+def parse_report(content, report):
+    """
+    แปลงไฟล์ PrintReport เป็น DataFrame คอลัมน์ ColA-ColG + Remark + Store
+    """
+    # อ่านเฉพาะ 7 คอลัมน์แรก (Header อยู่แถวที่ 3)
+    df_temp = read_xlsx(
+        content, usecols=range(7),
+        names=['ColA', 'ColB', 'ColC', 'ColD', 'ColE', 'ColF', 'ColG'], header_row=2
+    )
+    df_temp['Remark'] = report['remark']
+    df_temp['Store'] = int(report['store'])
+    return df_temp
+
+
+def _download_report(mp_session, report_cache, report, timeout, on_progress=None, timer=None, deadline=None):
+    """
+    ดาวน์โหลด Report 1 ตัว แล้วแปลงเป็น DataFrame ทันที (รันใน Worker Thread)
+    ใช้ Session/Connection Pool ร่วมกัน ถ้า Session หมดอายุจะ Login ใหม่ให้เอง
+    ถ้าไฟล์ไม่เปลี่ยน (304 หรือ Hash เดิม) จะใช้ DataFrame เดิมจาก Cache โดยไม่ Parse ซ้ำ
+    ไฟล์ถูกอ่านแบบ Stream ลง Buffer เดียว (จำกัดขนาดที่ MAX_REPORT_BYTES) แล้วส่งให้ตัวอ่าน Excel โดยไม่คัดลอก
+
+    deadline (time.monotonic()) = เวลาสิ้นสุดของรอบ Request ที่เริ่มหลังจากนั้นจะไม่ถูกส่ง
+
+    คืนค่า (df_temp, digest, elapsed, nbytes, status) โดย status = 'parsed' / 'unchanged' / 'not-modified'
+    """
+    started = time.perf_counter()
+    cache_key = (report['store'], report['type'])
+    params = {'typereport': report['type'], 'storeno': report['store']}
+    labels = {'report': f"{report['store']}-{report['type']}"}
+
+    with timed(timer, 'download', labels) as download_fields:
+        download_response = mp_session.get(
+            DOWNLOAD_URL, params=params, deadline=deadline,
+            headers=report_cache.conditional_headers(cache_key), timeout=timeout, stream=True
+        )
+        try:
+            if download_response.status_code == 304:
+                cached = report_cache.get_not_modified(cache_key)
+                if cached is not None:
+                    download_fields.update(bytes=0, status=304)
+                    df_temp, digest = cached
+                    return df_temp, digest, time.perf_counter() - started, 0, 'not-modified'
+                # ไม่มีข้อมูลเดิมใน Cache: โหลดใหม่แบบไม่มี Conditional Header
+                download_response.close()
+                download_response = mp_session.get(DOWNLOAD_URL, params=params, deadline=deadline, timeout=timeout, stream=True)
+
+            download_response.raise_for_status()
+            content = read_body(download_response, MAX_REPORT_BYTES, on_progress=on_progress)
+            download_fields.update(bytes=len(content), status=download_response.status_code)
+        finally:
+            download_response.close()
+
+    digest = content_digest(content)
+    df_temp = report_cache.lookup(cache_key, digest)
+    if df_temp is not None:
+        status = 'unchanged'
+    else:
+        status = 'parsed'
+        with timed(timer, 'parse', labels) as parse_fields:
+            df_temp = parse_report(content, report)
+            parse_fields['rows'] = len(df_temp)
+
+    # เก็บ ETag / Last-Modified ล่าสุดเสมอ (ไฟล์เดิมแต่ Header ใหม่ รอบหน้าจะได้ 304 แทนการโหลดซ้ำ)
+    report_cache.store(
+        cache_key, digest, df_temp,
+        etag=download_response.headers.get('ETag'),
+        last_modified=download_response.headers.get('Last-Modified')
+    )
+    return df_temp, digest, time.perf_counter() - started, len(content), status
+
+
+def drop_duplicate_orders(df_combined):
+    """
+    ลบแถวที่ Order ID (ColB) ซ้ำ เก็บแถวแรกตามลำดับ Report
+    """
+    return df_combined.drop_duplicates(subset=['ColB'], keep='first')
+
+
+def add_boxes_qty(df_combined):
+    """
+    คำนวณ ColJ_BoxesQty = ColG / ColF (ถ้าได้น้อยกว่า 1 หรือ ColF ว่าง/เป็น 0 ใช้ ColG)
+    """
+    col_f_num = pd.to_numeric(df_combined['ColF'], errors='coerce')
+    col_g_num = pd.to_numeric(df_combined['ColG'], errors='coerce')
+    col_f_safe = col_f_num.replace(0, np.nan)
+    ratio = col_g_num / col_f_safe
+
+    df_combined['ColJ_BoxesQty'] = np.where(
+        ratio < 1,
+        col_g_num,
+        ratio
+    )
+    df_combined['ColJ_BoxesQty'] = df_combined['ColJ_BoxesQty'].fillna(col_g_num)
+    return df_combined
+
+
+def to_pending_columns(df_combined):
+    """
+    เปลี่ยนชื่อคอลัมน์ ColX เป็นชื่อที่ Dashboard ใช้ และเลือกเฉพาะคอลัมน์ที่ใช้
+    """
+    df_final = df_combined.rename(columns={
+        'ColA': 'Seller Center', 
+        'ColB': 'Order ID',
+        'ColD': 'SKU (TPNB)',
+        'ColE': 'Description',
+        'Remark': 'Remark',
+        'Store': 'Store',
+        'ColJ_BoxesQty': 'BoxesQty'
+    })
+
+    final_columns = [
+        'Seller Center', 'Order ID', 'SKU (TPNB)', 'Description',
+        'Remark', 'Store', 'BoxesQty'
+    ]
+    return df_final[final_columns]
+
+
+def build_store_partial(store_frames):
+    """
+    ข้อมูลเบื้องต้นของ Store เดียวจาก Report ของ Store นั้น (ลำดับตาม reports_to_fetch)
+    ขั้นตอนเดียวกับผลเต็ม แต่ลบ Order ซ้ำเฉพาะภายใน Store ผลเต็มของรอบจะมาแทนเมื่อดึงเสร็จ
+    """
+    df_store = drop_duplicate_orders(pd.concat(store_frames, ignore_index=True))
+    df_store = add_boxes_qty(df_store)
+    return normalize_pending(to_pending_columns(df_store))[0]
+
+
+_download_pool = None
+_download_pool_lock = threading.Lock()
+
+
+def get_download_pool():
+    """
+    Thread Pool ของการดาวน์โหลด 1 ตัวต่อ Process ใช้ซ้ำทุกรอบ (Thread ไม่เกิน MAX_DOWNLOAD_WORKERS)
+    Request ที่ยังค้างหลังหมดเวลาของรอบใช้ Thread ใน Pool นี้ต่อจนหมด timeout เอง ไม่มี Thread ใหม่สะสมทุกรอบ
+    """
+    global _download_pool
+    with _download_pool_lock:
+        if _download_pool is None:
+            _download_pool = ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS, thread_name_prefix="mkp-download")
+        return _download_pool
+
+
+def fetch_all_data(mp_session, report_cache, log, timer=None, change_feed=None, on_store_ready=None):
+    """
+    ฟังก์ชันนี้จำลองการทำงานของ VBA Modules 1-4... (อัปเดตแก้ Proxy/Timeout)
+    log ใช้ได้ทั้ง Streamlit container และ FetchLog (มี success/warning/error/write/progress)
+    timer = StageTimer สำหรับจับเวลาแต่ละขั้น (None = ไม่จับเวลา)
+    change_feed = ChangeFeed ที่เทียบข้อมูลรอบนี้กับรอบก่อนตาม Order ID (None = ไม่เทียบ)
+    on_store_ready(store, df_store) = เรียกทันทีที่ Report ทุกประเภทของ Store หนึ่งเสร็จ (เช่น FetchLog.store_ready)
+    ให้หน้าจอแสดง Store นั้นได้ก่อน Store อื่นดาวน์โหลดเสร็จ (None = ไม่สร้างข้อมูลเบื้องต้น)
+    Report ที่ล้มเหลว / หมดเวลาแล้วใช้ข้อมูลเดิม (last good) นับว่าเสร็จด้วย
+
+    ทั้งรอบใช้เวลาไม่เกิน FETCH_DEADLINE_SEC Report ที่ล้มเหลวหรือไม่เสร็จทันเวลาจะใช้ข้อมูลล่าสุดที่ดึงสำเร็จ
+    (report_cache.last_good) แทนการตัดทิ้ง ยอดรวมจึงไม่หายไปเงียบ ๆ และถูกบันทึกใน log.stale_reports (FetchLog)
+    """
+    deadline = time.monotonic() + FETCH_DEADLINE_SEC
+
+    # 1-3. ใช้ Session ที่ Login ค้างไว้ (Login ใหม่เฉพาะเมื่อยังไม่เคย Login หรือ Session หมดอายุ)
+    try:
+        logged_in_now = mp_session.ensure_login(deadline)
+    except (requests.exceptions.ConnectTimeout, DeadlineExceededError):
+        log.error(f"❌ [Step 1 FAILED] เชื่อมต่อ Server ไม่ได้ (Timeout) กรุณาตรวจสอบว่าต่อ VPN หรือสาย LAN บริษัทแล้วหรือยัง?")
+        return pd.DataFrame()
+    except CircuitOpenError as e:
+        log.error(f"⛔ [Step 1 SKIPPED] {e}")
+        return pd.DataFrame()
+    except MarketPlaceLoginError as e:
+        log.error(f"❌ [Step {e.step} FAILED] {e}")
+        return pd.DataFrame()
+    except Exception as e:
+        log.error(f"❌ [Step 1 FAILED] ไม่สามารถเชื่อมต่อหน้า Login ได้: {e}")
+        return pd.DataFrame()
+
+    login_stats = mp_session.stats()
+    login_counter = f"(Login hit {login_stats['login_hits']:,} / miss {login_stats['login_misses']:,})"
+    if logged_in_now:
+        log.success(f"✅ [Step 1 & 2] Login สำเร็จ! {login_counter}")
+    else:
+        log.success(f"✅ [Step 1 & 2] ใช้ Session เดิมที่ Login ไว้แล้ว {login_counter}")
+
+    # 4. Report ที่ต้องดึง
+    reports_to_fetch = REPORTS_TO_FETCH
+
+    results = [None] * len(reports_to_fetch)
+    digests = [None] * len(reports_to_fetch)
+    progress_bar = log.progress(0, "เริ่มต้นดาวน์โหลดข้อมูล...")
+
+    # 5. ดาวน์โหลดพร้อมกันด้วย Thread Pool (แต่ละ Report แปลงเป็น DataFrame ทันทีที่โหลดเสร็จ)
+    #    Progress คิดจาก bytes ที่ได้รับเทียบกับ Content-Length ของทุกไฟล์
+    download_progress = _DownloadProgress(len(reports_to_fetch))
+    done_count = 0
+    stale_count = 0
+
+    # จำนวน Report ที่ยังไม่เสร็จของแต่ละ Store (ครบเมื่อไหร่ส่งข้อมูลเบื้องต้นของ Store นั้นทันที)
+    store_remaining = {}
+    for report in reports_to_fetch:
+        store_remaining[report['store']] = store_remaining.get(report['store'], 0) + 1
+
+    def report_done(i):
+        store = reports_to_fetch[i]['store']
+        store_remaining[store] -= 1
+        if on_store_ready is None or store_remaining[store]:
+            return
+        store_frames = [
+            results[j] for j, report in enumerate(reports_to_fetch)
+            if report['store'] == store and results[j] is not None
+        ]
+        if not store_frames:
+            return
+        try:
+            with timed(timer, 'store_partial', {'store': store}):
+                on_store_ready(int(store), build_store_partial(store_frames))
+        except Exception as e:
+            log.warning(f"⚠️ แสดงข้อมูลเบื้องต้นของ Store {store} ไม่ได้: {e}")
+
+    def use_last_good(i, reason):
+        # ดาวน์โหลดไม่ได้: ใช้ข้อมูลล่าสุดที่ดึงสำเร็จของ Report นี้ (ถ้ามี) พร้อมบอกว่าข้อมูลไม่เป็นปัจจุบัน
+        nonlocal stale_count
+        report = reports_to_fetch[i]
+        fallback = report_cache.last_good((report['store'], report['type']))
+        if fallback is None:
+            log.warning(f"⚠️ ดาวน์โหลด {report['remark']} {report['store']} ล้มเหลว: {reason} (ไม่มีข้อมูลเดิม ยอดรวมจะไม่รวม Report นี้)")
+            if isinstance(log, FetchLog):
+                log.mark_missing(report, str(reason))
+            return
+        results[i], digests[i], as_of = fallback
+        stale_count += 1
+        log.warning(
+            f"⚠️ ดาวน์โหลด {report['remark']} {report['store']} ล้มเหลว: {reason} "
+            f"→ ใช้ข้อมูลเดิม ณ {as_of:%d/%m/%Y %H:%M:%S} (ไม่เป็นปัจจุบัน)"
+        )
+        if isinstance(log, FetchLog):
+            log.mark_stale(report, as_of, str(reason))
+
+    def collect(future):
+        nonlocal done_count
+        i = futures[future]
+        report = reports_to_fetch[i]
+        done_count += 1
+        download_progress.finish(i)
+        try:
+            df_temp, digest, elapsed, nbytes, status = future.result()
+            results[i] = df_temp
+            digests[i] = digest
+            unchanged_note = "" if status == 'parsed' else ", ไม่เปลี่ยนแปลง ใช้ข้อมูลเดิม"
+            log.write(
+                f"ดาวน์โหลดเสร็จ: {report['remark']} Store {report['store']} "
+                f"({len(df_temp):,} แถว, {nbytes / 1024 / 1024:.1f} MB, {elapsed:.1f} วินาที{unchanged_note})"
+            )
+        except Exception as e:
+            use_last_good(i, e)
+        report_done(i)
+
+    # Pool ใช้ร่วมกันทุกรอบ: หมดเวลาแล้วไม่รอ Thread ที่ยังค้างอยู่ (Request เหล่านั้นหมด timeout เองภายหลัง)
+    pool = get_download_pool()
+    futures = {
+        pool.submit(
+            _download_report, mp_session, report_cache, report, TIMEOUT_SEC,
+            lambda received, expected, i=i: download_progress.update(i, received, expected),
+            timer, deadline
+        ): i
+        for i, report in enumerate(reports_to_fetch)
+    }
+    pending = set(futures)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        finished, pending = wait(pending, timeout=min(PROGRESS_INTERVAL_SEC, remaining), return_when=FIRST_COMPLETED)
+        for future in finished:
+            collect(future)
+
+        fraction, received, expected = download_progress.snapshot()
+        size_text = f"{received / 1024 / 1024:.1f} / {expected / 1024 / 1024:.1f} MB" if expected else f"{received / 1024 / 1024:.1f} MB"
+        progress_bar.progress(
+            fraction,
+            f"กำลังดาวน์โหลด {size_text} (เสร็จ {done_count}/{len(reports_to_fetch)} ไฟล์)"
+        )
+
+    # Report ที่เสร็จพอดีตอนหมดเวลายังใช้ผลได้ ไม่ทิ้งไปใช้ข้อมูลเดิม
+    for future in [future for future in pending if future.done()]:
+        pending.discard(future)
+        collect(future)
+    for future in pending:
+        # ยังไม่เริ่ม (รอ Thread ว่าง) ยกเลิกได้ ที่กำลังดาวน์โหลดอยู่ปล่อยให้หมด timeout เอง
+        future.cancel()
+        use_last_good(futures[future], f"ไม่เสร็จภายใน {FETCH_DEADLINE_SEC:g} วินาที")
+        report_done(futures[future])
+
+    # เรียงตามลำดับ reports_to_fetch เสมอ (drop_duplicates keep='first' ขึ้นกับลำดับ)
+    all_dataframes = [df_temp for df_temp in results if df_temp is not None]
+
+    progress_bar.empty()
+    if not all_dataframes:
+        log.error("❌ [Step 3 FAILED] ไม่สามารถดาวน์โหลดข้อมูลได้เลย")
+        return pd.DataFrame()
+
+    if stale_count:
+        log.warning(f"⚠️ [Step 3] ดาวน์โหลดใหม่ได้ {len(all_dataframes) - stale_count} ส่วน ใช้ข้อมูลเดิม {stale_count} ส่วน")
+    else:
+        log.success(f"✅ [Step 3] ดาวน์โหลดข้อมูลทั้ง {len(all_dataframes)} ส่วนสำเร็จ!")
+
+    # ถ้าทุก Report ได้ไฟล์เดิม ไม่ต้อง concat/drop_duplicates/BoxesQty ใหม่
+    digests = tuple(digests)
+    df_unchanged = report_cache.get_combined(digests)
+    if df_unchanged is not None:
+        log.success("✅ [Step 4] ข้อมูลไม่เปลี่ยนแปลงจากรอบก่อน ใช้ผลลัพธ์เดิม")
+        return df_unchanged
+
+    # 6. รวม DataFrame
+    with timed(timer, 'concat'):
+        df_combined = pd.concat(all_dataframes, ignore_index=True)
+
+    # 7. ลบข้อมูลซ้ำ
+    with timed(timer, 'drop_duplicates'):
+        df_combined = drop_duplicate_orders(df_combined)
+
+    # 8. คำนวณ BoxesQty
+    with timed(timer, 'boxes_qty'):
+        df_combined = add_boxes_qty(df_combined)
+
+    # 9-10. เปลี่ยนชื่อคอลัมน์ และเลือกเฉพาะคอลัมน์ที่ใช้
+    df_final = to_pending_columns(df_combined)
+
+    # 11. แปลงชนิดข้อมูลให้กะทัดรัด (category / จำนวนเต็มขนาดเล็ก)
+    with timed(timer, 'normalize'):
+        df_final, memory_report = normalize_pending(df_final)
+    report_cache.put_combined(digests, df_final)
+
+    log.success(
+        f"✅ [Step 4] ประมวลผลข้อมูลและคำนวณ BoxesQty สำเร็จ! "
+        f"({memory_report['rows']:,} แถว, หน่วยความจำ {memory_report['before_mb']:.1f} MB → {memory_report['after_mb']:.1f} MB)"
+    )
+
+    # 12. เทียบกับรอบก่อน (Order ใหม่ / หายไป / เปลี่ยนสถานะ)
+    if change_feed is not None:
+        with timed(timer, 'diff'):
+            delta = change_feed.update(df_final)
+        if delta is not None:
+            log.write(
+                f"เทียบกับรอบก่อน: ใหม่ {delta.counts['Added']:,} / หายไป {delta.counts['Removed']:,} / "
+                f"เปลี่ยนสถานะ {delta.counts['Changed']:,} Order"
+            )
+    return df_final
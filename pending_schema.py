@@ -0,0 +1,87 @@
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# Schema ของข้อมูล Pending: แปลงชนิดข้อมูลให้กะทัดรัดก่อนส่งให้ Dashboard
+# ----------------------------------------------------------------------
+
+PENDING_COLUMNS = [
+    'Seller Center', 'Order ID', 'SKU (TPNB)', 'Description',
+    'Remark', 'Store', 'BoxesQty'
+]
+
+# คอลัมน์บอกที่มาของแถว (ชื่อไฟล์) เมื่อรวมหลายไฟล์ที่อัปโหลด มีหรือไม่มีก็ได้
+SOURCE_COLUMN = 'Source File'
+
+# ลำดับ Remark ที่ใช้ในกราฟ (Remark อื่นที่พบจะต่อท้าย)
+REMARK_ORDER = ["Canpick", "Cannotpick"]
+
+
+def _to_integer_if_possible(series):
+    """
+    แปลงเป็นจำนวนเต็มขนาดเล็กที่สุดถ้าทุกค่าเป็นตัวเลขจำนวนเต็ม ไม่เช่นนั้นคืน None
+    (มีค่าว่างจะใช้ nullable Int64)
+    """
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.isna().sum() != series.isna().sum():
+        return None
+    if numeric.isna().any():
+        if not (numeric.dropna() % 1 == 0).all():
+            return None
+        return numeric.astype('Int64')
+    if not (numeric % 1 == 0).all():
+        return None
+    return pd.to_numeric(numeric.astype('int64'), downcast='integer')
+
+
+def _categorical(series, leading=()):
+    """
+    แปลงเป็น Category (เก็บค่าไม่ซ้ำครั้งเดียว แต่ละแถวเก็บแค่ code)
+    ค่าใน leading จะอยู่หน้าสุดของลำดับ Category
+    """
+    categorical = pd.Categorical(series)
+    if leading:
+        first = [value for value in leading if value in categorical.categories]
+        rest = [value for value in categorical.categories if value not in first]
+        categorical = categorical.reorder_categories(first + rest)
+    return categorical
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def normalize_pending(df):
+    """
+    คืน (df ที่แปลงชนิดแล้ว, dict รายงานหน่วยความจำ)
+
+    - Seller Center / Remark / SKU (TPNB) / Description -> category
+      (Description เป็นพจนานุกรมคำอธิบายสินค้า เก็บข้อความแต่ละแบบครั้งเดียว)
+    - Store -> จำนวนเต็มขนาดเล็ก, Order ID -> จำนวนเต็มถ้าเป็นตัวเลขทั้งหมด
+    - BoxesQty -> int32
+    - Source File (ถ้ามี) -> category
+    """
+    before_mb = memory_mb(df)
+    has_source = SOURCE_COLUMN in df.columns
+    df = df[PENDING_COLUMNS + ([SOURCE_COLUMN] if has_source else [])].reset_index(drop=True)
+
+    store = _to_integer_if_possible(df['Store'])
+    order_id = _to_integer_if_possible(df['Order ID'])
+
+    normalized = pd.DataFrame({
+        'Seller Center': _categorical(df['Seller Center']),
+        'Order ID': order_id if order_id is not None else df['Order ID'],
+        'SKU (TPNB)': _categorical(df['SKU (TPNB)']),
+        'Description': _categorical(df['Description']),
+        'Remark': _categorical(df['Remark'], leading=REMARK_ORDER),
+        'Store': store if store is not None else _categorical(df['Store']),
+        'BoxesQty': pd.to_numeric(df['BoxesQty'], errors='coerce').fillna(0).astype('int32'),
+    })
+    if has_source:
+        normalized[SOURCE_COLUMN] = _categorical(df[SOURCE_COLUMN])
+
+    report = {
+        'rows': len(normalized),
+        'before_mb': float(before_mb),
+        'after_mb': float(memory_mb(normalized)),
+    }
+    return normalized, report
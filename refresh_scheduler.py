@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from datetime import datetime
+
+# ----------------------------------------------------------------------
+# Background Refresh: ดึงข้อมูลตามรอบเวลาใน Thread เดียวของ Process
+# ทุกหน้าจอที่เปิด Dashboard อ่านผลลัพธ์ชุดเดียวกัน ไม่ต้องดึงเอง
+# ----------------------------------------------------------------------
+
+
+class RefreshResult:
+    """
+    ผลการดึงข้อมูล 1 รอบ
+
+    data        = DataFrame ที่ได้ (ว่างถ้าดึงไม่สำเร็จ)
+    fetched_at  = เวลาที่ดึงเสร็จ (datetime)
+    duration    = เวลาที่ใช้ (วินาที)
+    log         = FetchLog ของรอบนี้
+    run_id      = ลำดับรอบ (เพิ่มขึ้นทุกครั้ง)
+    """
+
+    def __init__(self, data, fetched_at, duration, log, run_id):
+        self.data = data
+        self.fetched_at = fetched_at
+        self.duration = duration
+        self.log = log
+        self.run_id = run_id
+
+    @property
+    def ok(self):
+        return self.data is not None and not self.data.empty
+
+
+class BackgroundRefresher:
+    """
+    เรียก fetch_fn(log) ทุก interval_sec (± jitter_sec) ใน Daemon Thread
+
+    - Single-flight: มีการดึงข้อมูลได้ครั้งละ 1 รอบเท่านั้น
+      ถ้ากด Refresh ระหว่างที่กำลังดึงอยู่ จะรอผลของรอบนั้นแทนการดึงซ้ำ
+    - latest()        = ผลล่าสุดที่ดึงสำเร็จ (รอบที่ล้มเหลวจะไม่ทับข้อมูลเดิม)
+    - last_attempt()  = ผลของรอบล่าสุด ไม่ว่าจะสำเร็จหรือไม่ (ใช้แสดง Log)
+    """
+
+    def __init__(self, fetch_fn, log_factory, interval_sec=600, jitter_sec=30):
+        self._fetch_fn = fetch_fn
+        self._log_factory = log_factory
+        self.interval_sec = interval_sec
+        self.jitter_sec = jitter_sec
+
+        self._cond = threading.Condition()
+        self._wake = False
+        self._running = False
+        self._started_runs = 0
+        self._finished_runs = 0
+        self._current_log = None
+        self._latest = None
+        self._last_attempt = None
+        self.next_run_at = None
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._loop, name="mkp-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def seed(self, data, fetched_at, log):
+        """
+        ตั้งผลเริ่มต้น (เช่นจาก Snapshot บนดิสก์) ให้หน้าจอแสดงได้ทันทีระหว่างรอดึงรอบแรก
+        """
+        with self._cond:
+            if self._latest is None:
+                self._latest = RefreshResult(data, fetched_at, 0.0, log, 0)
+
+    def latest(self):
+        with self._cond:
+            return self._latest
+
+    def last_attempt(self):
+        with self._cond:
+            return self._last_attempt
+
+    def is_running(self):
+        with self._cond:
+            return self._running
+
+    def current_log(self):
+        """
+        FetchLog ของรอบที่กำลังดึงอยู่ (None ถ้าไม่มีรอบที่กำลังทำงาน)
+        """
+        with self._cond:
+            return self._current_log if self._running else None
+
+    def request_refresh(self):
+        """
+        ขอให้ดึงข้อมูลทันที คืนค่า run_id ที่ใช้รอผลด้วย wait_for()
+        ถ้ากำลังดึงอยู่แล้ว จะคืน run_id ของรอบนั้น (ไม่เริ่มรอบใหม่ซ้ำ)
+        """
+        with self._cond:
+            if self._running:
+                return self._started_runs
+            self._wake = True
+            self._cond.notify_all()
+            return self._started_runs + 1
+
+    def wait_for(self, run_id, timeout=None):
+        """
+        รอจนรอบ run_id ดึงเสร็จ คืนค่า True ถ้าเสร็จทันเวลา
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._finished_runs >= run_id, timeout)
+
+    def _next_delay(self):
+        return max(1.0, self.interval_sec + random.uniform(-self.jitter_sec, self.jitter_sec))
+
+    def _loop(self):
+        while True:
+            self._run_once()
+            delay = self._next_delay()
+            with self._cond:
+                self.next_run_at = datetime.fromtimestamp(time.time() + delay)
+                self._cond.wait_for(lambda: self._wake, delay)
+                self._wake = False
+
+    def _run_once(self):
+        log = self._log_factory()
+        with self._cond:
+            self._running = True
+            # รอบนี้ตอบคำขอ Refresh ที่ค้างอยู่ทั้งหมดแล้ว
+            self._wake = False
+            self._started_runs += 1
+            run_id = self._started_runs
+            self._current_log = log
+
+        started = time.perf_counter()
+        try:
+            data = self._fetch_fn(log)
+        except Exception as e:
+            log.error(f"เกิดข้อผิดพลาดร้ายแรงในการโหลดข้อมูล: {e}")
+            data = None
+        result = RefreshResult(data, datetime.now(), time.perf_counter() - started, log, run_id)
+
+        with self._cond:
+            self._last_attempt = result
+            if result.ok:
+                self._latest = result
+            self._running = False
+            self._current_log = None
+            self._finished_runs = run_id
+            self._cond.notify_all()
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from datetime import datetime
+
+# ----------------------------------------------------------------------
+# Cache DataFrame ของแต่ละ Report (store, typereport) ตาม Hash ของไฟล์ที่ดาวน์โหลด
+# ----------------------------------------------------------------------
+
+
+def content_digest(content):
+    """
+    Hash ของไฟล์ Report (bytes / bytearray / memoryview)
+    """
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class ReportFrameCache:
+    """
+    เก็บ DataFrame ที่แปลงแล้วของแต่ละ Report ไว้ ถ้าไฟล์ที่ดาวน์โหลดมาได้ Hash เดิม
+    จะไม่ต้อง pd.read_excel ซ้ำ และเก็บ ETag/Last-Modified ไว้ส่ง Conditional Request
+
+    นอกจากนี้ยังเก็บผลลัพธ์สุดท้าย (หลัง concat/drop_duplicates/BoxesQty) ไว้ 1 ชุด
+    ตาม Hash ของทุก Report รวมกัน ถ้าไม่มี Report ไหนเปลี่ยนก็ใช้ผลเดิมได้ทันที
+
+    ข้อมูลของแต่ละ Report ที่เก็บไว้คือชุดล่าสุดที่ดึงสำเร็จ (last good) ถ้ารอบไหนดาวน์โหลดไม่ได้
+    ใช้ last_good() แทนได้ พร้อมเวลาที่ยืนยันล่าสุดว่าข้อมูลนี้เป็นปัจจุบัน (confirmed_at)
+
+    DataFrame ที่คืนจาก Cache ใช้ร่วมกันหลายที่ ห้ามแก้ไขแบบ inplace
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._combined_key = None
+        self._combined_frame = None
+        self.parse_hits = 0
+        self.parse_misses = 0
+        self.not_modified = 0
+
+    def conditional_headers(self, key):
+        """
+        Header If-None-Match / If-Modified-Since สำหรับ Report นี้ (ถ้า Server เคยส่งมา)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_not_modified(self, key):
+        """
+        Server ตอบ 304 Not Modified: คืน (frame, digest) เดิม หรือ None ถ้าไม่มีใน Cache
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.not_modified += 1
+            entry['confirmed_at'] = datetime.now()
+            return entry['frame'], entry['digest']
+
+    def lookup(self, key, digest):
+        """
+        คืน DataFrame เดิมถ้า Hash ตรงกัน ไม่เช่นนั้นคืน None (ต้อง Parse ใหม่)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['digest'] == digest:
+                self.parse_hits += 1
+                entry['confirmed_at'] = datetime.now()
+                return entry['frame']
+            self.parse_misses += 1
+            return None
+
+    def store(self, key, digest, frame, etag=None, last_modified=None):
+        with self._lock:
+            self._entries[key] = {
+                'digest': digest,
+                'frame': frame,
+                'etag': etag,
+                'last_modified': last_modified,
+                'confirmed_at': datetime.now(),
+            }
+
+    def last_good(self, key):
+        """
+        ข้อมูลล่าสุดที่ดึงสำเร็จของ Report นี้ คืน (frame, digest, confirmed_at) หรือ None ถ้าไม่เคยดึงได้
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry['frame'], entry['digest'], entry['confirmed_at']
+
+    def get_combined(self, digests):
+        """
+        digests = tuple ของ Hash ทุก Report ตามลำดับ (None = Report ที่โหลดไม่สำเร็จ)
+        """
+        with self._lock:
+            if self._combined_key is not None and self._combined_key == digests:
+                return self._combined_frame
+            return None
+
+    def put_combined(self, digests, frame):
+        with self._lock:
+            self._combined_key = digests
+            self._combined_frame = frame
+
+    def stats(self):
+        with self._lock:
+            return {
+                'parse_hits': self.parse_hits,
+                'parse_misses': self.parse_misses,
+                'not_modified': self.not_modified,
+            }
@@ -0,0 +1,120 @@
+import os
+import threading
+from collections import OrderedDict
+
+from order_index import build_order_index
+from pending_aggregates import build_cube, top_items_by_store
+from pending_schema import memory_mb
+
+# ----------------------------------------------------------------------
+# ชุดข้อมูล Pending ที่ใช้ร่วมกันทุก Session: ถือไว้ครั้งเดียวต่อ Process (ใน st.cache_resource)
+# แทน st.cache_data ที่ pickle แล้วให้แต่ละ Session ได้สำเนาของตัวเอง
+# ----------------------------------------------------------------------
+
+# จำนวนชุดข้อมูลสูงสุดที่ถือไว้พร้อมกัน (เช่น Session ที่ยังแสดงรอบก่อน / อัปโหลดไฟล์คนละชุด)
+DATASET_VERSIONS = int(os.environ.get("MKP_DATASET_VERSIONS", 4))
+
+# จำนวนผล Top-N (N, แยก Seller) ที่จำไว้ต่อชุดข้อมูล
+TOP_ITEMS_CACHE_SIZE = 16
+
+
+class SharedDataset:
+    """
+    ชุดข้อมูล 1 รุ่น (version) พร้อมยอดรวมที่ทุกกราฟใช้ อ่านอย่างเดียว ทุก Session ได้ Object ตัวเดียวกัน
+
+    - cube         ยอดรวม (Store, Seller Center, Remark) สร้างตอนสร้างชุดข้อมูล
+    - order_index  Position array ต่อคอลัมน์ สร้างครั้งแรกที่มีคนใช้
+    - top_items    Top-N Cannotpick ของทุก Store จำผลตาม (N, แยก Seller)
+
+    ข้อมูลราย Store อ่านจากยอดรวมที่แยก Store ไว้แล้วใน cube หรือตำแหน่งแถวจาก order_index.select
+    (ไม่สร้าง df[df['Store'] == Store] ใหม่)
+
+    cube / top_items ที่ส่งมา (เช่น summary ของ pending_cli.py) ใช้แทนการคำนวณจาก df
+    top_items = {(N, แยก Seller, Remark): {Store: DataFrame}}
+
+    df และทุกอย่างที่คืนไปห้ามแก้ไข ถ้าต้องแก้ให้ .copy() เอง
+    """
+
+    def __init__(self, df, version, cube=None, top_items=None):
+        self.df = df
+        self.version = version
+        self.cube = cube if cube is not None else build_cube(df)
+        self._lock = threading.Lock()
+        self._order_index = None
+        self._top_items = OrderedDict(top_items or {})
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def stores(self):
+        return self.cube.stores
+
+    @property
+    def order_index(self):
+        with self._lock:
+            if self._order_index is None:
+                self._order_index = build_order_index(self.df)
+            return self._order_index
+
+    def top_items(self, n, by_seller=False, remark="Cannotpick"):
+        """
+        {Store: DataFrame} Top-N รายการ ในการสแกนครั้งเดียว (ผลเดิมถ้าเคยขอ N / การแยก Seller นี้แล้ว)
+        """
+        key = (n, by_seller, remark)
+        with self._lock:
+            top = self._top_items.get(key)
+            if top is not None:
+                self._top_items.move_to_end(key)
+                return top
+            top = self._top_items[key] = top_items_by_store(self.df, n=n, remark=remark, by_seller=by_seller)
+            while len(self._top_items) > TOP_ITEMS_CACHE_SIZE:
+                self._top_items.popitem(last=False)
+            return top
+
+    def memory_mb(self):
+        return memory_mb(self.df)
+
+
+class DatasetRegistry:
+    """
+    ชุดข้อมูลล่าสุดไม่กี่รุ่นของ Process: publish(df) ด้วย DataFrame ตัวเดิม (is) ได้ SharedDataset ตัวเดิม
+    DataFrame ใหม่ได้ version ถัดไป เกิน max_entries ทิ้งรุ่นที่ไม่ได้ใช้นานที่สุด
+
+    สร้างชุดข้อมูลใหม่ภายใน Lock: Session ที่ขอพร้อมกันรอผลเดียวกัน ไม่ต่างคนต่างสร้าง Cube
+    """
+
+    def __init__(self, max_entries=DATASET_VERSIONS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._datasets = OrderedDict()   # id(df) -> SharedDataset (ถือ df ไว้ id จึงไม่ถูกใช้ซ้ำ)
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def publish(self, df, cube=None, top_items=None):
+        """
+        cube / top_items ใช้เฉพาะตอนสร้างชุดข้อมูลใหม่ (ดู SharedDataset)
+        """
+        with self._lock:
+            dataset = self._datasets.get(id(df))
+            if dataset is not None and dataset.df is df:
+                self._datasets.move_to_end(id(df))
+                self.hits += 1
+                return dataset
+            self.misses += 1
+            self._version += 1
+            dataset = self._datasets[id(df)] = SharedDataset(df, self._version, cube, top_items)
+            while len(self._datasets) > self.max_entries:
+                self._datasets.popitem(last=False)
+            return dataset
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._datasets),
+                'version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'mb': sum(dataset.memory_mb() for dataset in self._datasets.values()),
+            }
@@ -0,0 +1,230 @@
+import glob
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from pending_aggregates import build_cube
+
+# ----------------------------------------------------------------------
+# เก็บข้อมูลแต่ละรอบเป็นไฟล์ Snapshot (Arrow IPC บีบอัด lz4) + ประวัติยอดรวม (Parquet)
+# ----------------------------------------------------------------------
+#   <root>/<source>/pending-YYYYmmddTHHMMSSffffff.arrow   ข้อมูลเต็มของแต่ละรอบ (เก็บล่าสุด keep_snapshots ไฟล์)
+#   <root>/<source>/history/part-*.parquet                ยอดรวม (Store, Remark) ของแต่ละรอบ
+#   <root>/<source>/history/history.parquet               part ที่รวม (compact) แล้ว
+#   <root>/<source>/summary/<name>.parquet                ยอดรวมล่าสุดที่คำนวณไว้แล้ว (เขียนโดย pending_cli.py)
+#
+# source = 'auto' (Pending_auto_dashboard) หรือ 'upload' (Pending_dashboard)
+
+SNAPSHOT_DIR = os.environ.get(
+    "MKP_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+)
+
+_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%f"
+_FETCHED_AT_KEY = b"fetched_at"
+
+HISTORY_COLUMNS = ['fetched_at', 'Store', 'Remark', 'Orders', 'Boxes']
+
+
+def _history_store_as_str(history):
+    # Store เก็บเป็นข้อความเสมอ (รหัส Store ไม่จำเป็นต้องเป็นตัวเลข) part เก่าที่เป็น int64 แปลงตอนอ่าน
+    return history.assign(Store=history['Store'].astype('str'))
+
+
+class SnapshotStore:
+    """
+    write()          บันทึก DataFrame 1 รอบ (ข้อมูลชุดเดิมซ้ำจะบันทึกแค่ยอดรวมในประวัติ)
+    load_latest()    อ่าน Snapshot ล่าสุด คืน (df, fetched_at) หรือ (None, None)
+    query_history()  ยอดรวมตามเวลา สำหรับกราฟแนวโน้ม Pending ต่อ Store / Remark
+    write_summaries() / load_summary()  ยอดรวมล่าสุดแยกไฟล์ตามชื่อ (ทับของเดิมทุกรอบ)
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, source='auto', keep_snapshots=48,
+                 keep_history_days=90, compact_after_parts=50):
+        self.directory = os.path.join(root, source)
+        self.history_directory = os.path.join(self.directory, "history")
+        self.summary_directory = os.path.join(self.directory, "summary")
+        self.keep_snapshots = keep_snapshots
+        self.keep_history_days = keep_history_days
+        self.compact_after_parts = compact_after_parts
+        self._lock = threading.Lock()
+        self._last_written = None
+        os.makedirs(self.history_directory, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # เขียน
+    # ------------------------------------------------------------------
+    def write(self, df, fetched_at=None, cube=None):
+        """
+        คืน path ของ Snapshot ที่เขียน (None ถ้าข้อมูลเป็นชุดเดิมกับรอบก่อน)
+        cube = PendingCube ของ df ที่ผู้เรียกมีอยู่แล้ว (None = สร้างใหม่เพื่อเขียนประวัติยอดรวม)
+        """
+        fetched_at = fetched_at or datetime.now()
+        stamp = fetched_at.strftime(_TIMESTAMP_FORMAT)
+
+        with self._lock:
+            path = None
+            # fetch_all_data คืน DataFrame ตัวเดิมเมื่อไม่มี Report ไหนเปลี่ยน ไม่ต้องเขียนซ้ำ
+            if df is not self._last_written:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                table = table.replace_schema_metadata({
+                    **(table.schema.metadata or {}),
+                    _FETCHED_AT_KEY: fetched_at.isoformat().encode(),
+                })
+                path = os.path.join(self.directory, f"pending-{stamp}.arrow")
+                self._atomic_write(path, lambda tmp: self._write_ipc(tmp, table))
+                self._last_written = df
+
+            cube = cube if cube is not None else build_cube(df)
+            history = cube.by_store_remark[['Store', 'Remark', 'Orders', 'Boxes']].copy()
+            history['Store'] = history['Store'].astype('str')
+            history['Remark'] = history['Remark'].astype('str')
+            history.insert(0, 'fetched_at', pd.Timestamp(fetched_at))
+            part = os.path.join(self.history_directory, f"part-{stamp}.parquet")
+            self._atomic_write(part, lambda tmp: history.to_parquet(tmp, index=False))
+
+            self._apply_retention()
+            if len(self._history_parts()) >= self.compact_after_parts:
+                self._compact()
+        return path
+
+    def write_summaries(self, frames, fetched_at=None):
+        """
+        frames = {ชื่อ: DataFrame} เขียนเป็น <summary>/<ชื่อ>.parquet คืน list ของ path ที่เขียน
+        """
+        fetched_at = fetched_at or datetime.now()
+        os.makedirs(self.summary_directory, exist_ok=True)
+        paths = []
+        for name, frame in frames.items():
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                _FETCHED_AT_KEY: fetched_at.isoformat().encode(),
+            })
+            path = os.path.join(self.summary_directory, f"{name}.parquet")
+            self._atomic_write(path, lambda tmp: pq.write_table(table, tmp))
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def _write_ipc(path, table):
+        options = ipc.IpcWriteOptions(compression='lz4')
+        with pa.OSFile(path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def _atomic_write(path, write_fn):
+        tmp = path + ".tmp"
+        write_fn(tmp)
+        os.replace(tmp, path)
+
+    def _snapshot_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "pending-*.arrow")))
+
+    def _history_parts(self):
+        return sorted(glob.glob(os.path.join(self.history_directory, "part-*.parquet")))
+
+    def _apply_retention(self):
+        for path in self._snapshot_paths()[:-self.keep_snapshots]:
+            os.remove(path)
+
+    def compact(self):
+        """
+        รวม part-*.parquet ทั้งหมดเป็น history.parquet ไฟล์เดียว และตัดประวัติเก่ากว่า keep_history_days
+        """
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        parts = self._history_parts()
+        compacted = os.path.join(self.history_directory, "history.parquet")
+        frames = [_history_store_as_str(pd.read_parquet(path)) for path in parts]
+        if os.path.exists(compacted):
+            frames.insert(0, _history_store_as_str(pd.read_parquet(compacted)))
+        if not frames:
+            return
+        history = pd.concat(frames, ignore_index=True)
+        cutoff = pd.Timestamp(datetime.now() - timedelta(days=self.keep_history_days))
+        history = history[history['fetched_at'] >= cutoff].sort_values('fetched_at')
+        self._atomic_write(compacted, lambda tmp: history.to_parquet(tmp, index=False))
+        for path in parts:
+            os.remove(path)
+
+    # ------------------------------------------------------------------
+    # อ่าน
+    # ------------------------------------------------------------------
+    def latest_path(self):
+        paths = self._snapshot_paths()
+        return paths[-1] if paths else None
+
+    def load_latest(self):
+        path = self.latest_path()
+        if path is None:
+            return None, None
+        return self.load(path)
+
+    @staticmethod
+    def load(path):
+        """
+        อ่านไฟล์ Snapshot คืน (df, fetched_at) (คลาย lz4 แล้วแปลงเป็น DataFrame ทั้งก้อน)
+        """
+        with pa.memory_map(path, 'r') as source:
+            table = ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+        fetched_at = metadata.get(_FETCHED_AT_KEY)
+        fetched_at = datetime.fromisoformat(fetched_at.decode()) if fetched_at else None
+        return table.to_pandas(), fetched_at
+
+    def load_summary(self, name):
+        """
+        คืน (df, fetched_at) ของยอดรวมชื่อ name หรือ (None, None) ถ้ายังไม่มี
+        """
+        path = os.path.join(self.summary_directory, f"{name}.parquet")
+        try:
+            table = pq.read_table(path)
+        except FileNotFoundError:
+            return None, None
+        fetched_at = (table.schema.metadata or {}).get(_FETCHED_AT_KEY)
+        fetched_at = datetime.fromisoformat(fetched_at.decode()) if fetched_at else None
+        return table.to_pandas(), fetched_at
+
+    def query_history(self, start=None, end=None, stores=None, remarks=None):
+        """
+        ยอดรวมในช่วงเวลา [start, end] คอลัมน์ fetched_at, Store (ข้อความ), Remark, Orders, Boxes
+        """
+        filters = []
+        if start is not None:
+            filters.append(('fetched_at', '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append(('fetched_at', '<=', pd.Timestamp(end)))
+        if remarks is not None:
+            filters.append(('Remark', 'in', list(remarks)))
+
+        paths = self._history_parts()
+        compacted = os.path.join(self.history_directory, "history.parquet")
+        if os.path.exists(compacted):
+            paths.insert(0, compacted)
+
+        frames = []
+        for path in paths:
+            try:
+                table = pq.read_table(path, filters=filters or None)
+            except FileNotFoundError:
+                # ถูก compact ไประหว่างอ่าน
+                continue
+            if table.num_rows:
+                frames.append(_history_store_as_str(table.to_pandas()))
+        # กรอง Store หลังแปลงเป็นข้อความ (part เก่าเก็บ Store เป็น int64 กรองใน Parquet ด้วยชนิดเดียวกันไม่ได้)
+        if stores is not None:
+            store_names = [str(store) for store in stores]
+            frames = [frame[frame['Store'].isin(store_names)] for frame in frames]
+            frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        return pd.concat(frames, ignore_index=True).sort_values('fetched_at').reset_index(drop=True)
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import numpy as np
+
+# ----------------------------------------------------------------------
+# จับเวลาแต่ละขั้นตอน (Login / ดาวน์โหลด / Parse / ประมวลผล / วาดกราฟ)
+# เก็บค่าล่าสุดของแต่ละขั้นไว้คำนวณ Percentile แบบ Rolling และส่งออกเป็น JSON lines / Prometheus textfile
+# ----------------------------------------------------------------------
+
+# ตั้ง path เพื่อส่งออกอัตโนมัติ (ไม่ตั้ง = เก็บในหน่วยความจำอย่างเดียว)
+METRICS_JSONL_ENV = "MKP_METRICS_JSONL"
+METRICS_PROM_ENV = "MKP_METRICS_PROM"
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def timed(timer, stage, labels=None, **fields):
+    """
+    with timed(timer, 'parse', labels={'report': '7888-1'}) as fields: ...
+    timer เป็น None ได้ (ไม่จับเวลา) fields ที่ได้เป็น dict ที่เติมข้อมูลระหว่างทำงานได้ (เช่น bytes)
+    """
+    if timer is None:
+        return nullcontext(dict(fields))
+    return timer.measure(stage, labels, **fields)
+
+
+class StageTimer:
+    """
+    measure() / record()   บันทึกเวลา 1 ครั้งของขั้น stage (labels แยก Series เช่น report / chart)
+    summary()              count, last, p50, p90, p99 ของแต่ละ Series จาก window ค่าล่าสุด
+    events()               เหตุการณ์ล่าสุด (dict) สำหรับส่งออกเป็น JSON lines
+    prometheus_text()      รูปแบบ Prometheus textfile (summary mkp_stage_seconds)
+    """
+
+    def __init__(self, window=500, max_events=2000, jsonl_path=None, prom_path=None, prom_interval_sec=15):
+        self.window = window
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.prom_interval_sec = prom_interval_sec
+
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}
+        self._events = deque(maxlen=max_events)
+        self._prom_written_at = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(
+            jsonl_path=os.environ.get(METRICS_JSONL_ENV) or None,
+            prom_path=os.environ.get(METRICS_PROM_ENV) or None,
+            **kwargs
+        )
+
+    # ------------------------------------------------------------------
+    # บันทึก
+    # ------------------------------------------------------------------
+    @contextmanager
+    def measure(self, stage, labels=None, **fields):
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException:
+            fields['failed'] = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, labels, **fields)
+
+    def record(self, stage, seconds, labels=None, **fields):
+        key = (stage, tuple(sorted((labels or {}).items())))
+        event = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'stage': stage,
+                 'seconds': round(seconds, 6), **(labels or {}), **fields}
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+            count, total, nbytes = self._totals.get(key, (0, 0.0, 0))
+            self._totals[key] = (count + 1, total + seconds, nbytes + int(fields.get('bytes') or 0))
+            self._events.append(event)
+            write_prom = self.prom_path and time.monotonic() - self._prom_written_at >= self.prom_interval_sec
+            if write_prom:
+                self._prom_written_at = time.monotonic()
+
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            except OSError:
+                pass
+        if write_prom:
+            self.write_prometheus()
+
+    # ------------------------------------------------------------------
+    # อ่าน / ส่งออก
+    # ------------------------------------------------------------------
+    def summary(self):
+        """
+        list ของ dict: stage, labels, count, last_s, p50_s, p90_s, p99_s, bytes (เรียงตามชื่อขั้น)
+        """
+        with self._lock:
+            items = [(key, np.array(samples), self._totals[key]) for key, samples in self._samples.items()]
+
+        rows = []
+        for (stage, labels), samples, (count, _total, nbytes) in sorted(items, key=lambda item: item[0]):
+            p50, p90, p99 = np.quantile(samples, QUANTILES)
+            rows.append({
+                'stage': stage,
+                'labels': ", ".join(f"{name}={value}" for name, value in labels),
+                'count': count,
+                'last_s': float(samples[-1]),
+                'p50_s': float(p50),
+                'p90_s': float(p90),
+                'p99_s': float(p99),
+                'bytes': nbytes,
+            })
+        return rows
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def jsonl_text(self):
+        return "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in self.events())
+
+    def prometheus_text(self):
+        with self._lock:
+            items = [(key, np.array(samples), self._totals[key]) for key, samples in self._samples.items()]
+
+        lines = [
+            "# HELP mkp_stage_seconds Duration of Pending dashboard stages (quantiles over the last samples).",
+            "# TYPE mkp_stage_seconds summary",
+        ]
+        bytes_lines = []
+        for (stage, labels), samples, (count, total, nbytes) in sorted(items, key=lambda item: item[0]):
+            label_text = ",".join([f'stage="{stage}"'] + [f'{name}="{value}"' for name, value in labels])
+            for quantile, value in zip(QUANTILES, np.quantile(samples, QUANTILES)):
+                lines.append(f'mkp_stage_seconds{{{label_text},quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"mkp_stage_seconds_sum{{{label_text}}} {total:.6f}")
+            lines.append(f"mkp_stage_seconds_count{{{label_text}}} {count}")
+            if nbytes:
+                bytes_lines.append(f"mkp_stage_bytes_total{{{label_text}}} {nbytes}")
+        if bytes_lines:
+            lines += ["# HELP mkp_stage_bytes_total Bytes processed by stage.",
+                      "# TYPE mkp_stage_bytes_total counter"] + bytes_lines
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """
+        เขียน textfile สำหรับ node_exporter (เขียนไฟล์ชั่วคราวแล้ว rename กัน Scraper อ่านไฟล์ครึ่ง ๆ)
+        """
+        path = path or self.prom_path
+        if not path:
+            return
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, path)
+        except OSError:
+            pass
@@ -0,0 +1,84 @@
+import os
+
+# ----------------------------------------------------------------------
+# รายชื่อ Store และประเภท Report ที่ต้องดึง (ตั้งผ่าน Environment แทนการเขียนตายในโค้ด)
+# ----------------------------------------------------------------------
+#   MKP_STORES        = "7888,7886,7890"                 Store ตามลำดับที่ต้องการแสดง
+#   MKP_REPORT_TYPES  = "1:Canpick,2:Cannotpick"         typereport ของ PrintReport : Remark
+#   MKP_VISIBLE_STORES = 2                               จำนวน Store ที่แสดงกราฟตอนเปิดหน้า
+
+DEFAULT_STORES = "7888,7886"
+DEFAULT_REPORT_TYPES = "1:Canpick,2:Cannotpick"
+
+# สีเดิมของ Store ที่มีอยู่แล้ว Store ใหม่จะได้สีจาก STORE_PALETTE ตามลำดับ
+BASE_STORE_COLORS = {
+    7888: "#009999",
+    7886: "#33CCCC",
+}
+STORE_PALETTE = [
+    "#006666", "#66CCCC", "#008080", "#99E6E6", "#004C4C", "#20B2AA",
+    "#5F9EA0", "#2E8B57", "#3CB371", "#66CDAA", "#1F7A7A", "#48D1CC",
+]
+
+
+def parse_stores(text):
+    """
+    "7888, 7886" -> [7888, 7886] (ตัดค่าว่างและค่าซ้ำ คงลำดับเดิม)
+    """
+    stores = []
+    for part in text.split(","):
+        part = part.strip()
+        if part and int(part) not in stores:
+            stores.append(int(part))
+    if not stores:
+        raise ValueError("ต้องมี Store อย่างน้อย 1 Store")
+    return stores
+
+
+def parse_report_types(text):
+    """
+    "1:Canpick,2:Cannotpick" -> {'1': 'Canpick', '2': 'Cannotpick'}
+    """
+    report_types = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        report_type, _, remark = part.partition(":")
+        if not remark.strip():
+            raise ValueError(f"รูปแบบ Report ไม่ถูกต้อง: {part!r} (ต้องเป็น type:Remark)")
+        report_types[report_type.strip()] = remark.strip()
+    if not report_types:
+        raise ValueError("ต้องมี Report อย่างน้อย 1 ประเภท")
+    return report_types
+
+
+def build_report_matrix(stores, report_types):
+    """
+    Report ทุกคู่ (Store, type) เรียงตาม Store แล้วตาม type
+    (ลำดับนี้มีผลกับ drop_duplicates ที่เก็บแถวแรก)
+    """
+    return [
+        {'store': str(store), 'type': report_type, 'remark': remark}
+        for store in stores
+        for report_type, remark in report_types.items()
+    ]
+
+
+def store_color_map(stores):
+    """
+    สีของแต่ละ Store สำหรับ Pie Chart (Store เดิมใช้สีเดิม Store ใหม่วนตาม STORE_PALETTE)
+    """
+    colors = {}
+    palette_index = 0
+    for store in stores:
+        if store in BASE_STORE_COLORS:
+            colors[store] = BASE_STORE_COLORS[store]
+        else:
+            colors[store] = STORE_PALETTE[palette_index % len(STORE_PALETTE)]
+            palette_index += 1
+    return colors
+
+
+STORES = parse_stores(os.environ.get("MKP_STORES", DEFAULT_STORES))
+REPORT_TYPES = parse_report_types(os.environ.get("MKP_REPORT_TYPES", DEFAULT_REPORT_TYPES))
+VISIBLE_STORES = int(os.environ.get("MKP_VISIBLE_STORES", 2))
@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from pending_schema import PENDING_COLUMNS, SOURCE_COLUMN, normalize_pending
+from report_cache import content_digest
+from xlsx_reader import read_xlsx
+
+# ----------------------------------------------------------------------
+# อัปโหลดหลายไฟล์พร้อมกัน (Pending_dashboard): Parse แต่ละไฟล์ใน Process Pool
+# Cache ผลตาม Hash ของไฟล์ แล้วรวมเป็นชุดเดียวพร้อมคอลัมน์ Source File
+# ----------------------------------------------------------------------
+
+# **ใช้ตำแหน่งคอลัมน์ (Index) แทนชื่อคอลัมน์ Excel (A=0, B=1, D=3, E=4, H=7, I=8, J=9)**
+UPLOAD_USE_COLS = [0, 1, 3, 4, 7, 8, 9]
+
+# จำนวน Process ที่ Parse พร้อมกัน และจำนวนไฟล์ที่เก็บผล Parse ไว้ใน Cache
+UPLOAD_WORKERS = int(os.environ.get("MKP_UPLOAD_WORKERS", min(4, os.cpu_count() or 1)))
+UPLOAD_CACHE_FILES = int(os.environ.get("MKP_UPLOAD_CACHE_FILES", 32))
+
+
+def parse_upload(content, sheet_name):
+    """
+    แปลงไฟล์ที่อัปโหลด 1 ไฟล์เป็น DataFrame ที่ normalize แล้ว (ทำงานใน Worker Process)
+    คืน DataFrame ชนิดข้อมูลกะทัดรัด ส่งกลับข้าม Process ได้เร็วกว่าแบบ object
+    """
+    df = read_xlsx(
+        content,
+        usecols=UPLOAD_USE_COLS,
+        names=PENDING_COLUMNS,
+        header_row=0,
+        sheet_name=sheet_name
+    )
+    return normalize_pending(df)[0]
+
+
+class UploadFrameCache:
+    """
+    LRU ของ DataFrame ที่ Parse แล้ว key = (Hash ของไฟล์, ชื่อชีต)
+    อัปโหลดไฟล์เดิมซ้ำ (ชื่อเดียวกันหรือไม่ก็ตาม) จึงไม่ต้อง Parse ใหม่
+
+    DataFrame ที่คืนจาก Cache ใช้ร่วมกันหลายที่ ห้ามแก้ไขแบบ inplace
+    """
+
+    def __init__(self, max_entries=UPLOAD_CACHE_FILES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key, frame):
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._frames), 'hits': self.hits, 'misses': self.misses}
+
+
+def merge_uploads(named_frames):
+    """
+    รวม [(ชื่อไฟล์, df), ...] เป็นชุดเดียว เติมคอลัมน์ Source File
+    คอลัมน์ category รวมด้วย union_categoricals (ไม่แปลงกลับเป็น object ก่อน)
+    """
+    named_frames = [(name, frame) for name, frame in named_frames if frame is not None]
+    if not named_frames:
+        return pd.DataFrame()
+    names = [name for name, _ in named_frames]
+    frames = [frame for _, frame in named_frames]
+
+    merged = {}
+    for column in PENDING_COLUMNS:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            merged[column] = union_categoricals(parts, ignore_order=True)
+        else:
+            merged[column] = pd.concat(parts, ignore_index=True)
+
+    # ชื่อไฟล์ซ้ำกันได้ (คนละโฟลเดอร์) จึงเก็บ Category ตามชื่อที่ไม่ซ้ำ
+    categories = list(dict.fromkeys(names))
+    codes = np.repeat([categories.index(name) for name in names], [len(frame) for frame in frames])
+    merged[SOURCE_COLUMN] = pd.Categorical.from_codes(codes.astype('int32'), categories)
+
+    # normalize อีกครั้งเพื่อให้ชนิดข้อมูลตรงกันทุกไฟล์ (คอลัมน์ที่เป็น category อยู่แล้วแปลงเร็ว)
+    return normalize_pending(pd.DataFrame(merged))[0]
+
+
+def load_uploads(files, sheet_name, cache, pool=None):
+    """
+    files = [(ชื่อไฟล์, bytes), ...]
+    คืน (df ที่รวมแล้ว, list ของ dict ต่อไฟล์: file, rows, cached, error)
+
+    ไฟล์ที่ Hash ตรงกับ Cache ใช้ผลเดิม ไฟล์ที่เหลือ Parse พร้อมกันใน pool
+    (เหลือไฟล์เดียวหรือไม่มี pool จะ Parse ใน Thread นี้ ไม่เสียเวลาส่งข้อมูลข้าม Process)
+    ไฟล์ที่ Parse ไม่ได้จะข้ามไปพร้อมบอก error ไฟล์อื่นยังใช้ได้
+    """
+    results = []
+    frames = {}
+    pending = {}
+    for name, content in files:
+        key = (content_digest(content), sheet_name)
+        frame = cache.get(key)
+        results.append({'file': name, 'key': key, 'rows': 0, 'cached': frame is not None, 'error': None})
+        if frame is not None:
+            frames[key] = frame
+        else:
+            pending.setdefault(key, content)  # ไฟล์เนื้อหาเดียวกันในชุดเดียวกัน Parse ครั้งเดียว
+
+    parsed = {}  # key -> DataFrame หรือ Exception
+    if pool is not None and len(pending) > 1:
+        futures = {key: pool.submit(parse_upload, content, sheet_name) for key, content in pending.items()}
+        for key, future in futures.items():
+            try:
+                parsed[key] = future.result()
+            except Exception as e:
+                parsed[key] = e
+    else:
+        for key, content in pending.items():
+            try:
+                parsed[key] = parse_upload(content, sheet_name)
+            except Exception as e:
+                parsed[key] = e
+
+    named_frames = []
+    for result in results:
+        key = result.pop('key')
+        frame = frames.get(key)
+        if frame is None:
+            frame = parsed[key]
+            if isinstance(frame, Exception):
+                result['error'] = str(frame)
+                continue
+            cache.put(key, frame)
+            frames[key] = frame
+        result['rows'] = len(frame)
+        named_frames.append((result['file'], frame))
+
+    return merge_uploads(named_frames), results
+
+
+def new_upload_pool(max_workers=UPLOAD_WORKERS):
+    """
+    Process Pool สำหรับ parse_upload (สร้างครั้งเดียวแล้วใช้ซ้ำ Worker ไม่ต้อง import pandas ใหม่ทุกครั้ง)
+    ใช้ spawn ไม่ใช้ fork: Server ของ Streamlit มีหลาย Thread fork แล้ว Lock ที่ Thread อื่นถืออยู่
+    จะติดไปกับ Worker และค้างตลอด
+    """
+    return ProcessPoolExecutor(max_workers=max(1, max_workers), mp_context=multiprocessing.get_context('spawn'))
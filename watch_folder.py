@@ -0,0 +1,317 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from report_cache import content_digest
+from snapshot_store import SNAPSHOT_DIR
+from upload_batch import merge_uploads, parse_upload
+
+# ----------------------------------------------------------------------
+# Watch Folder (Pending_dashboard): เฝ้าโฟลเดอร์ที่ Macro Export ไฟล์ .xlsm ไว้ แทนการอัปโหลดผ่านหน้าเว็บ
+# ไฟล์ใหม่ / ไฟล์ที่เปลี่ยน Parse เฉพาะชีตข้อมูลใน Background Thread แล้วแชร์ผลให้ทุกหน้าจอ
+# ----------------------------------------------------------------------
+#   <state_dir>/index.json              path -> mtime_ns, size, digest ของไฟล์ที่เคยเห็น
+#   <state_dir>/frames/<digest>.parquet DataFrame ที่ Parse แล้วของแต่ละไฟล์ (Restart แล้วไม่ต้อง Parse ใหม่)
+
+# โฟลเดอร์ที่เฝ้า (ว่าง = ปิด Watch Folder ใช้การอัปโหลดอย่างเดียว)
+WATCH_DIR = os.environ.get("MKP_WATCH_DIR", "")
+
+# ชื่อไฟล์ที่รับ (คั่นด้วย ,) / ความถี่ในการสแกน / อายุขั้นต่ำของไฟล์ก่อนอ่าน (กันอ่านไฟล์ที่ยังเขียนไม่เสร็จ)
+WATCH_PATTERNS = os.environ.get("MKP_WATCH_PATTERNS", "*.xlsm,*.xlsx")
+WATCH_INTERVAL_SEC = float(os.environ.get("MKP_WATCH_INTERVAL_SEC", 5))
+WATCH_SETTLE_SEC = float(os.environ.get("MKP_WATCH_SETTLE_SEC", 3))
+
+# รวมเฉพาะไฟล์ล่าสุด N ไฟล์ (ตามเวลาแก้ไข) 0 = รวมทุกไฟล์ในโฟลเดอร์
+WATCH_KEEP_FILES = int(os.environ.get("MKP_WATCH_KEEP_FILES", 0))
+
+WATCH_STATE_DIR = os.path.join(SNAPSHOT_DIR, "watch")
+
+# error ที่ไม่ได้มาจากตัวไฟล์ (Pool เสีย / ดิสก์ / หน่วยความจำ) ลองใหม่รอบถัดไป
+_TRANSIENT_ERRORS = (BrokenExecutor, OSError, MemoryError)
+
+
+def parse_patterns(text):
+    return [pattern.strip() for pattern in text.split(",") if pattern.strip()]
+
+
+class WatchResult:
+    """
+    ชุดข้อมูลที่รวมจากไฟล์ในโฟลเดอร์ 1 รุ่น
+
+    data        = DataFrame ที่รวมแล้ว (คอลัมน์ Source File = ชื่อไฟล์)
+    version     = เพิ่มขึ้นเฉพาะเมื่อชุดไฟล์ / เนื้อหาไฟล์เปลี่ยน
+    files       = list ของ dict ต่อไฟล์: file, rows, parsed (Parse ในรุ่นนี้), error
+    updated_at  = เวลาที่รวมรุ่นนี้เสร็จ
+    """
+
+    def __init__(self, data, version, files, updated_at):
+        self.data = data
+        self.version = version
+        self.files = files
+        self.updated_at = updated_at
+
+
+class FolderWatcher:
+    """
+    สแกน directory ทุก interval_sec ใน Daemon Thread เดียวของ Process
+
+    - ไฟล์ที่ mtime / size ตรงกับ Index ใช้ digest เดิม ไม่ต้องอ่านไฟล์
+    - ไฟล์ที่เปลี่ยนอ่านแล้ว Hash ถ้า digest เคย Parse แล้ว (ไฟล์ย้าย / เปลี่ยนชื่อ / Restart) ใช้ผลเดิมจากดิสก์
+    - เหลือเฉพาะ digest ใหม่จริง ๆ ที่ Parse (หลายไฟล์พร้อมกันใน pool)
+    - ชุดไฟล์ไม่เปลี่ยน: ไม่รวมใหม่ latest() คืนผลตัวเดิม (version เดิม)
+
+    DataFrame ที่คืนใช้ร่วมกันทุก Session ห้ามแก้ไขแบบ inplace
+    """
+
+    def __init__(self, directory, sheet_name, state_dir=WATCH_STATE_DIR, pool=None,
+                 patterns=WATCH_PATTERNS, interval_sec=WATCH_INTERVAL_SEC,
+                 settle_sec=WATCH_SETTLE_SEC, keep_files=WATCH_KEEP_FILES, on_publish=None):
+        self.directory = directory
+        self.sheet_name = sheet_name
+        self.patterns = parse_patterns(patterns) if isinstance(patterns, str) else list(patterns)
+        self.interval_sec = interval_sec
+        self.settle_sec = settle_sec
+        self.keep_files = keep_files
+        self.pool = pool
+        self.on_publish = on_publish
+        self.state_dir = state_dir
+        self.frames_dir = os.path.join(state_dir, "frames")
+        self.index_path = os.path.join(state_dir, "index.json")
+        os.makedirs(self.frames_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self._frames = {}            # digest -> DataFrame ของไฟล์ที่อยู่ในรุ่นล่าสุด
+        self._errors = {}            # digest -> ข้อความ error ของไฟล์ที่ Parse ไม่ได้ (ไม่ลองซ้ำจนกว่าไฟล์จะเปลี่ยน)
+        self._published_key = None   # ((ชื่อไฟล์, digest), ...) ของรุ่นล่าสุด
+        self._latest = None
+        self._thread = None
+        self.last_error = None
+        self.parsed = 0
+        self.reused = 0
+
+    # ------------------------------------------------------------------
+    # Thread
+    # ------------------------------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._loop, name="mkp-watch-folder", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            try:
+                self.scan_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            time.sleep(self.interval_sec)
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    def stats(self):
+        with self._lock:
+            return {'indexed': len(self._index), 'parsed': self.parsed, 'reused': self.reused}
+
+    # ------------------------------------------------------------------
+    # สแกน
+    # ------------------------------------------------------------------
+    def _matching_files(self):
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                # ~$ = ไฟล์ Lock ของ Excel ระหว่างเปิดไฟล์อยู่
+                if not entry.is_file() or entry.name.startswith("~$"):
+                    continue
+                if any(fnmatch.fnmatch(entry.name.lower(), pattern.lower()) for pattern in self.patterns):
+                    files.append((entry.path, entry.stat()))
+        files.sort(key=lambda item: item[1].st_mtime_ns, reverse=True)
+        return files[:self.keep_files] if self.keep_files > 0 else files
+
+    def _has_frame(self, digest):
+        return digest in self._frames or digest in self._errors or os.path.exists(self._frame_path(digest))
+
+    def scan_once(self):
+        """
+        สแกน 1 รอบ คืน True ถ้าได้ข้อมูลรุ่นใหม่
+
+        Index ของไฟล์บันทึกหลังเก็บผล Parse ลงดิสก์แล้วเท่านั้น (หรือ Parse ไม่ได้แบบแน่นอน เช่นไฟล์เสีย)
+        Parse ไม่สำเร็จชั่วคราว / Process ตายกลางทาง รอบหน้าจะอ่านไฟล์นั้นใหม่เอง
+        """
+        now = time.time()
+        current = []     # (path, digest)
+        contents = {}    # digest -> bytes ของไฟล์ที่ยังไม่มีผล Parse
+        staged = {}      # path -> entry ใหม่ของ Index (บันทึกหลัง Parse)
+        for path, stat in self._matching_files():
+            entry = self._index.get(path)
+            if entry is not None and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                if self._has_frame(entry['digest']):
+                    current.append((path, entry['digest']))
+                    continue
+                # Index ตรงแต่ไม่มีผล Parse (เช่นเขียนไฟล์ผลไม่ทันก่อน Restart): อ่านใหม่
+            elif now - stat.st_mtime < self.settle_sec:
+                # ยังเขียนไม่เสร็จ: ใช้ digest เดิมไปก่อน (ถ้ามี) รอบหน้าค่อยอ่าน
+                if entry is not None:
+                    current.append((path, entry['digest']))
+                continue
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest = content_digest(content)
+            staged[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+            current.append((path, digest))
+            if not self._has_frame(digest):
+                contents.setdefault(digest, content)
+
+        key = tuple((os.path.basename(path), digest) for path, digest in current)
+        if key == self._published_key and not contents and not staged:
+            return False
+
+        parsed, transient = self._parse(contents)
+
+        # บันทึกเฉพาะไฟล์ที่มีผล Parse แล้ว ไฟล์ที่ล้มเหลวชั่วคราวไม่อยู่ใน Index รอบหน้าจึงอ่านใหม่
+        index_changed = False
+        for path, entry in staged.items():
+            if entry['digest'] not in transient:
+                self._index[path] = entry
+                index_changed = True
+        # ไฟล์ที่ถูกลบออกจากโฟลเดอร์
+        present = {path for path, _ in current}
+        for path in [path for path in self._index if path not in present and not os.path.exists(path)]:
+            del self._index[path]
+            index_changed = True
+        if index_changed:
+            self._save_index()
+
+        files = []
+        named_frames = []
+        frames = {}
+        for path, digest in current:
+            name = os.path.basename(path)
+            result = {'file': name, 'rows': 0, 'parsed': digest in parsed, 'error': None}
+            files.append(result)
+            if digest in self._errors:
+                result['error'] = self._errors[digest]
+                continue
+            if digest in transient:
+                result['error'] = f"{transient[digest]} (จะลองใหม่รอบถัดไป)"
+                continue
+            frame = frames.get(digest)
+            if frame is None:
+                frame = parsed.get(digest)
+                if frame is None:
+                    frame = self._frames.get(digest)
+                if frame is None:
+                    frame = self._load_frame(digest)
+                    if frame is not None:
+                        self.reused += 1
+                if frame is None:
+                    result['error'] = "อ่านผล Parse เดิมไม่ได้ จะอ่านไฟล์ใหม่รอบถัดไป"
+                    continue
+                frames[digest] = frame
+            result['rows'] = len(frame)
+            named_frames.append((name, frame))
+
+        data = merge_uploads(named_frames)
+        self._prune_frames()
+        with self._lock:
+            self._frames = frames
+            # มีไฟล์ที่ยังไม่ได้ข้อมูล: ไม่จำ key รอบหน้าจะรวมใหม่เมื่อได้ผล
+            self._published_key = None if transient else key
+            version = self._latest.version + 1 if self._latest is not None else 1
+            self._latest = WatchResult(data, version, files, datetime.now())
+            latest = self._latest
+        if self.on_publish is not None and not data.empty:
+            self.on_publish(latest)
+        return True
+
+    def _parse(self, contents):
+        """
+        Parse ไฟล์ digest ใหม่ (พร้อมกันใน pool ถ้ามีหลายไฟล์) แล้วเก็บผลลงดิสก์
+        คืน ({digest: DataFrame}, {digest: ข้อความ error ชั่วคราว})
+
+        Parse ไม่ได้เพราะตัวไฟล์ (ไม่มีชีต / ไฟล์เสีย) เก็บใน _errors ไม่ลองซ้ำจนกว่าไฟล์จะเปลี่ยน
+        Pool เสีย / เขียนดิสก์ไม่ได้ / หน่วยความจำไม่พอ ถือเป็นชั่วคราว
+        """
+        outcomes = {}
+        if self.pool is not None and len(contents) > 1:
+            try:
+                futures = {digest: self.pool.submit(parse_upload, content, self.sheet_name)
+                           for digest, content in contents.items()}
+            except _TRANSIENT_ERRORS as e:
+                return {}, {digest: f"{type(e).__name__}: {e}" for digest in contents}
+            for digest, future in futures.items():
+                try:
+                    outcomes[digest] = future.result()
+                except Exception as e:
+                    outcomes[digest] = e
+        else:
+            for digest, content in contents.items():
+                try:
+                    outcomes[digest] = parse_upload(content, self.sheet_name)
+                except Exception as e:
+                    outcomes[digest] = e
+
+        parsed = {}
+        transient = {}
+        for digest, frame in outcomes.items():
+            if isinstance(frame, _TRANSIENT_ERRORS):
+                transient[digest] = f"{type(frame).__name__}: {frame}"
+                continue
+            if isinstance(frame, Exception):
+                self._errors[digest] = str(frame)
+                continue
+            self.parsed += 1
+            path = self._frame_path(digest)
+            try:
+                frame.to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+            except _TRANSIENT_ERRORS as e:
+                transient[digest] = f"{type(e).__name__}: {e}"
+                continue
+            parsed[digest] = frame
+        return parsed, transient
+
+    # ------------------------------------------------------------------
+    # Index / DataFrame บนดิสก์
+    # ------------------------------------------------------------------
+    def _frame_path(self, digest):
+        return os.path.join(self.frames_dir, f"{digest}.parquet")
+
+    def _load_frame(self, digest):
+        try:
+            return pd.read_parquet(self._frame_path(digest))
+        except Exception:
+            return None
+
+    def _prune_frames(self):
+        # เก็บเฉพาะผล Parse ของไฟล์ที่ยังอยู่ใน Index (ไฟล์ที่ถูกลบแล้วไม่ต้องเก็บ)
+        referenced = {entry['digest'] for entry in self._index.values()}
+        self._errors = {digest: error for digest, error in self._errors.items() if digest in referenced}
+        for name in os.listdir(self.frames_dir):
+            digest, ext = os.path.splitext(name)
+            if ext == ".parquet" and digest not in referenced:
+                os.remove(os.path.join(self.frames_dir, name))
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
@@ -0,0 +1,186 @@
+import io
+import os
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# ----------------------------------------------------------------------
+# ตัวอ่านไฟล์ Excel (.xlsx / .xlsm) แบบเลือก Engine ได้ อ่านเฉพาะคอลัมน์ที่ใช้
+# ----------------------------------------------------------------------
+#   'calamine'        : python-calamine (Rust) ผ่าน pd.read_excel(engine='calamine') เร็วที่สุด (ถ้าติดตั้งไว้)
+#   'openpyxl-stream' : openpyxl read_only + iter_rows(values_only=True) ตัดคอลัมน์เกินทิ้งตั้งแต่ตอนอ่าน
+#   'openpyxl'        : pd.read_excel(engine='openpyxl') แบบเดิม
+#
+# เลือก Engine เองได้ด้วย Environment Variable XLSX_READER_ENGINE
+
+ENGINE_ENV_VAR = "XLSX_READER_ENGINE"
+
+
+def _has_calamine():
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _MemoryViewReader(io.RawIOBase):
+    """
+    File-like ที่อ่านจาก memoryview / bytearray โดยตรง (io.BytesIO จะคัดลอกข้อมูลทั้งก้อน)
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._view) + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def _open_source(source):
+    """
+    แปลง bytes / bytearray / memoryview / path / file-like (เช่น UploadedFile) ให้อ่านจากต้นไฟล์ได้
+    """
+    if isinstance(source, bytes):
+        # BytesIO ใช้ bytes ร่วมกันโดยไม่คัดลอก
+        return io.BytesIO(source)
+    if isinstance(source, (bytearray, memoryview)):
+        return io.BufferedReader(_MemoryViewReader(source))
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def _read_calamine(source, usecols, names, header_row, sheet_name):
+    return pd.read_excel(
+        _open_source(source),
+        sheet_name=sheet_name,
+        engine='calamine',
+        usecols=usecols,
+        header=None,
+        skiprows=header_row + 1,
+        names=names
+    )
+
+
+def _read_openpyxl(source, usecols, names, header_row, sheet_name):
+    return pd.read_excel(
+        _open_source(source),
+        sheet_name=sheet_name,
+        engine='openpyxl',
+        usecols=usecols,
+        header=None,
+        skiprows=header_row + 1,
+        names=names
+    )
+
+
+def _read_openpyxl_stream(source, usecols, names, header_row, sheet_name):
+    import openpyxl
+    from openpyxl.cell.cell import ERROR_CODES
+
+    wb = openpyxl.load_workbook(_open_source(source), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        # ไฟล์ที่ Export จากระบบอื่นมักระบุ dimension ผิด ให้ openpyxl หาขอบเขตเอง
+        ws.reset_dimensions()
+
+        max_col = max(usecols) + 1
+        data = []
+        last_row_with_data = -1
+        # อ่านเฉพาะคอลัมน์ 1..max_col และไม่สร้าง Cell Object (values_only)
+        for row_number, row in enumerate(ws.iter_rows(min_row=header_row + 2, max_col=max_col, values_only=True)):
+            width = len(row)
+            converted_row = []
+            for col in usecols:
+                value = row[col] if col < width else None
+                # แปลงค่าให้เหมือน pd.read_excel (ช่องว่าง = "", เลขจำนวนเต็ม = int, Error = NaN)
+                if value is None:
+                    value = ""
+                elif isinstance(value, float):
+                    if value.is_integer():
+                        value = int(value)
+                elif isinstance(value, str) and value in ERROR_CODES:
+                    value = float('nan')
+                converted_row.append(value)
+            if any(value != "" for value in converted_row):
+                last_row_with_data = row_number
+            data.append(converted_row)
+    finally:
+        wb.close()
+
+    # ตัดแถวว่างท้ายชีตทิ้ง (เหมือน pd.read_excel)
+    data = data[: last_row_with_data + 1]
+    if not data:
+        return pd.DataFrame(columns=names)
+
+    return TextParser(data, names=names, header=None, skip_blank_lines=False).read()
+
+
+READERS = {
+    'calamine': _read_calamine,
+    'openpyxl-stream': _read_openpyxl_stream,
+    'openpyxl': _read_openpyxl,
+}
+
+
+def available_engines():
+    engines = ['openpyxl-stream', 'openpyxl']
+    if _has_calamine():
+        engines.insert(0, 'calamine')
+    return engines
+
+
+def default_engine():
+    """
+    Engine ที่ใช้เมื่อไม่ได้ระบุ: ตาม XLSX_READER_ENGINE ถ้าตั้งไว้ ไม่เช่นนั้นใช้ตัวที่เร็วที่สุดที่มี
+    """
+    engine = os.environ.get(ENGINE_ENV_VAR)
+    if engine in READERS:
+        return engine
+    return available_engines()[0]
+
+
+def read_xlsx(source, usecols, names, header_row=0, sheet_name=0, engine=None):
+    """
+    อ่านชีต Excel เฉพาะคอลัมน์ใน usecols (index เริ่มที่ 0) แถวข้อมูลเริ่มหลัง header_row
+    แล้วตั้งชื่อคอลัมน์ตาม names ผลลัพธ์เหมือน pd.read_excel(..., usecols=usecols, header=header_row)
+    ที่ตั้ง df.columns = names ทีหลัง
+
+    ถ้า Engine ที่เลือกไม่ได้ติดตั้งไว้ จะกลับไปใช้ openpyxl แบบเดิม
+
+    หมายเหตุ 'openpyxl-stream': แถวท้ายชีตที่มีข้อมูลเฉพาะคอลัมน์นอก usecols จะถูกนับเป็นแถวว่างและตัดทิ้ง
+    """
+    usecols = list(usecols)
+    names = list(names)
+    engine = engine or default_engine()
+    reader = READERS[engine]
+    try:
+        return reader(source, usecols, names, header_row, sheet_name)
+    except ImportError:
+        if engine == 'openpyxl':
+            raise
+        return _read_openpyxl(source, usecols, names, header_row, sheet_name)